@@ -0,0 +1,258 @@
+# Account store: SQLite with the username as primary key (indexed lookup, so login cost does not grow with the
+# user count), salted scrypt password hashes (PBKDF2 where OpenSSL lacks scrypt) and inserts that are atomic across
+# processes. Replaces users.csv, which is imported once: on first use if it is small, else by `migrate`.
+
+import argparse
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(BASE_DIR, "users.db")
+LEGACY_FILE = os.path.join(BASE_DIR, "users.csv")
+SALT_BYTES = 16
+HASH_BYTES = 32
+# ~16 MB and ~70 ms per hash
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 1 << 14, 8, 1
+PBKDF2_ITERATIONS = 600000
+MIGRATION_BATCH = 1000
+# Largest users.csv openAccounts imports itself (~70 ms per hash); bigger ones wait for `migrate`
+OPEN_IMPORT_LIMIT = 100
+# A concurrent writer holds the lock for one insert; wait rather than fail
+BUSY_TIMEOUT_S = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    created REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+def hashPassword(password, salt=None):
+    # "scheme$params$salt$hash"; the parameters travel with the hash so they can be raised later
+    salt = salt or secrets.token_bytes(SALT_BYTES)
+    if hasattr(hashlib, "scrypt"):
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=HASH_BYTES)
+        return f"scrypt${SCRYPT_N}:{SCRYPT_R}:{SCRYPT_P}${salt.hex()}${digest.hex()}"
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PBKDF2_ITERATIONS, HASH_BYTES)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+def verifyPassword(password, stored):
+    try:
+        scheme, params, salt, expected = stored.split('$')
+        salt, expected = bytes.fromhex(salt), bytes.fromhex(expected)
+        if scheme == "scrypt":
+            n, r, p = (int(x) for x in params.split(':'))
+            digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=len(expected))
+        elif scheme == "pbkdf2_sha256":
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, int(params), len(expected))
+        else:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, expected)
+
+# Unknown usernames are checked against this so they take as long as known ones
+_DUMMY_HASH = None
+
+def _dummyHash():
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hashPassword(secrets.token_hex(8))
+    return _DUMMY_HASH
+
+def readLegacyUsers(path):
+    # users.csv: "name:password" or "name,password" per line; quoted lines are headers. Later lines win.
+    users = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('"'):
+                continue
+            parts = line.split(':', 1) if ':' in line else line.split(',', 1)
+            if len(parts) == 2 and parts[0].strip() and parts[1].strip():
+                users[parts[0].strip()] = parts[1].strip()
+    return users
+
+def _lineCountAtMost(path, limit):
+    # Stops reading as soon as the file is known to be too long
+    with open(path, 'rb') as f:
+        for count, _ in enumerate(f, 1):
+            if count > limit:
+                return False
+    return True
+
+def _hashLegacy(pair):
+    name, password = pair
+    return name, hashPassword(password)
+
+class AccountStore():
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        # Autocommit: every statement is its own transaction unless one is opened explicitly
+        self.db = sqlite3.connect(path, timeout=BUSY_TIMEOUT_S, isolation_level=None)
+        # WAL lets logins read while another process registers
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def register(self, username, password):
+        # False if the name is taken; the primary key decides between concurrent registrations of the same name
+        passwordHash = hashPassword(password)
+        try:
+            self.db.execute("INSERT INTO accounts (username, password_hash, created) VALUES (?, ?, ?)",
+                            (username, passwordHash, time.time()))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def verify(self, username, password):
+        row = self.db.execute("SELECT password_hash FROM accounts WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            verifyPassword(password, _dummyHash())
+            return False
+        return verifyPassword(password, row[0])
+
+    def exists(self, username):
+        return self.db.execute("SELECT 1 FROM accounts WHERE username = ?", (username,)).fetchone() is not None
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+
+    def meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def legacyPending(self, path=LEGACY_FILE):
+        # True if a users.csv sits at path and has not been imported yet
+        return os.path.exists(path) and self.meta("legacy_import:" + os.path.abspath(path)) is None
+
+    def migrateLegacy(self, path=LEGACY_FILE, workers=None, log=print):
+        # One-shot import of a users.csv: hashed across processes, inserted in batched transactions.
+        # Accounts already in the store are kept. Returns (imported, skipped), or None if path was imported before.
+        source = os.path.abspath(path)
+        if self.meta("legacy_import:" + source) is not None:
+            return None
+        users = readLegacyUsers(path)
+        pending = [(name, pw) for name, pw in users.items() if not self.exists(name)]
+        imported = 0
+        start = time.perf_counter()
+        workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(pending) > MIGRATION_BATCH else None
+        try:
+            hashed = pool.map(_hashLegacy, pending, chunksize=64) if pool else map(_hashLegacy, pending)
+            batch = []
+            for row in hashed:
+                batch.append(row)
+                if len(batch) == MIGRATION_BATCH:
+                    imported += self.insertBatch(batch)
+                    batch = []
+                    if log:
+                        done = imported + (len(users) - len(pending))
+                        log(f"migrated {done}/{len(users)} accounts, {done / (time.perf_counter() - start):.0f}/s")
+            imported += self.insertBatch(batch)
+        finally:
+            if pool:
+                pool.shutdown()
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        ("legacy_import:" + source, str(time.time())))
+        return imported, len(users) - imported
+
+    def insertBatch(self, rows):
+        if not rows:
+            return 0
+        now = time.time()
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            before = self.db.total_changes
+            self.db.executemany("INSERT OR IGNORE INTO accounts (username, password_hash, created) VALUES (?, ?, ?)",
+                                [(name, passwordHash, now) for name, passwordHash in rows])
+            return self.db.total_changes - before
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def openAccounts(path=DEFAULT_DB, legacyPath=LEGACY_FILE, importLimit=OPEN_IMPORT_LIMIT):
+    # The store the game uses. A users.csv of up to importLimit accounts is imported here; hashing a larger one would
+    # hold up the login window for minutes or hours, so it stays pending (legacyPending) until `migrate` runs.
+    store = AccountStore(path)
+    if store.legacyPending(legacyPath) and _lineCountAtMost(legacyPath, importLimit):
+        store.migrateLegacy(legacyPath, log=None)
+    return store
+
+def benchLogin(path, sizes, samples=20):
+    # Login latency (a lookup plus one password hash) as the account count grows; filler accounts share one hash
+    filler = hashPassword("filler")
+    results = []
+    with AccountStore(path) as store:
+        store.register("bench-user", "bench-password")
+        for size in sizes:
+            missing = size - store.count()
+            if missing > 0:
+                base = store.count()
+                rows = [(f"bench-{base + i}", filler) for i in range(missing)]
+                for i in range(0, len(rows), 50000):
+                    store.insertBatch(rows[i:i + 50000])
+            start = time.perf_counter()
+            for _ in range(samples):
+                assert store.verify("bench-user", "bench-password")
+            loginMs = (time.perf_counter() - start) * 1000 / samples
+            start = time.perf_counter()
+            for i in range(samples * 100):
+                store.exists(f"bench-{i * 7919 % size}")
+            lookupUs = (time.perf_counter() - start) * 1e6 / (samples * 100)
+            results.append({"accounts": store.count(), "loginMs": round(loginMs, 2), "lookupUs": round(lookupUs, 2)})
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the account store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="import a users.csv (name:password or name,password lines)")
+    migrate.add_argument("csv", nargs="?", default=LEGACY_FILE)
+    migrate.add_argument("--workers", type=int, default=None)
+    migrate.add_argument("--delete", action="store_true", help="remove the plaintext csv once it is imported")
+    bench = commands.add_parser("bench", help="login latency at growing account counts (uses a scratch database)")
+    bench.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    for command in (migrate, bench):
+        command.add_argument("--db", default=None)
+    args = parser.parse_args(argv)
+    if args.command == "migrate":
+        with AccountStore(args.db or DEFAULT_DB) as store:
+            result = store.migrateLegacy(args.csv, args.workers)
+            if result is None:
+                print(f"{args.csv} was already imported")
+            else:
+                print(f"imported {result[0]} accounts, {result[1]} skipped (already present); {store.count()} in total")
+                # Only after an import that read this file: every account in it is in the store now
+                if args.delete:
+                    os.remove(args.csv)
+                    print(f"removed {args.csv}")
+        return 0
+    path = args.db or os.path.join(BASE_DIR, "users-bench.db")
+    try:
+        for r in benchLogin(path, args.sizes):
+            print(f"{r['accounts']:>9} accounts  login {r['loginMs']:7.2f} ms  lookup {r['lookupUs']:6.2f} us")
+    finally:
+        if not args.db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
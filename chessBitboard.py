@@ -0,0 +1,559 @@
+# Bitboard-backed game state with the same getValidMoves/makeMove/undoMove API as chessEngine.GameState
+
+import time
+from chessEngine import (GameState, Move, PROMOTION_PIECES, WKS, WQS, BKS, BQS, CASTLE_MASK, ZOBRIST_PIECES,
+                         ZOBRIST_CASTLE_KEYS, ZOBRIST_EP_FILE, ZOBRIST_SIDE, AUTO_DRAW_REPETITIONS,
+                         AUTO_DRAW_HALFMOVES, _fenRankString)
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_NAMES = ['wp', 'wN', 'wB', 'wR', 'wQ', 'wK', 'bp', 'bN', 'bB', 'bR', 'bQ', 'bK']
+PIECE_INDEX = {name: i for i, name in enumerate(PIECE_NAMES)}
+FULL = 0xFFFFFFFFFFFFFFFF
+
+# Packed move: from | to << 6 | flag << 12 | promotion piece << 14 (index into PROMOTION_PIECES)
+NORMAL, EN_PASSANT, CASTLE, PROMOTION = range(4)
+PROMOTION_TYPES = [QUEEN, ROOK, BISHOP, KNIGHT]
+
+def _inBounds(r, c):
+    return 0 <= r < 8 and 0 <= c < 8
+
+def _stepTable(deltas):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        bb = 0
+        for dr, dc in deltas:
+            if _inBounds(r + dr, c + dc):
+                bb |= 1 << ((r + dr)*8 + c + dc)
+        table.append(bb)
+    return table
+
+def _lineTable(directions):
+    # For each square: mask of relevant blockers along one line (edges excluded)
+    # and a dict from masked occupancy to the attack set on that line.
+    masks, tables = [], []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
+        for dr, dc in directions:
+            nr, nc = r + dr, c + dc
+            while _inBounds(nr + dr, nc + dc):
+                mask |= 1 << (nr*8 + nc)
+                nr += dr
+                nc += dc
+        table = {}
+        sub = 0
+        while True:
+            attacks = 0
+            for dr, dc in directions:
+                nr, nc = r + dr, c + dc
+                while _inBounds(nr, nc):
+                    bit = 1 << (nr*8 + nc)
+                    attacks |= bit
+                    if sub & bit:
+                        break
+                    nr += dr
+                    nc += dc
+            table[sub] = attacks
+            sub = (sub - mask) & mask
+            if sub == 0:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+def _betweenTable():
+    table = [[0]*64 for _ in range(64)]
+    for a in range(64):
+        r, c = divmod(a, 8)
+        for dr, dc in [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]:
+            nr, nc = r + dr, c + dc
+            between = 0
+            while _inBounds(nr, nc):
+                table[a][nr*8 + nc] = between
+                between |= 1 << (nr*8 + nc)
+                nr += dr
+                nc += dc
+    return table
+
+KNIGHT_ATTACKS = _stepTable([(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)])
+KING_ATTACKS = _stepTable([(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)])
+# Squares attacked by a pawn of the given color standing on a square (white moves toward row 0)
+PAWN_ATTACKS = (_stepTable([(-1,-1),(-1,1)]), _stepTable([(1,-1),(1,1)]))
+RANK_MASK, RANK_ATTACKS = _lineTable([(0,-1),(0,1)])
+FILE_MASK, FILE_ATTACKS = _lineTable([(-1,0),(1,0)])
+DIAG_MASK, DIAG_ATTACKS = _lineTable([(-1,-1),(1,1)])
+ANTI_MASK, ANTI_ATTACKS = _lineTable([(-1,1),(1,-1)])
+ROOK_RAYS = [RANK_ATTACKS[sq][0] | FILE_ATTACKS[sq][0] for sq in range(64)]
+BISHOP_RAYS = [DIAG_ATTACKS[sq][0] | ANTI_ATTACKS[sq][0] for sq in range(64)]
+BETWEEN = _betweenTable()
+# Squares whose rank and file sum to an odd number; bishops all inside or all outside share a colour
+DARK_SQUARES = sum(1 << sq for sq in range(64) if ((sq >> 3) + (sq & 7)) % 2)
+
+def rookAttacks(sq, occ):
+    return RANK_ATTACKS[sq][occ & RANK_MASK[sq]] | FILE_ATTACKS[sq][occ & FILE_MASK[sq]]
+
+def bishopAttacks(sq, occ):
+    return DIAG_ATTACKS[sq][occ & DIAG_MASK[sq]] | ANTI_ATTACKS[sq][occ & ANTI_MASK[sq]]
+
+class BitboardGameState():
+    def __init__(self, gs=None):
+        if gs is None:
+            gs = GameState()
+        self.board = [row[:] for row in gs.board]
+        self.bitboards = [0]*12
+        self.occupancy = [0, 0]
+        self.mailbox = [-1]*64
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece != "--":
+                    idx = PIECE_INDEX[piece]
+                    sq = r*8 + c
+                    self.bitboards[idx] |= 1 << sq
+                    self.occupancy[idx // 6] |= 1 << sq
+                    self.mailbox[sq] = idx
+        self.kingSquares = [self.bitboards[KING].bit_length() - 1, self.bitboards[6 + KING].bit_length() - 1]
+        self.side = 0 if gs.whiteToMove else 1
+        self.castle = gs.castle
+        self.epSquare = -1 if gs.enPassantPossible is None else gs.enPassantPossible[0]*8 + gs.enPassantPossible[1]
+        self.history = []
+        self.moveLog = []
+        # Clocks and repetition keys are kept by makeMove/undoMove only; makeRaw/undoRaw (perft) skip them
+        self.halfmoveClock = gs.halfmoveClock
+        self.fullmoveNumber = gs.fullmoveNumber
+        self.clockLog = [gs.halfmoveClock]
+        self.zobristKey = gs.zobristKey
+        self.zobristLog = [gs.zobristKey]
+        self.keyCounts = {gs.zobristKey: 1}
+
+    @property
+    def whiteToMove(self):
+        return self.side == 0
+
+    @property
+    def whiteKingLocation(self):
+        return divmod(self.kingSquares[0], 8)
+
+    @property
+    def blackKingLocation(self):
+        return divmod(self.kingSquares[1], 8)
+
+    @property
+    def enPassantPossible(self):
+        return None if self.epSquare < 0 else divmod(self.epSquare, 8)
+
+    @property
+    def castleRights(self):
+        return {'wks': bool(self.castle & WKS), 'wqs': bool(self.castle & WQS),
+                'bks': bool(self.castle & BKS), 'bqs': bool(self.castle & BQS)}
+
+    def getValidMoves(self):
+        moves = []
+        board = self.board
+        epBefore = self.enPassantPossible
+        for m in self.generateMoves():
+            fr, to, flag = m & 63, (m >> 6) & 63, (m >> 12) & 3
+            move = Move((fr >> 3, fr & 7), (to >> 3, to & 7), board, isEnPassant=(flag == EN_PASSANT),
+                        isCastle=(flag == CASTLE), promotionChoice=PROMOTION_PIECES[m >> 14])
+            move.enPassantPossibleBefore = epBefore
+            moves.append(move)
+        return moves
+
+    def makeMove(self, move):
+        flag = NORMAL
+        if move.isEnPassantMove:
+            flag = EN_PASSANT
+        elif move.isCastleMove:
+            flag = CASTLE
+        elif move.isPawnPromotion:
+            flag = PROMOTION | PROMOTION_PIECES.index(move.promotionChoice) << 2
+        oldCastle, oldEp = self.castle, self.epSquare
+        self.makeRaw((move.startRow*8 + move.startCol) | (move.endRow*8 + move.endCol) << 6 | flag << 12)
+        self.moveLog.append(move)
+        if move.pieceMoved[1] == 'p' or move.pieceCaptured != "--":
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        self.clockLog.append(self.halfmoveClock)
+        if self.side == 0:
+            self.fullmoveNumber += 1
+        self.updatePositionKey(move, oldEp, oldCastle)
+
+    def updatePositionKey(self, move, oldEp, oldCastle):
+        # Same XORs as GameState.updatePositionKey, so both states give a position the same key
+        key = self.zobristKey ^ ZOBRIST_SIDE
+        end = move.endRow*8 + move.endCol
+        key ^= ZOBRIST_PIECES[move.pieceMoved][move.startRow*8 + move.startCol]
+        key ^= ZOBRIST_PIECES[self.board[move.endRow][move.endCol]][end]
+        if move.isEnPassantMove:
+            key ^= ZOBRIST_PIECES[move.pieceCaptured][move.startRow*8 + move.endCol]
+        elif move.pieceCaptured != "--":
+            key ^= ZOBRIST_PIECES[move.pieceCaptured][end]
+        if move.isCastleMove:
+            rook = move.pieceMoved[0] + 'R'
+            rookFrom, rookTo = (7, 5) if move.endCol == 6 else (0, 3)
+            key ^= ZOBRIST_PIECES[rook][move.endRow*8 + rookFrom] ^ ZOBRIST_PIECES[rook][move.endRow*8 + rookTo]
+        if oldEp >= 0:
+            key ^= ZOBRIST_EP_FILE[oldEp & 7]
+        if self.epSquare >= 0:
+            key ^= ZOBRIST_EP_FILE[self.epSquare & 7]
+        key ^= ZOBRIST_CASTLE_KEYS[oldCastle ^ self.castle]
+        self.zobristKey = key
+        self.zobristLog.append(key)
+        self.keyCounts[key] = self.keyCounts.get(key, 0) + 1
+
+    def undoMove(self):
+        if len(self.moveLog) == 0:
+            return
+        self.moveLog.pop()
+        self.undoRaw()
+        self.clockLog.pop()
+        self.halfmoveClock = self.clockLog[-1]
+        if self.side == 1:
+            self.fullmoveNumber -= 1
+        key = self.zobristLog.pop()
+        self.keyCounts[key] -= 1
+        self.zobristKey = self.zobristLog[-1]
+
+    def positionKey(self):
+        return self.zobristKey
+
+    def isRepetition(self, n=3):
+        return self.keyCounts.get(self.zobristKey, 0) >= n
+
+    def toFEN(self):
+        placement = "/".join([_fenRankString(tuple(row)) for row in self.board])
+        castle = "".join(ch for ch, bit in (('K', WKS), ('Q', WQS), ('k', BKS), ('q', BQS)) if self.castle & bit) or '-'
+        ep = '-' if self.epSquare < 0 else Move.colsToFiles[self.epSquare & 7] + Move.rowsToRanks[self.epSquare >> 3]
+        return f"{placement} {'w' if self.side == 0 else 'b'} {castle} {ep} {self.halfmoveClock} {self.fullmoveNumber}"
+
+    def hasLegalMove(self):
+        return len(self.generateMoves(firstOnly=True)) > 0
+
+    def insufficientMaterial(self):
+        # Nobody can mate: bare kings, one minor piece, or only bishops and all on one square colour
+        bb = self.bitboards
+        if bb[PAWN] | bb[6 + PAWN] | bb[ROOK] | bb[6 + ROOK] | bb[QUEEN] | bb[6 + QUEEN]:
+            return False
+        knights = bb[KNIGHT] | bb[6 + KNIGHT]
+        bishops = bb[BISHOP] | bb[6 + BISHOP]
+        if bin(knights | bishops).count('1') <= 1:
+            return True
+        if knights:
+            return False
+        return not (bishops & DARK_SQUARES) or not (bishops & ~DARK_SQUARES)
+
+    def gameStatus(self):
+        # None while the game goes on, else "checkmate", "stalemate", "insufficient", "seventy-five-move" or
+        # "repetition" (fivefold), as GameState.gameStatus
+        if not self.hasLegalMove():
+            return "checkmate" if self.isInCheck() else "stalemate"
+        if self.insufficientMaterial():
+            return "insufficient"
+        if self.halfmoveClock >= AUTO_DRAW_HALFMOVES:
+            return "seventy-five-move"
+        if self.isRepetition(AUTO_DRAW_REPETITIONS):
+            return "repetition"
+        return None
+
+    def setPromotionPiece(self, pieceType):
+        move = self.moveLog[-1]
+        self.undoMove()
+        chosen = Move((move.startRow, move.startCol), (move.endRow, move.endCol), self.board, promotionChoice=pieceType)
+        chosen.enPassantPossibleBefore = move.enPassantPossibleBefore
+        self.makeMove(chosen)
+
+    def isInCheck(self, forWhite=None):
+        if forWhite is None:
+            forWhite = self.whiteToMove
+        color = 0 if forWhite else 1
+        return self.attacked(self.kingSquares[color], color ^ 1, self.occupancy[0] | self.occupancy[1])
+
+    def squareAttacked(self, r, c, byWhite):
+        return self.attacked(r*8 + c, 0 if byWhite else 1, self.occupancy[0] | self.occupancy[1])
+
+    def attacked(self, sq, by, occ):
+        bb = self.bitboards
+        base = 6*by
+        if KNIGHT_ATTACKS[sq] & bb[base + KNIGHT]:
+            return True
+        if PAWN_ATTACKS[by ^ 1][sq] & bb[base + PAWN]:
+            return True
+        if KING_ATTACKS[sq] & bb[base + KING]:
+            return True
+        queens = bb[base + QUEEN]
+        if rookAttacks(sq, occ) & (bb[base + ROOK] | queens):
+            return True
+        return bool(bishopAttacks(sq, occ) & (bb[base + BISHOP] | queens))
+
+    def generateMoves(self, firstOnly=False):
+        # firstOnly: return as soon as some legal move is in the list (king moves first, then piece by piece)
+        us = self.side
+        them = us ^ 1
+        bb = self.bitboards
+        ourBase, theirBase = 6*us, 6*them
+        own, opp = self.occupancy[us], self.occupancy[them]
+        occ = own | opp
+        k = self.kingSquares[us]
+        theirQueens = bb[theirBase + QUEEN]
+        theirRQ = bb[theirBase + ROOK] | theirQueens
+        theirBQ = bb[theirBase + BISHOP] | theirQueens
+        checkers = ((KNIGHT_ATTACKS[k] & bb[theirBase + KNIGHT]) | (PAWN_ATTACKS[us][k] & bb[theirBase + PAWN]) |
+                    (rookAttacks(k, occ) & theirRQ) | (bishopAttacks(k, occ) & theirBQ))
+        moves = []
+        append = moves.append
+
+        kingOcc = occ ^ (1 << k)
+        targets = KING_ATTACKS[k] & ~own
+        attacked = self.attacked
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            to = bit.bit_length() - 1
+            if not attacked(to, them, kingOcc):
+                append(k | to << 6)
+                if firstOnly:
+                    return moves
+        if checkers & (checkers - 1):
+            return moves
+
+        if checkers:
+            evasion = BETWEEN[k][checkers.bit_length() - 1] | checkers
+        else:
+            evasion = FULL
+            # firstOnly skips castling: it is legal only if the king's step toward the rook is, which was tried above
+            if us == 0 and not firstOnly:
+                if (self.castle & WKS and not occ & 0x6000000000000000 and
+                        not attacked(61, 1, occ) and not attacked(62, 1, occ)):
+                    append(60 | 62 << 6 | CASTLE << 12)
+                if (self.castle & WQS and not occ & 0x0E00000000000000 and
+                        not attacked(59, 1, occ) and not attacked(58, 1, occ)):
+                    append(60 | 58 << 6 | CASTLE << 12)
+            elif not firstOnly:
+                if self.castle & BKS and not occ & 0x60 and not attacked(5, 0, occ) and not attacked(6, 0, occ):
+                    append(4 | 6 << 6 | CASTLE << 12)
+                if self.castle & BQS and not occ & 0x0E and not attacked(3, 0, occ) and not attacked(2, 0, occ):
+                    append(4 | 2 << 6 | CASTLE << 12)
+
+        pinned = 0
+        pinRays = {}
+        snipers = (ROOK_RAYS[k] & theirRQ) | (BISHOP_RAYS[k] & theirBQ)
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            ray = BETWEEN[k][bit.bit_length() - 1]
+            blockers = ray & occ
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+                pinRays[blockers] = ray | bit
+        target = evasion & ~own
+
+        pieces = bb[ourBase + KNIGHT] & ~pinned
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            fr = bit.bit_length() - 1
+            dests = KNIGHT_ATTACKS[fr] & target
+            if firstOnly and dests:
+                return [fr | (dests.bit_length() - 1) << 6]
+            while dests:
+                d = dests & -dests
+                dests ^= d
+                append(fr | (d.bit_length() - 1) << 6)
+
+        ourQueens = bb[ourBase + QUEEN]
+        for pieces, rook in ((bb[ourBase + BISHOP] | ourQueens, False), (bb[ourBase + ROOK] | ourQueens, True)):
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                fr = bit.bit_length() - 1
+                if rook:
+                    dests = (RANK_ATTACKS[fr][occ & RANK_MASK[fr]] | FILE_ATTACKS[fr][occ & FILE_MASK[fr]]) & target
+                else:
+                    dests = (DIAG_ATTACKS[fr][occ & DIAG_MASK[fr]] | ANTI_ATTACKS[fr][occ & ANTI_MASK[fr]]) & target
+                if bit & pinned:
+                    dests &= pinRays[bit]
+                if firstOnly and dests:
+                    return [fr | (dests.bit_length() - 1) << 6]
+                while dests:
+                    d = dests & -dests
+                    dests ^= d
+                    append(fr | (d.bit_length() - 1) << 6)
+
+        pieces = bb[ourBase + PAWN]
+        step = -8 if us == 0 else 8
+        startRow, promoRow = (6, 0) if us == 0 else (1, 7)
+        ep = self.epSquare
+        pawnAttacks = PAWN_ATTACKS[us]
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            fr = bit.bit_length() - 1
+            allowed = target
+            if bit & pinned:
+                allowed &= pinRays[bit]
+            dests = pawnAttacks[fr] & opp & allowed
+            one = fr + step
+            if not occ >> one & 1:
+                if allowed >> one & 1:
+                    dests |= 1 << one
+                if fr >> 3 == startRow:
+                    two = one + step
+                    if not occ >> two & 1 and allowed >> two & 1:
+                        dests |= 1 << two
+            if firstOnly and dests:
+                to = dests.bit_length() - 1
+                return [fr | to << 6 | (PROMOTION << 12 if to >> 3 == promoRow else 0)]
+            while dests:
+                d = dests & -dests
+                dests ^= d
+                to = d.bit_length() - 1
+                if to >> 3 == promoRow:
+                    for promo in range(4):
+                        append(fr | to << 6 | PROMOTION << 12 | promo << 14)
+                else:
+                    append(fr | to << 6)
+            if ep >= 0 and pawnAttacks[fr] >> ep & 1:
+                # Dedicated discovered-check test: both pawns leave, the capturer lands on the ep square
+                capBit = 1 << (ep - step)
+                epOcc = (occ ^ bit ^ capBit) | (1 << ep)
+                if not (rookAttacks(k, epOcc) & theirRQ or bishopAttacks(k, epOcc) & theirBQ or
+                        KNIGHT_ATTACKS[k] & bb[theirBase + KNIGHT] or
+                        PAWN_ATTACKS[us][k] & bb[theirBase + PAWN] & ~capBit):
+                    append(fr | ep << 6 | EN_PASSANT << 12)
+                    if firstOnly:
+                        return moves
+        return moves
+
+    def makeRaw(self, m):
+        fr, to, flag = m & 63, (m >> 6) & 63, (m >> 12) & 3
+        us = self.side
+        bb, occupancy, mailbox, board = self.bitboards, self.occupancy, self.mailbox, self.board
+        piece = mailbox[fr]
+        captured = mailbox[to]
+        self.history.append((m, captured, self.castle, self.epSquare))
+        frBit, toBit = 1 << fr, 1 << to
+        bb[piece] ^= frBit | toBit
+        occupancy[us] ^= frBit | toBit
+        mailbox[fr] = -1
+        mailbox[to] = piece
+        board[fr >> 3][fr & 7] = "--"
+        board[to >> 3][to & 7] = PIECE_NAMES[piece]
+        if captured >= 0:
+            bb[captured] ^= toBit
+            occupancy[us ^ 1] ^= toBit
+        if flag == EN_PASSANT:
+            capSq = to + 8 if us == 0 else to - 8
+            captured = mailbox[capSq]
+            bb[captured] ^= 1 << capSq
+            occupancy[us ^ 1] ^= 1 << capSq
+            mailbox[capSq] = -1
+            board[capSq >> 3][capSq & 7] = "--"
+        elif flag == CASTLE:
+            rookFrom, rookTo = (to + 1, to - 1) if to & 7 == 6 else (to - 2, to + 1)
+            rook = mailbox[rookFrom]
+            bb[rook] ^= (1 << rookFrom) | (1 << rookTo)
+            occupancy[us] ^= (1 << rookFrom) | (1 << rookTo)
+            mailbox[rookFrom] = -1
+            mailbox[rookTo] = rook
+            board[rookFrom >> 3][rookFrom & 7] = "--"
+            board[rookTo >> 3][rookTo & 7] = PIECE_NAMES[rook]
+        elif flag == PROMOTION:
+            promoted = 6*us + PROMOTION_TYPES[m >> 14]
+            bb[piece] ^= toBit
+            bb[promoted] |= toBit
+            mailbox[to] = promoted
+            board[to >> 3][to & 7] = PIECE_NAMES[promoted]
+        if piece % 6 == KING:
+            self.kingSquares[us] = to
+        if piece % 6 == PAWN and (fr - to == 16 or to - fr == 16):
+            self.epSquare = (fr + to) // 2
+        else:
+            self.epSquare = -1
+        self.castle &= CASTLE_MASK[fr] & CASTLE_MASK[to]
+        self.side = us ^ 1
+
+    def undoRaw(self):
+        m, captured, castle, ep = self.history.pop()
+        fr, to, flag = m & 63, (m >> 6) & 63, (m >> 12) & 3
+        us = self.side ^ 1
+        bb, occupancy, mailbox, board = self.bitboards, self.occupancy, self.mailbox, self.board
+        frBit, toBit = 1 << fr, 1 << to
+        piece = mailbox[to]
+        if flag == PROMOTION:
+            bb[piece] ^= toBit
+            piece = 6*us + PAWN
+            bb[piece] |= toBit
+        bb[piece] ^= frBit | toBit
+        occupancy[us] ^= frBit | toBit
+        mailbox[fr] = piece
+        mailbox[to] = captured
+        board[fr >> 3][fr & 7] = PIECE_NAMES[piece]
+        if captured >= 0:
+            bb[captured] |= toBit
+            occupancy[us ^ 1] |= toBit
+            board[to >> 3][to & 7] = PIECE_NAMES[captured]
+        else:
+            board[to >> 3][to & 7] = "--"
+        if flag == EN_PASSANT:
+            capSq = to + 8 if us == 0 else to - 8
+            pawn = 6*(us ^ 1) + PAWN
+            bb[pawn] |= 1 << capSq
+            occupancy[us ^ 1] |= 1 << capSq
+            mailbox[capSq] = pawn
+            board[capSq >> 3][capSq & 7] = PIECE_NAMES[pawn]
+        elif flag == CASTLE:
+            rookFrom, rookTo = (to + 1, to - 1) if to & 7 == 6 else (to - 2, to + 1)
+            rook = mailbox[rookTo]
+            bb[rook] ^= (1 << rookFrom) | (1 << rookTo)
+            occupancy[us] ^= (1 << rookFrom) | (1 << rookTo)
+            mailbox[rookTo] = -1
+            mailbox[rookFrom] = rook
+            board[rookTo >> 3][rookTo & 7] = "--"
+            board[rookFrom >> 3][rookFrom & 7] = PIECE_NAMES[rook]
+        if piece % 6 == KING:
+            self.kingSquares[us] = fr
+        self.castle = castle
+        self.epSquare = ep
+        self.side = us
+
+    def perft(self, depth):
+        moves = self.generateMoves()
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+        nodes = 0
+        for m in moves:
+            self.makeRaw(m)
+            nodes += self.perft(depth - 1)
+            self.undoRaw()
+        return nodes
+
+def perftApi(gs, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in gs.getValidMoves():
+        gs.makeMove(move)
+        nodes += perftApi(gs, depth - 1)
+        gs.undoMove()
+    return nodes
+
+def benchmark(depth=4):
+    results = []
+    for name, fn in [("list-of-strings", lambda: perftApi(GameState(), depth)),
+                     ("bitboard API", lambda: perftApi(BitboardGameState(), depth)),
+                     ("bitboard raw", lambda: BitboardGameState().perft(depth))]:
+        start = time.perf_counter()
+        nodes = fn()
+        elapsed = time.perf_counter() - start
+        results.append((name, nodes, elapsed))
+        print(f"{name:16s} perft({depth}) = {nodes}  {elapsed:.2f}s  {int(nodes / elapsed)} nodes/s")
+    base = results[0][1] / results[0][2]
+    for name, nodes, elapsed in results[1:]:
+        print(f"{name:16s} speedup x{nodes / elapsed / base:.1f}")
+    return results
+
+if __name__ == "__main__":
+    import sys
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
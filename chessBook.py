@@ -0,0 +1,197 @@
+# Opening book: a sorted binary file of (position key, move, weight) records, looked up by binary search over an mmap.
+# Opening the book reads nothing but the header, and every process that maps the same file shares its pages.
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from chessEngine import GameState, START_FEN
+from chessPGN import readGames, parseSAN
+from chessTransposition import encodeMove
+
+BOOK_MAGIC = b"FMBOOK01"
+# Big-endian key, packed move (chessTransposition.encodeMove), weight: byte order sorts by key, then move
+RECORD = struct.Struct(">QHH")
+MAX_WEIGHT = 0xFFFF
+DEFAULT_BOOK_PLIES = 16
+# Points for the side that played the move: a win counts double, a loss not at all
+RESULT_POINTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1), "*": (1, 1)}
+DEFAULT_BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+class OpeningBook():
+    def __init__(self, path=DEFAULT_BOOK_FILE):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < len(BOOK_MAGIC) or (size - len(BOOK_MAGIC)) % RECORD.size:
+            self.file.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.count = (size - len(BOOK_MAGIC)) // RECORD.size
+        # mmap refuses empty files; a book with no records needs no map
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b""
+        if self.count and self.data[:len(BOOK_MAGIC)] != BOOK_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+
+    def keyAt(self, i):
+        return RECORD.unpack_from(self.data, len(BOOK_MAGIC) + i*RECORD.size)[0]
+
+    def entries(self, key):
+        # [(packed move, weight)] stored for key, lower bound by binary search then a forward scan
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if self.keyAt(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        offset = len(BOOK_MAGIC) + lo*RECORD.size
+        while lo < self.count:
+            entryKey, move, weight = RECORD.unpack_from(self.data, offset)
+            if entryKey != key:
+                break
+            found.append((move, weight))
+            lo += 1
+            offset += RECORD.size
+        return found
+
+    def bookMove(self, gs, packed):
+        # The legal move a stored packed move stands for, checked with the moving piece's moves only (or castling)
+        start, end = packed & 63, packed >> 6 & 63
+        piece = gs.board[start >> 3][start & 7]
+        if piece[1] == 'K' and abs((start & 7) - (end & 7)) == 2:
+            if gs.isInCheck():
+                return None
+            castles = []
+            gs.addCastleMoves(castles)
+            return next((m for m in castles if encodeMove(m) == packed), None)
+        for move in gs.movesFrom(start >> 3, start & 7):
+            if encodeMove(move) == packed:
+                return move
+        return None
+
+    def pickMove(self, gs, rng=random, best=False):
+        # A book move for gs chosen in proportion to its weight (best: the heaviest), or None when out of book.
+        # Entries that don't validate (a key collision, a corrupt file) are skipped.
+        candidates = [entry for entry in self.entries(gs.positionKey()) if entry[1] > 0]
+        while candidates:
+            if best:
+                entry = max(candidates, key=lambda e: e[1])
+            else:
+                entry = rng.choices(candidates, weights=[w for _, w in candidates])[0]
+            move = self.bookMove(gs, entry[0])
+            if move is not None:
+                return move
+            candidates.remove(entry)
+        return None
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def openBook(path=DEFAULT_BOOK_FILE):
+    # The book at path, or None if there is no file there
+    return OpeningBook(path) if os.path.exists(path) else None
+
+def bookLines(path):
+    # (start FEN, SAN/UCI moves, result) per game: a .pgn file, or one space-separated move list per line
+    if path.lower().endswith(".pgn"):
+        for game in readGames(path):
+            yield game.startFen(), game.moves, game.result
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                yield START_FEN, line.split(), "*"
+
+def lineMove(gs, token):
+    # Move lists may mix UCI and SAN
+    if len(token) in (4, 5) and token[0] in "abcdefgh" and token[1] in "12345678" and token[2] in "abcdefgh":
+        for move in gs.getValidMoves():
+            if move.getUCINotation() == token:
+                return move
+    return parseSAN(gs, token)
+
+def buildBook(sources, out, plies=DEFAULT_BOOK_PLIES, minWeight=1, log=print):
+    # Compiles the first `plies` moves of every game/line in sources into a book file at out
+    weights = {}
+    games = skipped = 0
+    start = time.perf_counter()
+    for path in sources:
+        for fen, moves, result in bookLines(path):
+            games += 1
+            points = RESULT_POINTS.get(result, RESULT_POINTS["*"])
+            gs = GameState.fromFEN(fen)
+            try:
+                for token in moves[:plies]:
+                    move = lineMove(gs, token)
+                    entry = (gs.positionKey(), encodeMove(move))
+                    weights[entry] = weights.get(entry, 0) + points[0 if gs.whiteToMove else 1]
+                    gs.makeMove(move)
+            except ValueError as e:
+                skipped += 1
+                if log:
+                    log(f"{path}: game {games}: {e}")
+    records = sorted((key, move, weight) for (key, move), weight in weights.items() if weight >= minWeight)
+    # Scale down rather than clip so relative weights survive
+    heaviest = max((r[2] for r in records), default=0)
+    scale = MAX_WEIGHT / heaviest if heaviest > MAX_WEIGHT else 1
+    tmp = out + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(BOOK_MAGIC)
+        for key, move, weight in records:
+            f.write(RECORD.pack(key, move, max(1, int(weight * scale))))
+    os.replace(tmp, out)
+    return {"games": games, "skipped": skipped, "records": len(records),
+            "positions": len({r[0] for r in records}), "seconds": round(time.perf_counter() - start, 3)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query an opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile PGN files / move lists into a book")
+    build.add_argument("out")
+    build.add_argument("sources", nargs="+", help=".pgn files, or text files with one move list per line")
+    build.add_argument("--plies", type=int, default=DEFAULT_BOOK_PLIES)
+    build.add_argument("--min-weight", type=int, default=1, help="drop moves scoring less than this")
+    probe = commands.add_parser("probe", help="list the book moves for a position")
+    probe.add_argument("book")
+    probe.add_argument("--fen", default=START_FEN)
+    probe.add_argument("--moves", default="", help="space-separated moves played from --fen")
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        summary = buildBook(args.sources, args.out, args.plies, args.min_weight)
+        print(f"{summary['games']} lines ({summary['skipped']} skipped) -> {summary['records']} moves in "
+              f"{summary['positions']} positions, {summary['seconds']}s")
+        return 0
+    gs = GameState.fromFEN(args.fen)
+    for token in args.moves.split():
+        gs.makeMove(lineMove(gs, token))
+    with OpeningBook(args.book) as book:
+        start = time.perf_counter()
+        entries = book.entries(gs.positionKey())
+        micros = (time.perf_counter() - start) * 1e6
+        total = sum(w for _, w in entries) or 1
+        for packed, weight in sorted(entries, key=lambda e: -e[1]):
+            move = book.bookMove(gs, packed)
+            name = move.getUCINotation() if move else f"invalid {packed}"
+            print(f"{name:6s} {weight:6d} {100 * weight / total:5.1f}%")
+        print(f"{len(entries)} moves, lookup {micros:.1f}us over {len(book)} records")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
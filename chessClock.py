@@ -0,0 +1,40 @@
+# Chess clock on the monotonic clock, shared by the pygame client and the game server
+
+import time
+
+class GameClock():
+    # Remaining time per side charged from time.monotonic(), so it stays exact however rarely the loop wakes up
+    def __init__(self, base_ms, increment_ms):
+        self.base_ms = base_ms
+        self.increment_ms = increment_ms
+        self.reset()
+
+    def reset(self):
+        self.remaining = {'w': float(self.base_ms), 'b': float(self.base_ms)}
+        self.active = 'w'
+        self.mark = time.monotonic()
+
+    def settle(self):
+        now = time.monotonic()
+        if self.active:
+            self.remaining[self.active] = max(0.0, self.remaining[self.active] - (now - self.mark) * 1000)
+        self.mark = now
+
+    def setActive(self, side):
+        # 'w', 'b', or None to stop both clocks
+        self.settle()
+        self.active = side
+
+    def addIncrement(self, side):
+        self.remaining[side] += self.increment_ms
+
+    def remainingMs(self, side):
+        self.settle()
+        return int(self.remaining[side])
+
+    def msUntilChange(self):
+        # Time until the running clock shows a different second (or flags); None when stopped
+        if not self.active:
+            return None
+        self.settle()
+        return int(self.remaining[self.active] % 1000) + 1
@@ -1,29 +1,301 @@
 # Chess game state and move logic (GameState, Move, piece movement, check, castling, en passant)
 
+import random
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from chessEval import PSQT, boardScore
+
+PIECES = ["wp", "wR", "wN", "wB", "wQ", "wK", "bp", "bR", "bN", "bB", "bQ", "bK"]
+PROMOTION_PIECES = ['Q', 'R', 'B', 'N']
+
+# Zobrist keys (fixed seed so keys are stable across runs and processes)
+_zobristRng = random.Random(0x5EED)
+ZOBRIST_PIECES = {piece: [_zobristRng.getrandbits(64) for _ in range(64)] for piece in PIECES}
+ZOBRIST_CASTLE = {right: _zobristRng.getrandbits(64) for right in ('wks', 'wqs', 'bks', 'bqs')}
+ZOBRIST_EP_FILE = [_zobristRng.getrandbits(64) for _ in range(8)]
+ZOBRIST_SIDE = _zobristRng.getrandbits(64)
+
+# Castle rights bits (same layout as chessBitboard) and the rights kept after a move touches a square: king and rook
+# home squares clear theirs, so a move updates rights with castle &= CASTLE_MASK[start] & CASTLE_MASK[end]
+WKS, WQS, BKS, BQS = 1, 2, 4, 8
+CASTLE_RIGHT_BITS = {'wks': WKS, 'wqs': WQS, 'bks': BKS, 'bqs': BQS}
+CASTLE_MASK = [0xF]*64
+CASTLE_MASK[60] &= ~(WKS | WQS)
+CASTLE_MASK[63] &= ~WKS
+CASTLE_MASK[56] &= ~WQS
+CASTLE_MASK[4] &= ~(BKS | BQS)
+CASTLE_MASK[7] &= ~BKS
+CASTLE_MASK[0] &= ~BQS
+# Zobrist key of every set of rights; XOR with ZOBRIST_CASTLE_KEYS[old ^ new] flips exactly the rights that changed
+ZOBRIST_CASTLE_KEYS = [0]*16
+for _bits in range(16):
+    for _right, _bit in CASTLE_RIGHT_BITS.items():
+        if _bits & _bit:
+            ZOBRIST_CASTLE_KEYS[_bits] ^= ZOBRIST_CASTLE[_right]
+
+# Irreversible state, one int per position on GameState.stateLog: castle rights in bits 0-3, en passant file + 1 in
+# bits 4-7, halfmove clock from bit 8 up. undoMove restores all three from the previous entry.
+STATE_EP_SHIFT = 4
+STATE_HALFMOVE_SHIFT = 8
+
+# Draws that end the game without a claim (FIDE 9.6): fivefold repetition and 75 moves each without a pawn move or
+# capture. Threefold repetition and the fifty-move rule only entitle a player to claim, so they don't stop play.
+AUTO_DRAW_REPETITIONS = 5
+AUTO_DRAW_HALFMOVES = 150
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+FEN_PIECES = {ch: ('w' if ch.isupper() else 'b') + (ch.upper() if ch not in 'Pp' else 'p') for ch in "PNBRQKpnbrqk"}
+FEN_CHARS = {piece: ch for ch, piece in FEN_PIECES.items()}
+
+# Parsed FEN ranks and placements, FEN text of board rows and snapshot rows are kept in bounded LRU caches: batch
+# loads see the same few ranks over and over, and a long stream of new ones only evicts the oldest. clearCaches()
+# gives the memory back.
+FEN_RANK_CACHE_SIZE = 1 << 17
+FEN_PLACEMENT_CACHE_SIZE = 1 << 14
+# Piece counts of a rank packed into one int, 7 bits per entry of PIECES, so a placement's counts are one sum
+COUNT_BITS = 7
+COUNT_SHIFTS = {piece: COUNT_BITS*i for i, piece in enumerate(PIECES)}
+
+@lru_cache(maxsize=FEN_RANK_CACHE_SIZE)
+def _parseFENRank(rank, r):
+    # Returns (row, Zobrist key of the row as board row r, white king col, black king col, packed piece counts,
+    # evaluation table sum of the row as board row r)
+    row = []
+    whiteKingCol = blackKingCol = -1
+    for ch in rank:
+        if ch in '12345678':
+            row.extend(["--"] * int(ch))
+            continue
+        piece = FEN_PIECES.get(ch)
+        if piece is None:
+            raise ValueError(f"bad piece {ch!r} in FEN rank {rank!r}")
+        if len(row) >= 8:
+            raise ValueError(f"FEN rank {rank!r} has more than 8 squares")
+        if piece == 'wK':
+            whiteKingCol = len(row)
+        elif piece == 'bK':
+            blackKingCol = len(row)
+        row.append(piece)
+    if len(row) != 8:
+        raise ValueError(f"FEN rank {rank!r} does not have 8 squares")
+    key = 0
+    score = 0
+    counts = 0
+    for c, piece in enumerate(row):
+        if piece != "--":
+            key ^= ZOBRIST_PIECES[piece][r*8 + c]
+            score += PSQT[piece][r*8 + c]
+            counts += 1 << COUNT_SHIFTS[piece]
+    return row, key, whiteKingCol, blackKingCol, counts, score
+
+@lru_cache(maxsize=FEN_PLACEMENT_CACHE_SIZE)
+def _parseFENPlacement(placement):
+    # Returns (rows, Zobrist key of the pieces, white king square, black king square, piece counts, evaluation table
+    # sum). Rows and counts are shared with the cache: copy them before changing them.
+    ranks = placement.split('/')
+    if len(ranks) != 8:
+        raise ValueError(f"FEN needs 8 ranks: {placement!r}")
+    rows = []
+    key = 0
+    whiteKing = blackKing = None
+    counts = 0
+    psqt = 0
+    r = 0
+    for rank in ranks:
+        parsed = _parseFENRank(rank, r)
+        rows.append(parsed[0])
+        key ^= parsed[1]
+        psqt += parsed[5]
+        counts += parsed[4]
+        if parsed[2] >= 0:
+            whiteKing = (r, parsed[2])
+        if parsed[3] >= 0:
+            blackKing = (r, parsed[3])
+        r += 1
+    if whiteKing is None or blackKing is None:
+        raise ValueError(f"FEN needs both kings: {placement!r}")
+    return rows, key, whiteKing, blackKing, _unpackCounts(counts), psqt
+
+@lru_cache(maxsize=FEN_PLACEMENT_CACHE_SIZE)
+def _unpackCounts(packed):
+    # Shared with the cache, like the placement it came from; material signatures repeat far more than placements
+    mask = (1 << COUNT_BITS) - 1
+    return {piece: packed >> shift & mask for piece, shift in COUNT_SHIFTS.items()}
+
+@lru_cache(maxsize=64)
+def _parseFENCastle(field):
+    return ((WKS if 'K' in field else 0) | (WQS if 'Q' in field else 0) |
+            (BKS if 'k' in field else 0) | (BQS if 'q' in field else 0))
+
+@lru_cache(maxsize=FEN_RANK_CACHE_SIZE)
+def _fenRankString(row):
+    # row: a board row as a tuple
+    text = ""
+    empty = 0
+    for piece in row:
+        if piece == "--":
+            empty += 1
+            continue
+        if empty:
+            text += str(empty)
+            empty = 0
+        text += FEN_CHARS[piece]
+    if empty:
+        text += str(empty)
+    return text
+
+# Compact position snapshots: one byte per square (0 empty, else 1 + index in PIECES) and one packed int.
+# flags bits: 0 white to move, 1-8 the low byte of the irreversible state (castle rights, en passant file + 1),
+# 9-24 halfmove clock, 25+ fullmove number. counts holds one byte per entry of PIECES (recounting the board costs more
+# than storing them), key is the Zobrist key, ply the length of the move log when the snapshot was taken.
+PositionSnapshot = namedtuple("PositionSnapshot", ["board", "flags", "counts", "key", "ply"])
+SNAPSHOT_CODES = {piece: i + 1 for i, piece in enumerate(PIECES)}
+SNAPSHOT_CODES["--"] = 0
+SNAPSHOT_PIECES = ["--"] + PIECES
+
+@lru_cache(maxsize=FEN_RANK_CACHE_SIZE)
+def _snapshotRow(row):
+    # row: a board row as a tuple
+    return bytes([SNAPSHOT_CODES[piece] for piece in row])
+
+@lru_cache(maxsize=FEN_RANK_CACHE_SIZE)
+def _snapshotRowList(codes):
+    return [SNAPSHOT_PIECES[code] for code in codes]
+
+def _boardFromSnapshot(data):
+    return [_snapshotRowList(data[i:i + 8])[:] for i in range(0, 64, 8)]
+
+def clearCaches():
+    # Empties the FEN and snapshot row caches, e.g. after a large batch load
+    for cache in (_parseFENRank, _parseFENPlacement, _unpackCounts, _parseFENCastle, _fenRankString, _snapshotRow,
+                  _snapshotRowList):
+        cache.cache_clear()
+
 class GameState():
-    def __init__(self):
-        self.board = [
-            ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
-            ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
-            ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]]
-        self.whiteToMove = True
+    # Opt-in MoveCache shared by any number of states; assign one to an instance to use it
+    moveCache = None
+
+    def __init__(self, fen=START_FEN):
+        self.loadFEN(fen)
+
+    @classmethod
+    def fromFEN(cls, fen):
+        return cls(fen)
+
+    def loadFEN(self, fen):
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"FEN needs at least 4 fields: {fen!r}")
+        rows, key, whiteKing, blackKing, counts, psqt = _parseFENPlacement(fields[0])
+        if fields[1] not in ('w', 'b'):
+            raise ValueError(f"bad side to move in FEN: {fen!r}")
+        self.board = [row[:] for row in rows]
+        # Piece counts by type, kept up to date by makeMove/undoMove (material and insufficient-material checks)
+        self.pieceCounts = counts.copy()
+        # Packed material + piece-square sum (chessEval), kept up to date by makeMove/undoMove
+        self.psqt = psqt
+        self.psqtLog = [psqt]
+        self.whiteToMove = fields[1] == 'w'
+        self.whiteKingLocation = whiteKing
+        self.blackKingLocation = blackKing
+        castle = _parseFENCastle(fields[2])
+        self.castle = castle
+        key ^= ZOBRIST_CASTLE_KEYS[castle]
+        ep = fields[3]
+        if ep == '-':
+            self.enPassantPossible = None
+        else:
+            if len(ep) != 2 or ep[0] not in Move.filesToCols or ep[1] not in ('3', '6'):
+                raise ValueError(f"bad en passant square in FEN: {fen!r}")
+            self.enPassantPossible = (Move.ranksToRows[ep[1]], Move.filesToCols[ep[0]])
+            key ^= ZOBRIST_EP_FILE[self.enPassantPossible[1]]
+        self.halfmoveClock = int(fields[4]) if len(fields) > 4 else 0
+        self.stateLog = [self.packState()]
+        self.fullmoveNumber = int(fields[5]) if len(fields) > 5 else 1
         self.moveLog = []
-        self.moveFunctions = {
-            'p': self.getPawnMoves, 'R': self.getRookMoves, 'N': self.getKnightMoves,
-            'B': self.getBishopMoves, 'Q': self.getQueenMoves, 'K': self.getKingMoves
-        }
-        self.whiteKingLocation = (7, 4)
-        self.blackKingLocation = (0, 4)
-        self.enPassantPossible = None
-        self.castleRights = {'wks': True, 'wqs': True, 'bks': True, 'bqs': True}
-        self.castleRightsLog = [self.castleRights.copy()]
+        if not self.whiteToMove:
+            key ^= ZOBRIST_SIDE
+        self.zobristKey = key
+        self.zobristLog = [key]
+        self.keyCounts = {key: 1}
+
+    @classmethod
+    def fromSnapshot(cls, snapshot, history=()):
+        # history: Zobrist keys of earlier positions, so repetitions across the hand-off are still seen
+        gs = cls.__new__(cls)
+        gs.restore(snapshot, rewind=False)
+        for key in history:
+            gs.keyCounts[key] = gs.keyCounts.get(key, 0) + 1
+        return gs
+
+    def snapshot(self):
+        board = b"".join([_snapshotRow(tuple(row)) for row in self.board])
+        flags = (self.whiteToMove | (self.stateLog[-1] & 0xFF) << 1 | min(self.halfmoveClock, 0xFFFF) << 9 |
+                 self.fullmoveNumber << 25)
+        counts = self.pieceCounts
+        return PositionSnapshot(board, flags, bytes([counts[piece] for piece in PIECES]), self.zobristKey,
+                                len(self.moveLog))
+
+    def restore(self, snapshot, rewind=True):
+        # Copy-make: put back a position taken with snapshot(). If it is an ancestor of the current position the move
+        # history is rewound to it (as that many undoMove calls would), otherwise the history starts over from it.
+        board, flags, counts, key, ply = snapshot
+        moveLog = self.moveLog if rewind else ()
+        if ply <= len(moveLog) and rewind and self.zobristLog[ply] == key:
+            keyCounts = self.keyCounts
+            for stale in self.zobristLog[ply + 1:]:
+                keyCounts[stale] -= 1
+            del moveLog[ply:], self.zobristLog[ply + 1:], self.stateLog[ply + 1:], self.psqtLog[ply + 1:]
+            self.board = _boardFromSnapshot(board)
+        else:
+            self.moveLog = []
+            self.zobristLog = [key]
+            self.keyCounts = {key: 1}
+            self.stateLog = [(flags >> 1 & 0xFF) | (flags >> 9 & 0xFFFF) << STATE_HALFMOVE_SHIFT]
+            self.board = _boardFromSnapshot(board)
+            self.psqtLog = [boardScore(self.board)]
+        self.psqt = self.psqtLog[-1]
+        self.pieceCounts = dict(zip(PIECES, counts))
+        self.whiteKingLocation = divmod(board.index(SNAPSHOT_CODES['wK']), 8)
+        self.blackKingLocation = divmod(board.index(SNAPSHOT_CODES['bK']), 8)
+        self.whiteToMove = bool(flags & 1)
+        self.unpackState(self.stateLog[-1])
+        self.fullmoveNumber = flags >> 25
+        self.zobristKey = key
+
+    @property
+    def castleRights(self):
+        # Read-only view of the castle bits, for callers written against the old dict
+        castle = self.castle
+        return {'wks': bool(castle & WKS), 'wqs': bool(castle & WQS),
+                'bks': bool(castle & BKS), 'bqs': bool(castle & BQS)}
+
+    def packState(self):
+        ep = self.enPassantPossible
+        return self.castle | (ep[1] + 1 if ep else 0) << STATE_EP_SHIFT | self.halfmoveClock << STATE_HALFMOVE_SHIFT
+
+    def unpackState(self, state):
+        # The en passant rank follows from the side to move, so set whiteToMove first
+        self.castle = state & 15
+        epFile = state >> STATE_EP_SHIFT & 15
+        self.enPassantPossible = ((2 if self.whiteToMove else 5), epFile - 1) if epFile else None
+        self.halfmoveClock = state >> STATE_HALFMOVE_SHIFT
+
+    def toFEN(self):
+        placement = "/".join([_fenRankString(tuple(row)) for row in self.board])
+        castle = "".join(ch for ch, bit in (('K', WKS), ('Q', WQS), ('k', BKS), ('q', BQS)) if self.castle & bit) or '-'
+        if self.enPassantPossible:
+            r, c = self.enPassantPossible
+            ep = Move.colsToFiles[c] + Move.rowsToRanks[r]
+        else:
+            ep = '-'
+        side = 'w' if self.whiteToMove else 'b'
+        return f"{placement} {side} {castle} {ep} {self.halfmoveClock} {self.fullmoveNumber}"
 
     def makeMove(self, move):
+        oldEnPassant = self.enPassantPossible
+        oldCastle = self.castle
         self.board[move.startRow][move.startCol] = "--"
         if move.isEnPassantMove:
             self.board[move.startRow][move.endCol] = "--"
@@ -39,16 +311,69 @@ class GameState():
             else:
                 self.board[move.endRow][3] = self.board[move.endRow][0]
                 self.board[move.endRow][0] = "--"
+        if move.pieceCaptured != "--":
+            self.pieceCounts[move.pieceCaptured] -= 1
         if move.isPawnPromotion:
-            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + 'Q'
+            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + move.promotionChoice
+            self.pieceCounts[move.pieceMoved] -= 1
+            self.pieceCounts[move.pieceMoved[0] + move.promotionChoice] += 1
+        state = oldCastle & CASTLE_MASK[move.startRow*8 + move.startCol] & CASTLE_MASK[move.endRow*8 + move.endCol]
+        self.castle = state
         if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:
             self.enPassantPossible = ((move.startRow + move.endRow)//2, move.startCol)
+            state |= (move.startCol + 1) << STATE_EP_SHIFT
         else:
             self.enPassantPossible = None
-        self.updateCastleRights(move)
-        self.castleRightsLog.append(self.castleRights.copy())
+        if move.pieceMoved[1] == 'p' or move.pieceCaptured != "--":
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+            state |= self.halfmoveClock << STATE_HALFMOVE_SHIFT
+        self.stateLog.append(state)
+        if not self.whiteToMove:
+            self.fullmoveNumber += 1
         self.moveLog.append(move)
         self.whiteToMove = not self.whiteToMove
+        self.updatePositionKey(move, oldEnPassant, oldCastle)
+        self.updateScore(move)
+
+    def updateScore(self, move):
+        # Same squares as the key update: the mover leaves its start square, the (possibly promoted) piece lands
+        start = move.startRow*8 + move.startCol
+        end = move.endRow*8 + move.endCol
+        score = self.psqt - PSQT[move.pieceMoved][start] + PSQT[self.board[move.endRow][move.endCol]][end]
+        if move.isEnPassantMove:
+            score -= PSQT[move.pieceCaptured][move.startRow*8 + move.endCol]
+        elif move.pieceCaptured != "--":
+            score -= PSQT[move.pieceCaptured][end]
+        if move.isCastleMove:
+            rook = PSQT[move.pieceMoved[0] + 'R']
+            rookFrom, rookTo = (7, 5) if move.endCol == 6 else (0, 3)
+            score += rook[move.endRow*8 + rookTo] - rook[move.endRow*8 + rookFrom]
+        self.psqt = score
+        self.psqtLog.append(score)
+
+    def updatePositionKey(self, move, oldEnPassant, oldCastle):
+        key = self.zobristKey ^ ZOBRIST_SIDE
+        end = move.endRow*8 + move.endCol
+        key ^= ZOBRIST_PIECES[move.pieceMoved][move.startRow*8 + move.startCol]
+        key ^= ZOBRIST_PIECES[self.board[move.endRow][move.endCol]][end]
+        if move.isEnPassantMove:
+            key ^= ZOBRIST_PIECES[move.pieceCaptured][move.startRow*8 + move.endCol]
+        elif move.pieceCaptured != "--":
+            key ^= ZOBRIST_PIECES[move.pieceCaptured][end]
+        if move.isCastleMove:
+            rook = move.pieceMoved[0] + 'R'
+            rookFrom, rookTo = (7, 5) if move.endCol == 6 else (0, 3)
+            key ^= ZOBRIST_PIECES[rook][move.endRow*8 + rookFrom] ^ ZOBRIST_PIECES[rook][move.endRow*8 + rookTo]
+        if oldEnPassant:
+            key ^= ZOBRIST_EP_FILE[oldEnPassant[1]]
+        if self.enPassantPossible:
+            key ^= ZOBRIST_EP_FILE[self.enPassantPossible[1]]
+        key ^= ZOBRIST_CASTLE_KEYS[oldCastle ^ self.castle]
+        self.zobristKey = key
+        self.zobristLog.append(key)
+        self.keyCounts[key] = self.keyCounts.get(key, 0) + 1
 
     def undoMove(self):
         if len(self.moveLog) == 0:
@@ -56,9 +381,13 @@ class GameState():
         move = self.moveLog.pop()
         self.board[move.startRow][move.startCol] = move.pieceMoved
         moved = move.pieceMoved
+        if move.pieceCaptured != "--":
+            self.pieceCounts[move.pieceCaptured] += 1
         if move.isPawnPromotion:
             moved = moved[0] + 'p'
             self.board[move.startRow][move.startCol] = moved
+            self.pieceCounts[moved] += 1
+            self.pieceCounts[moved[0] + move.promotionChoice] -= 1
         if move.isEnPassantMove:
             self.board[move.endRow][move.endCol] = "--"
             self.board[move.startRow][move.endCol] = move.pieceCaptured
@@ -75,31 +404,320 @@ class GameState():
             else:
                 self.board[move.endRow][0] = self.board[move.endRow][3]
                 self.board[move.endRow][3] = "--"
-        self.castleRightsLog.pop()
-        self.castleRights = self.castleRightsLog[-1].copy()
-        self.enPassantPossible = move.enPassantPossibleBefore
         self.whiteToMove = not self.whiteToMove
+        self.stateLog.pop()
+        self.unpackState(self.stateLog[-1])
+        if not self.whiteToMove:
+            self.fullmoveNumber -= 1
+        key = self.zobristLog.pop()
+        self.keyCounts[key] -= 1
+        self.zobristKey = self.zobristLog[-1]
+        self.psqtLog.pop()
+        self.psqt = self.psqtLog[-1]
+
+    def computePositionKey(self):
+        key = 0
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece != "--":
+                    key ^= ZOBRIST_PIECES[piece][r*8 + c]
+        key ^= ZOBRIST_CASTLE_KEYS[self.castle]
+        if self.enPassantPossible:
+            key ^= ZOBRIST_EP_FILE[self.enPassantPossible[1]]
+        if not self.whiteToMove:
+            key ^= ZOBRIST_SIDE
+        return key
+
+    def resetPositionKey(self):
+        # Start fresh key and score histories from the current position (after setting up a board by hand)
+        self.zobristKey = self.computePositionKey()
+        self.zobristLog = [self.zobristKey]
+        self.keyCounts = {self.zobristKey: 1}
+        self.psqt = boardScore(self.board)
+        self.psqtLog = [self.psqt]
+        self.pieceCounts = dict.fromkeys(PIECES, 0)
+        for row in self.board:
+            for piece in row:
+                if piece != "--":
+                    self.pieceCounts[piece] += 1
+
+    def positionKey(self):
+        return self.zobristKey
+
+    def isRepetition(self, n=3):
+        return self.keyCounts.get(self.zobristKey, 0) >= n
+
+    def setPromotionPiece(self, pieceType):
+        # Replace the promotion just played with one to the chosen piece
+        move = self.moveLog[-1]
+        self.undoMove()
+        chosen = Move((move.startRow, move.startCol), (move.endRow, move.endCol), self.board, promotionChoice=pieceType)
+        chosen.enPassantPossibleBefore = move.enPassantPossibleBefore
+        self.makeMove(chosen)
+
+    def moveFromUCI(self, uci):
+        # Builds the move a UCI string describes in this position; legality is the caller's job
+        # (compare with getValidMoves)
+        startSq = (Move.ranksToRows[uci[1]], Move.filesToCols[uci[0]])
+        endSq = (Move.ranksToRows[uci[3]], Move.filesToCols[uci[2]])
+        piece = self.board[startSq[0]][startSq[1]]
+        isEnPassant = piece[1] == 'p' and startSq[1] != endSq[1] and self.board[endSq[0]][endSq[1]] == "--"
+        isCastle = piece[1] == 'K' and abs(startSq[1] - endSq[1]) == 2
+        move = Move(startSq, endSq, self.board, isEnPassant, isCastle, uci[4].upper() if len(uci) > 4 else 'Q')
+        move.enPassantPossibleBefore = self.enPassantPossible
+        return move
 
     def getValidMoves(self):
+        cache = self.moveCache
+        if cache is None:
+            return self.generateValidMoves()
+        entry = cache.lookup(self.zobristKey)
+        if entry is None:
+            moves = self.generateValidMoves()
+            entry = cache.store(self.zobristKey, moves, self.statusFor(moves))
+        # Callers sort and filter the list they get; the cached one stays untouched
+        return list(entry[0])
+
+    def positionStatus(self):
+        # "checkmate", "stalemate" or None; draws by repetition or the fifty-move rule depend on history,
+        # not the position
+        cache = self.moveCache
+        if cache is not None:
+            entry = cache.lookup(self.zobristKey)
+            if entry is None:
+                # Generate and store here rather than via getValidMoves, which would count a second miss
+                moves = self.generateValidMoves()
+                entry = cache.store(self.zobristKey, moves, self.statusFor(moves))
+            return entry[1]
+        return self.statusFor(self.generateValidMoves())
+
+    def statusFor(self, moves):
+        if moves:
+            return None
+        return "checkmate" if self.isInCheck() else "stalemate"
+
+    def generateValidMoves(self):
+        pins, checks, validSquares = self.legalityContext()
         moves = []
         for r in range(8):
             for c in range(8):
                 piece = self.board[r][c]
                 if piece == "--" or (piece[0] == 'w') != self.whiteToMove:
                     continue
-                self.moveFunctions[piece[1]](r, c, moves)
-        self.addCastleMoves(moves)
+                if len(checks) > 1 and piece[1] != 'K':
+                    continue
+                self.moveFunctions[piece[1]](self, r, c, moves)
+        if not checks:
+            self.addCastleMoves(moves)
         legal = []
         for m in moves:
-            if m.pieceCaptured and (m.pieceCaptured == 'wK' or m.pieceCaptured == 'bK'):
-                continue
-            m.enPassantPossibleBefore = self.enPassantPossible
-            self.makeMove(m)
-            if not self.isInCheck(not self.whiteToMove):
+            if self.isLegalCandidate(m, pins, validSquares):
+                m.enPassantPossibleBefore = self.enPassantPossible
+                legal.append(m)
+        return legal
+
+    def generateCaptures(self, context=None):
+        # Legal captures, en passant and promotions only; the first stage of the search's staged generation and all
+        # quiescence search needs. context: legalityContext() when the caller already has it for this position.
+        pins, checks, validSquares = context or self.legalityContext()
+        moves = []
+        color = 'w' if self.whiteToMove else 'b'
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece[0] != color or (len(checks) > 1 and piece[1] != 'K'):
+                    continue
+                self.captureFunctions[piece[1]](self, r, c, moves)
+        legal = []
+        for m in moves:
+            if self.isLegalCandidate(m, pins, validSquares):
+                m.enPassantPossibleBefore = self.enPassantPossible
+                legal.append(m)
+        return legal
+
+    def generateQuiets(self, context=None):
+        # The legal moves generateCaptures leaves out: non-capturing, non-promoting moves and castling
+        pins, checks, validSquares = context or self.legalityContext()
+        moves = []
+        color = 'w' if self.whiteToMove else 'b'
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece[0] != color or (len(checks) > 1 and piece[1] != 'K'):
+                    continue
+                self.moveFunctions[piece[1]](self, r, c, moves)
+        if not checks:
+            self.addCastleMoves(moves)
+        legal = []
+        for m in moves:
+            if m.pieceCaptured == "--" and not m.isPawnPromotion and self.isLegalCandidate(m, pins, validSquares):
+                m.enPassantPossibleBefore = self.enPassantPossible
                 legal.append(m)
-            self.undoMove()
         return legal
 
+    def movesFrom(self, r, c, context=None):
+        # Legal moves of the piece on (r, c), castling excluded; lets the search check a remembered move cheaply
+        piece = self.board[r][c]
+        if piece == "--" or (piece[0] == 'w') != self.whiteToMove:
+            return []
+        pins, checks, validSquares = context or self.legalityContext()
+        if len(checks) > 1 and piece[1] != 'K':
+            return []
+        moves = []
+        self.moveFunctions[piece[1]](self, r, c, moves)
+        legal = []
+        for m in moves:
+            if self.isLegalCandidate(m, pins, validSquares):
+                m.enPassantPossibleBefore = self.enPassantPossible
+                legal.append(m)
+        return legal
+
+    def hasLegalMove(self):
+        # generateValidMoves that stops at the first legal move. King first: it is the only piece that can move in
+        # double check. Castling is skipped; whenever it is legal, so is the king's step toward the rook.
+        pins, checks, validSquares = self.legalityContext()
+        kingR, kingC = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        moves = []
+        self.getKingMoves(kingR, kingC, moves)
+        for m in moves:
+            if self.isLegalCandidate(m, pins, validSquares):
+                return True
+        if len(checks) > 1:
+            return False
+        color = 'w' if self.whiteToMove else 'b'
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece[0] != color or piece[1] == 'K':
+                    continue
+                moves = []
+                self.moveFunctions[piece[1]](self, r, c, moves)
+                for m in moves:
+                    if self.isLegalCandidate(m, pins, validSquares):
+                        return True
+        return False
+
+    def legalityContext(self):
+        # (pins, checks, squares a non-king move must land on when in single check or None)
+        pins, checks = self.checkForPinsAndChecks()
+        validSquares = None
+        if len(checks) == 1:
+            kingR, kingC = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+            checkR, checkC, dr, dc = checks[0]
+            validSquares = {(checkR, checkC)}
+            if dr or dc:
+                for i in range(1, 8):
+                    sq = (kingR + dr*i, kingC + dc*i)
+                    if sq == (checkR, checkC):
+                        break
+                    validSquares.add(sq)
+        return pins, checks, validSquares
+
+    def isLegalCandidate(self, m, pins, validSquares):
+        if m.pieceCaptured[1] == 'K':
+            return False
+        if m.pieceMoved[1] == 'K':
+            return m.isCastleMove or self.kingMoveSafe(m)
+        if m.isEnPassantMove:
+            return self.enPassantSafe(m)
+        if validSquares is not None and (m.endRow, m.endCol) not in validSquares:
+            return False
+        pin = pins.get((m.startRow, m.startCol))
+        return not pin or (m.endRow - m.startRow)*pin[1] == (m.endCol - m.startCol)*pin[0]
+
+    def insufficientMaterial(self):
+        # Nobody can mate: bare kings, one minor piece, or only bishops and all on one square colour
+        counts = self.pieceCounts
+        if counts['wp'] or counts['bp'] or counts['wR'] or counts['bR'] or counts['wQ'] or counts['bQ']:
+            return False
+        knights = counts['wN'] + counts['bN']
+        bishops = counts['wB'] + counts['bB']
+        if knights + bishops <= 1:
+            return True
+        if knights:
+            return False
+        colors = {(r + c) % 2 for r in range(8) for c in range(8) if self.board[r][c][1] == 'B'}
+        return len(colors) == 1
+
+    def gameStatus(self):
+        # None while the game goes on, else "checkmate", "stalemate", "insufficient", "seventy-five-move" or
+        # "repetition" (fivefold). Mate on the last halfmove still counts as mate, so the position is checked first.
+        if self.moveCache is not None:
+            status = self.positionStatus()
+        elif self.hasLegalMove():
+            status = None
+        else:
+            status = "checkmate" if self.isInCheck() else "stalemate"
+        if status:
+            return status
+        if self.insufficientMaterial():
+            return "insufficient"
+        if self.halfmoveClock >= AUTO_DRAW_HALFMOVES:
+            return "seventy-five-move"
+        if self.isRepetition(AUTO_DRAW_REPETITIONS):
+            return "repetition"
+        return None
+
+    def checkForPinsAndChecks(self):
+        pins = {}
+        checks = []
+        if self.whiteToMove:
+            enemy, ally = 'b', 'w'
+            kingR, kingC = self.whiteKingLocation
+            pawnRow = kingR - 1
+        else:
+            enemy, ally = 'w', 'b'
+            kingR, kingC = self.blackKingLocation
+            pawnRow = kingR + 1
+        directions = [(-1,0),(1,0),(0,-1),(0,1),(-1,-1),(-1,1),(1,-1),(1,1)]
+        for j, (dr, dc) in enumerate(directions):
+            sliders = 'RQ' if j < 4 else 'BQ'
+            possiblePin = None
+            r, c = kingR + dr, kingC + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                piece = self.board[r][c]
+                if piece != "--":
+                    if piece[0] == ally:
+                        if possiblePin is not None:
+                            break
+                        possiblePin = (r, c)
+                    else:
+                        if piece[1] in sliders:
+                            if possiblePin is None:
+                                checks.append((r, c, dr, dc))
+                            else:
+                                pins[possiblePin] = (dr, dc)
+                        break
+                r += dr
+                c += dc
+        for dr, dc in [(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)]:
+            r, c = kingR + dr, kingC + dc
+            if 0 <= r < 8 and 0 <= c < 8 and self.board[r][c] == enemy + 'N':
+                checks.append((r, c, 0, 0))
+        for c in (kingC - 1, kingC + 1):
+            if 0 <= pawnRow < 8 and 0 <= c < 8 and self.board[pawnRow][c] == enemy + 'p':
+                checks.append((pawnRow, c, 0, 0))
+        return pins, checks
+
+    def kingMoveSafe(self, move):
+        self.board[move.startRow][move.startCol] = "--"
+        safe = not self.squareAttacked(move.endRow, move.endCol, byWhite=move.pieceMoved[0] == 'b')
+        self.board[move.startRow][move.startCol] = move.pieceMoved
+        return safe
+
+    def enPassantSafe(self, move):
+        # Both pawns leave their squares, which can uncover a slider along the rank
+        board = self.board
+        board[move.startRow][move.startCol] = "--"
+        board[move.startRow][move.endCol] = "--"
+        board[move.endRow][move.endCol] = move.pieceMoved
+        safe = not self.isInCheck()
+        board[move.endRow][move.endCol] = "--"
+        board[move.startRow][move.endCol] = move.pieceCaptured
+        board[move.startRow][move.startCol] = move.pieceMoved
+        return safe
+
     def squareInBounds(self, r, c):
         return 0 <= r < 8 and 0 <= c < 8
 
@@ -108,7 +726,7 @@ class GameState():
         direction = -1 if piece[0] == 'w' else 1
         startRow = 6 if piece[0] == 'w' else 1
         if self.squareInBounds(r + direction, c) and self.board[r + direction][c] == "--":
-            moves.append(Move((r, c), (r + direction, c), self.board))
+            self.addPawnMove(r, c, r + direction, c, moves)
             if r == startRow and self.board[r + 2*direction][c] == "--":
                 moves.append(Move((r, c), (r + 2*direction, c), self.board))
         for dc in (-1, 1):
@@ -117,14 +735,23 @@ class GameState():
                 continue
             target = self.board[nr][nc]
             if target != "--" and target[0] != piece[0]:
-                moves.append(Move((r, c), (nr, nc), self.board))
+                self.addPawnMove(r, c, nr, nc, moves)
         if self.enPassantPossible:
             ep_r, ep_c = self.enPassantPossible
-            if (r + direction, c - 1) == (ep_r, ep_c) and self.board[r][c-1] != "--" and self.board[r][c-1][0] != piece[0]:
+            if ((r + direction, c - 1) == (ep_r, ep_c) and self.board[r][c-1] != "--" and
+                    self.board[r][c-1][0] != piece[0]):
                 moves.append(Move((r, c), (ep_r, ep_c), self.board, isEnPassant=True))
-            if (r + direction, c + 1) == (ep_r, ep_c) and self.board[r][c+1] != "--" and self.board[r][c+1][0] != piece[0]:
+            if ((r + direction, c + 1) == (ep_r, ep_c) and self.board[r][c+1] != "--" and
+                    self.board[r][c+1][0] != piece[0]):
                 moves.append(Move((r, c), (ep_r, ep_c), self.board, isEnPassant=True))
 
+    def addPawnMove(self, r, c, nr, nc, moves):
+        if nr == 0 or nr == 7:
+            for pieceType in PROMOTION_PIECES:
+                moves.append(Move((r, c), (nr, nc), self.board, promotionChoice=pieceType))
+        else:
+            moves.append(Move((r, c), (nr, nc), self.board))
+
     def getRookMoves(self, r, c, moves):
         self._getSlidingMoves(r, c, moves, [(-1,0),(1,0),(0,-1),(0,1)])
     def getBishopMoves(self, r, c, moves):
@@ -167,6 +794,57 @@ class GameState():
             if target == "--" or target[0] != ownColor:
                 moves.append(Move((r, c), (nr, nc), self.board))
 
+    def getPawnCaptures(self, r, c, moves):
+        # Captures, en passant and promotions by push
+        piece = self.board[r][c]
+        direction = -1 if piece[0] == 'w' else 1
+        nr = r + direction
+        if (nr == 0 or nr == 7) and self.board[nr][c] == "--":
+            self.addPawnMove(r, c, nr, c, moves)
+        for dc in (-1, 1):
+            nc = c + dc
+            if not self.squareInBounds(nr, nc):
+                continue
+            target = self.board[nr][nc]
+            if target != "--" and target[0] != piece[0]:
+                self.addPawnMove(r, c, nr, nc, moves)
+            elif self.enPassantPossible == (nr, nc) and self.board[r][nc] != "--" and self.board[r][nc][0] != piece[0]:
+                moves.append(Move((r, c), (nr, nc), self.board, isEnPassant=True))
+
+    def getRookCaptures(self, r, c, moves):
+        self._getSlidingCaptures(r, c, moves, [(-1,0),(1,0),(0,-1),(0,1)])
+    def getBishopCaptures(self, r, c, moves):
+        self._getSlidingCaptures(r, c, moves, [(-1,-1),(-1,1),(1,-1),(1,1)])
+    def getQueenCaptures(self, r, c, moves):
+        self._getSlidingCaptures(r, c, moves, [(-1,0),(1,0),(0,-1),(0,1),(-1,-1),(-1,1),(1,-1),(1,1)])
+
+    def _getSlidingCaptures(self, r, c, moves, directions):
+        ownColor = self.board[r][c][0]
+        for dr, dc in directions:
+            nr, nc = r + dr, c + dc
+            while self.squareInBounds(nr, nc):
+                target = self.board[nr][nc]
+                if target != "--":
+                    if target[0] != ownColor:
+                        moves.append(Move((r, c), (nr, nc), self.board))
+                    break
+                nr += dr
+                nc += dc
+
+    def getKnightCaptures(self, r, c, moves):
+        self._getStepCaptures(r, c, moves, [(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)])
+    def getKingCaptures(self, r, c, moves):
+        self._getStepCaptures(r, c, moves, [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)])
+
+    def _getStepCaptures(self, r, c, moves, deltas):
+        ownColor = self.board[r][c][0]
+        for dr, dc in deltas:
+            nr, nc = r + dr, c + dc
+            if self.squareInBounds(nr, nc):
+                target = self.board[nr][nc]
+                if target != "--" and target[0] != ownColor:
+                    moves.append(Move((r, c), (nr, nc), self.board))
+
     def isInCheck(self, forWhite=None):
         if forWhite is None:
             forWhite = self.whiteToMove
@@ -175,7 +853,7 @@ class GameState():
 
     def squareAttacked(self, r, c, byWhite):
         attackerColor = 'w' if byWhite else 'b'
-        dr = -1 if byWhite else 1
+        dr = 1 if byWhite else -1
         for dc in (-1, 1):
             rr, cc = r + dr, c + dc
             if self.squareInBounds(rr, cc) and self.board[rr][cc] == attackerColor + 'p':
@@ -214,60 +892,116 @@ class GameState():
         if self.whiteToMove:
             r = 7
             if not self.isInCheck(True):
-                if self.castleRights['wks'] and self.board[r][5] == "--" and self.board[r][6] == "--":
+                if self.castle & WKS and self.board[r][5] == "--" and self.board[r][6] == "--":
                     if not self.squareAttacked(r, 5, byWhite=False) and not self.squareAttacked(r, 6, byWhite=False):
                         moves.append(Move((r,4),(r,6), self.board, isCastle=True))
-                if self.castleRights['wqs'] and self.board[r][1] == "--" and self.board[r][2] == "--" and self.board[r][3] == "--":
+                if (self.castle & WQS and self.board[r][1] == "--" and self.board[r][2] == "--" and
+                        self.board[r][3] == "--"):
                     if not self.squareAttacked(r, 2, byWhite=False) and not self.squareAttacked(r, 3, byWhite=False):
                         moves.append(Move((r,4),(r,2), self.board, isCastle=True))
         else:
             r = 0
             if not self.isInCheck(False):
-                if self.castleRights['bks'] and self.board[r][5] == "--" and self.board[r][6] == "--":
+                if self.castle & BKS and self.board[r][5] == "--" and self.board[r][6] == "--":
                     if not self.squareAttacked(r, 5, byWhite=True) and not self.squareAttacked(r, 6, byWhite=True):
                         moves.append(Move((r,4),(r,6), self.board, isCastle=True))
-                if self.castleRights['bqs'] and self.board[r][1] == "--" and self.board[r][2] == "--" and self.board[r][3] == "--":
+                if (self.castle & BQS and self.board[r][1] == "--" and self.board[r][2] == "--" and
+                        self.board[r][3] == "--"):
                     if not self.squareAttacked(r, 2, byWhite=True) and not self.squareAttacked(r, 3, byWhite=True):
                         moves.append(Move((r,4),(r,2), self.board, isCastle=True))
 
-    def updateCastleRights(self, move):
-        if move.pieceMoved == 'wK':
-            self.castleRights['wks'] = self.castleRights['wqs'] = False
-        elif move.pieceMoved == 'bK':
-            self.castleRights['bks'] = self.castleRights['bqs'] = False
-        elif move.pieceMoved == 'wR':
-            if move.startRow == 7 and move.startCol == 0: self.castleRights['wqs'] = False
-            elif move.startRow == 7 and move.startCol == 7: self.castleRights['wks'] = False
-        elif move.pieceMoved == 'bR':
-            if move.startRow == 0 and move.startCol == 0: self.castleRights['bqs'] = False
-            elif move.startRow == 0 and move.startCol == 7: self.castleRights['bks'] = False
-        if move.pieceCaptured == 'wR' and move.endRow == 7 and move.endCol == 0: self.castleRights['wqs'] = False
-        if move.pieceCaptured == 'wR' and move.endRow == 7 and move.endCol == 7: self.castleRights['wks'] = False
-        if move.pieceCaptured == 'bR' and move.endRow == 0 and move.endCol == 0: self.castleRights['bqs'] = False
-        if move.pieceCaptured == 'bR' and move.endRow == 0 and move.endCol == 7: self.castleRights['bks'] = False
+    # Plain functions (not bound methods) so a GameState holds no reference cycle and is freed immediately
+    moveFunctions = {
+        'p': getPawnMoves, 'R': getRookMoves, 'N': getKnightMoves,
+        'B': getBishopMoves, 'Q': getQueenMoves, 'K': getKingMoves
+    }
+    captureFunctions = {
+        'p': getPawnCaptures, 'R': getRookCaptures, 'N': getKnightCaptures,
+        'B': getBishopCaptures, 'Q': getQueenCaptures, 'K': getKingCaptures
+    }
+
+class MoveCache():
+    # LRU of legal move lists and checkmate/stalemate status by Zobrist key. The key covers the side to move, castling
+    # rights and the en passant file, so positions that differ only in those never share an entry. Cached Move objects
+    # are never modified by makeMove/undoMove, so one entry can serve every GameState (and thread) in the process.
+    def __init__(self, maxEntries=100000):
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def store(self, key, moves, status):
+        entry = (moves, status)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def resize(self, maxEntries):
+        with self.lock:
+            self.maxEntries = maxEntries
+            while len(self.entries) > maxEntries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def hitRate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"entries": len(self.entries), "maxEntries": self.maxEntries, "hits": self.hits,
+                "misses": self.misses, "hitRate": self.hitRate()}
 
 class Move():
+    # Fixed attribute set: no per-instance __dict__, the generator allocates many of these per position
+    __slots__ = ('startRow', 'startCol', 'endRow', 'endCol', 'pieceMoved', 'pieceCaptured', 'isEnPassantMove',
+                 'isCastleMove', 'isPawnPromotion', 'promotionChoice', 'enPassantPossibleBefore')
     ranksToRows = {"1": 7, "2": 6, "3": 5, "4": 4, "5": 3, "6": 2, "7": 1, "8": 0}
     rowsToRanks = {v: k for k, v in ranksToRows.items()}
     filesToCols = {"a": 0, "b": 1, "c": 2, "d": 3, "e": 4, "f": 5, "g": 6, "h": 7}
     colsToFiles = {v: k for k, v in filesToCols.items()}
 
-    def __init__(self, startSq, endSq, board, isEnPassant=False, isCastle=False):
-        self.startRow, self.startCol = startSq[0], startSq[1]
-        self.endRow, self.endCol = endSq[0], endSq[1]
-        self.pieceMoved = board[self.startRow][self.startCol]
-        self.pieceCaptured = board[self.endRow][self.endCol]
+    def __init__(self, startSq, endSq, board, isEnPassant=False, isCastle=False, promotionChoice='Q'):
+        self.startRow, self.startCol = startRow, startCol = startSq
+        self.endRow, self.endCol = endRow, endCol = endSq
+        self.pieceMoved = pieceMoved = board[startRow][startCol]
         self.isEnPassantMove = isEnPassant
-        if self.isEnPassantMove:
-            self.pieceCaptured = 'bp' if self.pieceMoved[0] == 'w' else 'wp'
+        if isEnPassant:
+            self.pieceCaptured = 'bp' if pieceMoved[0] == 'w' else 'wp'
+        else:
+            self.pieceCaptured = board[endRow][endCol]
         self.isCastleMove = isCastle
-        self.isPawnPromotion = (self.pieceMoved[1] == 'p' and (self.endRow == 0 or self.endRow == 7))
+        self.isPawnPromotion = pieceMoved[1] == 'p' and (endRow == 0 or endRow == 7)
+        self.promotionChoice = promotionChoice
         self.enPassantPossibleBefore = None
 
     def getChessNotation(self):
-        return self.colsToFiles[self.startCol] + self.rowsToRanks[self.startRow] + self.colsToFiles[self.endCol] + self.rowsToRanks[self.endRow]
+        return (self.colsToFiles[self.startCol] + self.rowsToRanks[self.startRow] +
+                self.colsToFiles[self.endCol] + self.rowsToRanks[self.endRow])
+
+    def getUCINotation(self):
+        return self.getChessNotation() + (self.promotionChoice.lower() if self.isPawnPromotion else "")
 
     def __eq__(self, other):
         if not isinstance(other, Move):
             return False
-        return (self.startRow, self.startCol, self.endRow, self.endCol) == (other.startRow, other.startCol, other.endRow, other.endCol)
+        return ((self.startRow, self.startCol, self.endRow, self.endCol, self.promotionChoice) ==
+                (other.startRow, other.startCol, other.endRow, other.endCol, other.promotionChoice))
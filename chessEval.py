@@ -0,0 +1,265 @@
+# Static evaluation: material plus tapered middlegame/endgame piece-square tables (PeSTO values).
+# GameState keeps the table sum up to date in makeMove/undoMove, so evaluate() is O(1); evaluateBatch() scores many
+# packed boards at once with NumPy.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MG_VALUES = {'p': 82, 'N': 337, 'B': 365, 'R': 477, 'Q': 1025, 'K': 0}
+EG_VALUES = {'p': 94, 'N': 281, 'B': 297, 'R': 512, 'Q': 936, 'K': 0}
+# Game phase: 24 with all minor and major pieces on the board, 0 with only kings and pawns
+PHASE_WEIGHTS = {'p': 0, 'N': 1, 'B': 1, 'R': 2, 'Q': 4, 'K': 0}
+TOTAL_PHASE = 24
+
+# Square bonuses from White's side, a8 first (index r*8 + c as on GameState.board); Black uses the mirrored square
+MG_TABLES = {
+    'p': [0, 0, 0, 0, 0, 0, 0, 0,
+          98, 134, 61, 95, 68, 126, 34, -11,
+          -6, 7, 26, 31, 65, 56, 25, -20,
+          -14, 13, 6, 21, 23, 12, 17, -23,
+          -27, -2, -5, 12, 17, 6, 10, -25,
+          -26, -4, -4, -10, 3, 3, 33, -12,
+          -35, -1, -20, -23, -15, 24, 38, -22,
+          0, 0, 0, 0, 0, 0, 0, 0],
+    'N': [-167, -89, -34, -49, 61, -97, -15, -107,
+          -73, -41, 72, 36, 23, 62, 7, -17,
+          -47, 60, 37, 65, 84, 129, 73, 44,
+          -9, 17, 19, 53, 37, 69, 18, 22,
+          -13, 4, 16, 13, 28, 19, 21, -8,
+          -23, -9, 12, 10, 19, 17, 25, -16,
+          -29, -53, -12, -3, -1, 18, -14, -19,
+          -105, -21, -58, -33, -17, -28, -19, -23],
+    'B': [-29, 4, -82, -37, -25, -42, 7, -8,
+          -26, 16, -18, -13, 30, 59, 18, -47,
+          -16, 37, 43, 40, 35, 50, 37, -2,
+          -4, 5, 19, 50, 37, 37, 7, -2,
+          -6, 13, 13, 26, 34, 12, 10, 4,
+          0, 15, 15, 15, 14, 27, 18, 10,
+          4, 15, 16, 0, 7, 21, 33, 1,
+          -33, -3, -14, -21, -13, -12, -39, -21],
+    'R': [32, 42, 32, 51, 63, 9, 31, 43,
+          27, 32, 58, 62, 80, 67, 26, 44,
+          -5, 19, 26, 36, 17, 45, 61, 16,
+          -24, -11, 7, 26, 24, 35, -8, -20,
+          -36, -26, -12, -1, 9, -7, 6, -23,
+          -45, -25, -16, -17, 3, 0, -5, -33,
+          -44, -16, -20, -9, -1, 11, -6, -71,
+          -19, -13, 1, 17, 16, 7, -37, -26],
+    'Q': [-28, 0, 29, 12, 59, 44, 43, 45,
+          -24, -39, -5, 1, -16, 57, 28, 54,
+          -13, -17, 7, 8, 29, 56, 47, 57,
+          -27, -27, -16, -16, -1, 17, -2, 1,
+          -9, -26, -9, -10, -2, -4, 3, -3,
+          -14, 2, -11, -2, -5, 2, 14, 5,
+          -35, -8, 11, 2, 8, 15, -3, 1,
+          -1, -18, -9, 10, -15, -25, -31, -50],
+    'K': [-65, 23, 16, -15, -56, -34, 2, 13,
+          29, -1, -20, -7, -8, -4, -38, -29,
+          -9, 24, 2, -16, -20, 6, 22, -22,
+          -17, -20, -12, -27, -30, -25, -14, -36,
+          -49, -1, -27, -39, -46, -44, -33, -51,
+          -14, -14, -22, -46, -44, -30, -15, -27,
+          1, 7, -8, -64, -43, -16, 9, 8,
+          -15, 36, 12, -54, 8, -28, 24, 14],
+}
+EG_TABLES = {
+    'p': [0, 0, 0, 0, 0, 0, 0, 0,
+          178, 173, 158, 134, 147, 132, 165, 187,
+          94, 100, 85, 67, 56, 53, 82, 84,
+          32, 24, 13, 5, -2, 4, 17, 17,
+          13, 9, -3, -7, -7, -8, 3, -1,
+          4, 7, -6, 1, 0, -5, -1, -8,
+          13, 8, 8, 10, 13, 0, 2, -7,
+          0, 0, 0, 0, 0, 0, 0, 0],
+    'N': [-58, -38, -13, -28, -31, -27, -63, -99,
+          -25, -8, -25, -2, -9, -25, -24, -52,
+          -24, -20, 10, 9, -1, -9, -19, -41,
+          -17, 3, 22, 22, 22, 11, 8, -18,
+          -18, -6, 16, 25, 16, 17, 4, -18,
+          -23, -3, -1, 15, 10, -3, -20, -22,
+          -42, -20, -10, -5, -2, -20, -23, -44,
+          -29, -51, -23, -15, -22, -18, -50, -64],
+    'B': [-14, -21, -11, -8, -7, -9, -17, -24,
+          -8, -4, 7, -12, -3, -13, -4, -14,
+          2, -8, 0, -1, -2, 6, 0, 4,
+          -3, 9, 12, 9, 14, 10, 3, 2,
+          -6, 3, 13, 19, 7, 10, -3, -9,
+          -12, -3, 8, 10, 13, 3, -7, -15,
+          -14, -18, -7, -1, 4, -9, -15, -27,
+          -23, -9, -23, -5, -9, -16, -5, -17],
+    'R': [13, 10, 18, 15, 12, 12, 8, 5,
+          11, 13, 13, 11, -3, 3, 8, 3,
+          7, 7, 7, 5, 4, -3, -5, -3,
+          4, 3, 13, 1, 2, 1, -1, 2,
+          3, 5, 8, 4, -5, -6, -8, -11,
+          -4, 0, -5, -1, -7, -12, -8, -16,
+          -6, -6, 0, 2, -9, -9, -11, -3,
+          -9, 2, 3, -1, -5, -13, 4, -20],
+    'Q': [-9, 22, 22, 27, 27, 19, 10, 20,
+          -17, 20, 32, 41, 58, 25, 30, 0,
+          -20, 6, 9, 49, 47, 35, 19, 9,
+          3, 22, 24, 45, 57, 40, 57, 36,
+          -18, 28, 19, 47, 31, 34, 39, 23,
+          -16, -27, 15, 6, 9, 17, 10, 5,
+          -22, -23, -30, -16, -16, -23, -36, -32,
+          -33, -28, -22, -43, -5, -32, -20, -41],
+    'K': [-74, -35, -18, -18, -11, 15, 4, -17,
+          -12, 17, 14, 17, 17, 38, 23, 11,
+          10, 17, 23, 15, 20, 45, 44, 13,
+          -8, 22, 24, 27, 26, 33, 26, 3,
+          -18, -4, 21, 24, 27, 23, 9, -11,
+          -19, -3, 11, 21, 23, 16, 7, -9,
+          -27, -11, 4, 13, 14, 4, -5, -17,
+          -53, -34, -21, -11, -28, -14, -24, -43],
+}
+
+# One int per piece and square: mg + eg << 20 + phase weight << 40, White positive and Black negative (the phase
+# weight is positive for both). Sums of these stay decodable with unpackScore, so a position's whole evaluation is one
+# running int that makeMove/undoMove adjust with a few additions.
+SCORE_SHIFT = 20
+PHASE_SHIFT = 40
+_HALF = 1 << (SCORE_SHIFT - 1)
+_MASK = (1 << SCORE_SHIFT) - 1
+
+def packScore(mg, eg, phase=0):
+    return mg + (eg << SCORE_SHIFT) + (phase << PHASE_SHIFT)
+
+def unpackScore(packed):
+    mg = ((packed + _HALF) & _MASK) - _HALF
+    packed = (packed - mg) >> SCORE_SHIFT
+    eg = ((packed + _HALF) & _MASK) - _HALF
+    return mg, eg, (packed - eg) >> SCORE_SHIFT
+
+def _pieceTable(piece):
+    kind = piece[1]
+    table = []
+    for sq in range(64):
+        source = sq if piece[0] == 'w' else sq ^ 56
+        mg = MG_VALUES[kind] + MG_TABLES[kind][source]
+        eg = EG_VALUES[kind] + EG_TABLES[kind][source]
+        if piece[0] == 'b':
+            mg, eg = -mg, -eg
+        table.append(packScore(mg, eg, PHASE_WEIGHTS[kind]))
+    return table
+
+PSQT = {color + kind: _pieceTable(color + kind) for color in 'wb' for kind in 'pNBRQK'}
+# Indexing with "--" adds nothing, so callers don't need to test for empty squares
+PSQT["--"] = [0]*64
+
+def boardScore(board):
+    # Packed table sum of a whole board; GameState calls this when it cannot update incrementally
+    total = 0
+    for r, row in enumerate(board):
+        for c, piece in enumerate(row):
+            total += PSQT[piece][r*8 + c]
+    return total
+
+def taper(packed):
+    # Centipawns from White's side
+    mg, eg, phase = unpackScore(packed)
+    phase = min(phase, TOTAL_PHASE)
+    return (mg*phase + eg*(TOTAL_PHASE - phase)) // TOTAL_PHASE
+
+def evaluate(gs):
+    # Centipawns from the side to move's point of view
+    score = taper(gs.psqt)
+    return score if gs.whiteToMove else -score
+
+# Batch mode: boards packed as uint8 rows of 64 square codes, the layout of GameState.snapshot().board
+# (0 empty, else 1 + index in chessEngine.PIECES)
+BATCH_CHUNK = 1 << 16
+_batchTables = None
+_fenRankCodes = {}
+
+def _requireNumpy():
+    if np is None:
+        raise ImportError("batch evaluation needs NumPy (pip install numpy)")
+
+def _loadBatchTables():
+    # chessEngine imports this module for PSQT, so its names are only looked up once both are loaded
+    global _batchTables
+    from chessEngine import SNAPSHOT_PIECES
+    mg = np.zeros((len(SNAPSHOT_PIECES), 64), dtype=np.int32)
+    eg = np.zeros_like(mg)
+    phase = np.zeros(len(SNAPSHOT_PIECES), dtype=np.int32)
+    for code, piece in enumerate(SNAPSHOT_PIECES):
+        for sq, packed in enumerate(PSQT[piece]):
+            mg[code, sq], eg[code, sq], phase[code] = unpackScore(packed)
+    # Flattened so one np.take gathers code*64 + square for a whole chunk
+    _batchTables = (mg.ravel(), eg.ravel(), phase)
+    return _batchTables
+
+def packBoards(states):
+    # (N, 64) uint8 array from GameStates
+    _requireNumpy()
+    data = b"".join([gs.snapshot().board for gs in states])
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, 64)
+
+def packFENs(fens):
+    # (N, 64) uint8 boards and an (N,) bool side-to-move array straight from FEN strings, without building GameStates
+    _requireNumpy()
+    from chessEngine import FEN_PIECES, SNAPSHOT_CODES
+    rows = []
+    sides = []
+    for fen in fens:
+        fields = fen.split()
+        for rank in fields[0].split('/'):
+            codes = _fenRankCodes.get(rank)
+            if codes is None:
+                codes = bytearray()
+                for ch in rank:
+                    if ch in '12345678':
+                        codes.extend(bytes(int(ch)))
+                    else:
+                        codes.append(SNAPSHOT_CODES[FEN_PIECES[ch]])
+                if len(codes) != 8:
+                    raise ValueError(f"FEN rank {rank!r} does not have 8 squares")
+                codes = _fenRankCodes[rank] = bytes(codes)
+            rows.append(codes)
+        sides.append(len(fields) < 2 or fields[1] == 'w')
+    boards = np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(-1, 64)
+    if len(boards) != len(sides):
+        raise ValueError("every FEN needs 8 ranks")
+    return boards, np.array(sides, dtype=bool)
+
+def evaluateBatch(boards, whiteToMove=None):
+    # Scores for an (N, 64) array of square codes: White's view, or the side to move's when whiteToMove is given
+    _requireNumpy()
+    mgTable, egTable, phaseTable = _batchTables or _loadBatchTables()
+    boards = np.asarray(boards, dtype=np.uint8).reshape(-1, 64)
+    scores = np.empty(len(boards), dtype=np.int32)
+    offsets = np.arange(64, dtype=np.int32)
+    # Chunked so the gathered (chunk, 64) temporaries stay small however many boards come in
+    for start in range(0, len(boards), BATCH_CHUNK):
+        chunk = boards[start:start + BATCH_CHUNK]
+        index = chunk.astype(np.int32) * 64 + offsets
+        mg = np.take(mgTable, index).sum(axis=1)
+        eg = np.take(egTable, index).sum(axis=1)
+        phase = np.minimum(np.take(phaseTable, chunk).sum(axis=1), TOTAL_PHASE)
+        scores[start:start + len(chunk)] = (mg*phase + eg*(TOTAL_PHASE - phase)) // TOTAL_PHASE
+    if whiteToMove is not None:
+        scores = np.where(whiteToMove, scores, -scores)
+    return scores
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    parser = argparse.ArgumentParser(description="Batch-evaluate FENs (one per line) with NumPy")
+    parser.add_argument("path", help="file of FEN strings, - for stdin")
+    parser.add_argument("--quiet", action="store_true", help="only print the timing summary")
+    args = parser.parse_args()
+    source = sys.stdin if args.path == "-" else open(args.path)
+    with source:
+        fens = [line.strip() for line in source if line.strip()]
+    start = time.perf_counter()
+    boards, sides = packFENs(fens)
+    scores = evaluateBatch(boards, sides)
+    seconds = time.perf_counter() - start
+    if not args.quiet:
+        for fen, score in zip(fens, scores):
+            print(f"{score}\t{fen}")
+    print(f"{len(fens)} positions in {seconds:.3f}s ({int(len(fens) / seconds) if seconds > 0 else 0} positions/s)",
+          file=sys.stderr)
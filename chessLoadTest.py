@@ -0,0 +1,157 @@
+# Load test for chessServer: N concurrent games spread over a few connections, each side played by the client
+# with random legal moves. Reports move-ack latency percentiles (send -> ack) and overall move throughput.
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import sys
+import os
+import time
+
+CONNECT_TIMEOUT = 30
+
+class LoadClient():
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.updates = {}
+
+    async def request(self, message):
+        requestId = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[requestId] = future
+        self.writer.write((json.dumps(dict(message, id=requestId)) + "\n").encode())
+        return await future
+
+    def updatesFor(self, gameId):
+        if gameId not in self.updates:
+            self.updates[gameId] = asyncio.Queue()
+        return self.updates[gameId]
+
+    async def readLoop(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message["type"] == "update":
+                self.updatesFor(message["game"]).put_nowait(message)
+            elif message.get("id") in self.pending:
+                self.pending.pop(message["id"]).set_result(message)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("server closed the connection"))
+
+async def playGame(client, movesPerGame, rng, latencies, barrier):
+    created = await client.request({"op": "new", "base": 3600, "inc": 0, "side": "both"})
+    updates = client.updatesFor(created["game"])
+    update = await updates.get()
+    await barrier.wait()
+    played = 0
+    while played < movesPerGame and update["status"] == "ongoing":
+        start = time.perf_counter()
+        reply = await client.request({"op": "move", "game": created["game"], "move": rng.choice(update["legal"])})
+        latencies.append(time.perf_counter() - start)
+        if reply["type"] != "ack":
+            raise RuntimeError(f"move rejected: {reply}")
+        played += 1
+        update = await updates.get()
+    return played
+
+async def runLoad(host, port, games, movesPerGame, connections, seed):
+    clients = []
+    readers = []
+    for _ in range(min(connections, games)):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, limit=1 << 20), CONNECT_TIMEOUT)
+        client = LoadClient(reader, writer)
+        clients.append(client)
+        readers.append(asyncio.create_task(client.readLoop()))
+    latencies = []
+    rng = random.Random(seed)
+    # All games are created before any of them starts moving, so the server really holds `games` at once
+    barrier = Barrier(games)
+    start = time.perf_counter()
+    played = await asyncio.gather(*(playGame(clients[i % len(clients)], movesPerGame, random.Random(rng.random()),
+                                             latencies, barrier) for i in range(games)))
+    seconds = time.perf_counter() - start
+    # Close our side and let the server see EOF on every connection before it is shut down
+    for client in clients:
+        client.writer.write_eof()
+    await asyncio.wait_for(asyncio.gather(*readers), CONNECT_TIMEOUT)
+    for client in clients:
+        client.writer.close()
+    latencies.sort()
+    ms = [x * 1000 for x in latencies]
+    return {"games": games, "connections": len(clients), "moves": sum(played), "seconds": round(seconds, 3),
+            "movesPerSecond": round(sum(played) / seconds, 1) if seconds > 0 else 0,
+            "p50Ms": round(percentile(ms, 50), 3), "p99Ms": round(percentile(ms, 99), 3),
+            "maxMs": round(ms[-1], 3) if ms else 0, "meanMs": round(statistics.fmean(ms), 3) if ms else 0}
+
+class Barrier():
+    # asyncio.Barrier only exists from Python 3.11
+    def __init__(self, parties):
+        self.parties = parties
+        self.count = 0
+        self.event = asyncio.Event()
+
+    async def wait(self):
+        self.count += 1
+        if self.count >= self.parties:
+            self.event.set()
+        await self.event.wait()
+
+def percentile(sortedValues, pct):
+    if not sortedValues:
+        return 0
+    index = min(len(sortedValues) - 1, max(0, round(pct / 100 * len(sortedValues)) - 1))
+    return sortedValues[index]
+
+async def startServer(workers):
+    # Run the server as its own process so client and server don't share an event loop
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chessServer.py")
+    args = [sys.executable, server, "--port", "0"]
+    if workers is not None:
+        args += ["--workers", str(workers)]
+    process = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE)
+    line = (await process.stdout.readline()).decode().strip()
+    host, port = line.rsplit(" ", 1)[-1].rsplit(":", 1)
+    return process, host, int(port)
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move-ack latency under many concurrent games")
+    parser.add_argument("--games", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--moves", type=int, default=20, help="moves per game (both sides)")
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="use a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=None, help="server move generation processes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    results = []
+    for games in args.games:
+        process = None
+        host, port = args.host, args.port
+        if port is None:
+            process, host, port = await startServer(args.workers)
+        try:
+            result = await runLoad(host, port, games, args.moves, args.connections, args.seed)
+        finally:
+            if process is not None:
+                process.terminate()
+                await process.wait()
+        results.append(result)
+        if not args.json:
+            print(f"{games:6d} games  {result['moves']:7d} moves in {result['seconds']:8.2f}s "
+                  f"({result['movesPerSecond']} moves/s)  ack p50 {result['p50Ms']} ms  p99 {result['p99Ms']} ms  "
+                  f"max {result['maxMs']} ms", flush=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -2,15 +2,30 @@ import pygame as p
 import tkinter as tk
 from tkinter import messagebox
 import os
-from chessEngine import GameState, Move
+import time
+from collections import OrderedDict
+from chessEngine import GameState, Move, MoveCache
+from chessAccounts import openAccounts
+from chessClock import GameClock
+from chessPGN import PGNGame, PGNWriter
 
 CLIENT_NAME = "Foot Master"
 Width = Height = 1080
 Dimension = 8
 SQ_SIZE = Height // Dimension
-MAX_FPS = 15
 IMAGES = {}
+PROMOTION_IMAGES = {}
 PIECE_SIZE = 100
+FONTS = {}
+TEXT_CACHE = OrderedDict()
+TEXT_CACHE_SIZE = 256
+VEILS = {}
+# Undo/redo and restarts revisit the same positions; one cache serves every game in the session
+MOVE_CACHE = MoveCache(20000)
+GAME_OVER_TEXT = {"stalemate": "Stalemate", "insufficient": "Draw - insufficient material",
+                  "seventy-five-move": "Draw - 75-move rule", "repetition": "Draw - fivefold repetition"}
+# Every game left with moves on the board (restart or closing the window) is appended here
+GAMES_FILE = "games.pgn"
 
 def loadImages():
     pieces = ["wp", "wR", "wN", "wB", "wK", "wQ", "bp", "bR", "bN", "bB", "bK", "bQ"]
@@ -18,7 +33,36 @@ def loadImages():
     img_dir = os.path.join(base_dir, "images")
     for piece in pieces:
         path = os.path.join(img_dir, piece + ".png")
-        IMAGES[piece] = p.transform.scale(p.image.load(path), (PIECE_SIZE, PIECE_SIZE))
+        image = p.image.load(path)
+        IMAGES[piece] = p.transform.scale(image, (PIECE_SIZE, PIECE_SIZE))
+        PROMOTION_IMAGES[piece] = p.transform.scale(image, (SQ_SIZE-10, SQ_SIZE-10))
+
+def getFont(size):
+    if size not in FONTS:
+        FONTS[size] = p.font.SysFont(None, size)
+    return FONTS[size]
+
+def renderText(font, text, color='black'):
+    # Rendered strings are reused until they fall out of the LRU; clock digits churn, labels and menus stay put
+    key = (text, font, color)
+    surface = TEXT_CACHE.get(key)
+    if surface is None:
+        surface = font.render(text, True, p.Color(color))
+        TEXT_CACHE[key] = surface
+        if len(TEXT_CACHE) > TEXT_CACHE_SIZE:
+            TEXT_CACHE.popitem(last=False)
+    else:
+        TEXT_CACHE.move_to_end(key)
+    return surface
+
+def getVeil(alpha):
+    # Translucent full-board surface behind the overlays
+    if alpha not in VEILS:
+        s = p.Surface((Width, Height))
+        s.set_alpha(alpha)
+        s.fill(p.Color('white'))
+        VEILS[alpha] = s
+    return VEILS[alpha]
 
 def main():
     user = login_window()
@@ -32,35 +76,36 @@ def main():
     p.init()
     info = p.display.Info()
     max_fit = max(400, min(info.current_w, info.current_h) - 80)
-    board_size = min(1080, max_fit)
-    global Width, Height, SQ_SIZE, PIECE_SIZE
-    Width = Height = board_size
-    SQ_SIZE = Height // Dimension
-    PIECE_SIZE = max(60, int(SQ_SIZE * (100/135)))
+    setBoardSize(min(1080, max_fit))
     screen = p.display.set_mode((Width, Height))
     p.display.set_caption(CLIENT_NAME)
-    clock = p.time.Clock()
+    # Nothing reacts to the pointer moving, so don't wake up for it
+    p.event.set_blocked(p.MOUSEMOTION)
     screen.fill(p.Color("white"))
-    font = p.font.SysFont(None, 42)
-    small_font = p.font.SysFont(None, 24)
+    font = getFont(42)
+    small_font = getFont(24)
     gs = GameState()
+    gs.moveCache = MOVE_CACHE
     loadImages()
+    renderer = BoardRenderer(screen)
     running = True
     sqSelected = ()
     playerClicks = []
     validMoves = gs.getValidMoves()
-    white_time_ms = int(base_seconds * 1000)
-    black_time_ms = int(base_seconds * 1000)
-    increment_ms = int(increment_seconds * 1000)
+    game_clock = GameClock(int(base_seconds * 1000), int(increment_seconds * 1000))
     game_over_text = ""
     move_history = []
     promotion_pending = None
     show_restart_menu = False
     while running:
-        dt = clock.tick(MAX_FPS)
-        for e in p.event.get():
+        # Sleep until there is input or the running clock's displayed second is about to change
+        wait_ms = game_clock.msUntilChange()
+        first = p.event.wait(wait_ms) if wait_ms is not None else p.event.wait()
+        for e in [first] + p.event.get():
             if e.type == p.QUIT:
                 running = False
+            elif e.type == p.VIDEOEXPOSE:
+                renderer.invalidate()
             elif e.type == p.MOUSEBUTTONDOWN and not game_over_text and not promotion_pending:
                 location = p.mouse.get_pos()
                 col = location[0]//SQ_SIZE
@@ -83,21 +128,14 @@ def main():
                                 break
                         moved_white = gs.whiteToMove
                         gs.makeMove(move)
-                        if moved_white:
-                            white_time_ms += increment_ms
-                        else:
-                            black_time_ms += increment_ms
+                        game_clock.addIncrement('w' if moved_white else 'b')
                         validMoves = gs.getValidMoves()
                         move_history.append(move.getChessNotation())
                         if move.isPawnPromotion:
                             promotion_pending = move
                         else:
-                            if len(validMoves) == 0:
-                                if gs.isInCheck(gs.whiteToMove):
-                                    game_over_text = "Checkmate - " + ("White" if not gs.whiteToMove else "Black") + " wins"
-                                else:
-                                    game_over_text = "Stalemate"
-                                show_restart_menu = True
+                            game_over_text = gameOverText(gs)
+                            show_restart_menu = bool(game_over_text)
                     sqSelected = ()
                     playerClicks = []
             elif e.type == p.MOUSEBUTTONDOWN and promotion_pending:
@@ -113,15 +151,11 @@ def main():
                     if 0 <= choice_idx < 4:
                         piece_choices = ['Q', 'R', 'B', 'N']
                         chosen_piece = piece_choices[choice_idx]
-                        gs.board[promotion_pending.endRow][promotion_pending.endCol] = promotion_pending.pieceMoved[0] + chosen_piece
+                        gs.setPromotionPiece(chosen_piece)
                         promotion_pending = None
                         validMoves = gs.getValidMoves()
-                        if len(validMoves) == 0:
-                            if gs.isInCheck(gs.whiteToMove):
-                                game_over_text = "Checkmate - " + ("White" if not gs.whiteToMove else "Black") + " wins"
-                            else:
-                                game_over_text = "Stalemate"
-                            show_restart_menu = True
+                        game_over_text = gameOverText(gs)
+                        show_restart_menu = bool(game_over_text)
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_u:
                     if len(gs.moveLog) > 0:
@@ -133,10 +167,11 @@ def main():
                         game_over_text = ""
                         show_restart_menu = False
                 elif e.key == p.K_r or e.key == p.K_n:
+                    saveGame(gs, user, player_side, game_over_text, base_seconds, increment_seconds)
                     gs = GameState()
+                    gs.moveCache = MOVE_CACHE
                     validMoves = gs.getValidMoves()
-                    white_time_ms = int(base_seconds * 1000)
-                    black_time_ms = int(base_seconds * 1000)
+                    game_clock.reset()
                     move_history = []
                     promotion_pending = None
                     game_over_text = ""
@@ -144,28 +179,142 @@ def main():
                     sqSelected = ()
                     playerClicks = []
         if not game_over_text:
-            if gs.whiteToMove:
-                white_time_ms -= dt
-                if white_time_ms <= 0:
-                    white_time_ms = 0
-                    game_over_text = "White out of time - Black wins"
-                    show_restart_menu = True
-            else:
-                black_time_ms -= dt
-                if black_time_ms <= 0:
-                    black_time_ms = 0
-                    game_over_text = "Black out of time - White wins"
-                    show_restart_menu = True
-        drawGameState(screen, gs, sqSelected, validMoves, orientationWhiteBottom)
-        drawMoveHistory(screen, small_font, move_history)
-        drawClocks(screen, font, white_time_ms, black_time_ms)
-        if promotion_pending:
-            drawPromotionMenu(screen, font, orientationWhiteBottom, gs)
+            game_clock.setActive('w' if gs.whiteToMove else 'b')
+            if game_clock.remainingMs('w') <= 0:
+                game_over_text = "White out of time - Black wins"
+                show_restart_menu = True
+            elif game_clock.remainingMs('b') <= 0:
+                game_over_text = "Black out of time - White wins"
+                show_restart_menu = True
         if game_over_text:
-            drawGameOver(screen, font, game_over_text)
-        if show_restart_menu:
-            drawRestartMenu(screen, font)
-        p.display.flip()
+            game_clock.setActive(None)
+        overlay = (promotion_pending is not None, game_over_text, show_restart_menu)
+        dirty = renderer.render(gs, sqSelected, validMoves, orientationWhiteBottom, font, small_font,
+                                move_history, game_clock.remainingMs('w'), game_clock.remainingMs('b'), overlay)
+        if dirty:
+            p.display.update(dirty)
+    saveGame(gs, user, player_side, game_over_text, base_seconds, increment_seconds)
+
+def setBoardSize(board_size):
+    global Width, Height, SQ_SIZE, PIECE_SIZE
+    Width = Height = board_size
+    SQ_SIZE = Height // Dimension
+    PIECE_SIZE = max(60, int(SQ_SIZE * (100/135)))
+
+class BoardRenderer():
+    # Remembers what the last frame showed and repaints only the squares and text that changed; render()
+    # returns the rects to hand to p.display.update. Squares and coordinate labels are pre-rendered per orientation.
+    def __init__(self, screen):
+        self.screen = screen
+        self.backgrounds = {}
+        self.labelLayers = {}
+        self.highlight = p.Surface((SQ_SIZE, SQ_SIZE))
+        self.highlight.set_alpha(100)
+        self.highlight.fill(p.Color('yellow'))
+        self.last = None
+
+    def invalidate(self):
+        self.last = None
+
+    def layers(self, whiteBottom):
+        if whiteBottom not in self.backgrounds:
+            background = p.Surface((Width, Height))
+            background.fill(p.Color("white"))
+            drawBoard(background, whiteBottom)
+            labels = p.Surface((Width, Height), p.SRCALPHA)
+            drawLabels(labels, whiteBottom)
+            self.backgrounds[whiteBottom] = background.convert()
+            self.labelLayers[whiteBottom] = labels.convert_alpha()
+        return self.backgrounds[whiteBottom], self.labelLayers[whiteBottom]
+
+    def render(self, gs, sqSelected, validMoves, whiteBottom, font, small_font, move_history, white_ms, black_ms,
+               overlay):
+        squares = [piece for row in gs.board for piece in row]
+        marks = [None] * 64
+        if sqSelected != ():
+            r, c = sqSelected
+            marks[r*8 + c] = 'selected'
+            for m in validMoves:
+                if (m.startRow, m.startCol) == (r, c):
+                    marks[m.endRow*8 + m.endCol] = 'target'
+        last = self.last
+        oldTexts = last["texts"] if last else {}
+        texts = {}
+        for key in hudText(font, small_font, move_history, white_ms, black_ms):
+            texts[key] = oldTexts[key] if key in oldTexts else placeText(key)
+        frame = {"squares": squares, "marks": marks, "texts": texts, "whiteBottom": whiteBottom, "overlay": overlay}
+        self.last = frame
+        full = last is None or last["whiteBottom"] != whiteBottom or last["overlay"] != overlay
+        if not full:
+            dirty = [self.squareRect(i, whiteBottom) for i in range(64)
+                     if squares[i] != last["squares"][i] or marks[i] != last["marks"][i]]
+            dirty += [rect for key, (_, rect) in oldTexts.items() if key not in texts]
+            dirty += [rect for key, (_, rect) in texts.items() if key not in oldTexts]
+            if not dirty:
+                return []
+            # The overlays cover the whole board, so anything changing underneath means repainting all of it
+            full = any(overlay)
+        if full:
+            dirty = [self.screen.get_rect()]
+        for rect in dirty:
+            self.repaint(rect, frame)
+        if full:
+            promotion_pending, game_over_text, show_restart_menu = overlay
+            if promotion_pending:
+                drawPromotionMenu(self.screen, font, whiteBottom, gs)
+            if game_over_text:
+                drawGameOver(self.screen, font, game_over_text)
+            if show_restart_menu:
+                drawRestartMenu(self.screen, font)
+        return dirty
+
+    def squareRect(self, i, whiteBottom):
+        r, c = divmod(i, 8)
+        dr = r if whiteBottom else 7 - r
+        dc = c if whiteBottom else 7 - c
+        return p.Rect(dc*SQ_SIZE, dr*SQ_SIZE, SQ_SIZE, SQ_SIZE)
+
+    def repaint(self, rect, frame):
+        screen = self.screen
+        whiteBottom = frame["whiteBottom"]
+        background, labels = self.layers(whiteBottom)
+        screen.set_clip(rect)
+        screen.blit(background, rect, rect)
+        for dr in range(max(0, rect.top // SQ_SIZE), min(Dimension, (rect.bottom - 1) // SQ_SIZE + 1)):
+            for dc in range(max(0, rect.left // SQ_SIZE), min(Dimension, (rect.right - 1) // SQ_SIZE + 1)):
+                r = dr if whiteBottom else 7 - dr
+                c = dc if whiteBottom else 7 - dc
+                self.drawSquare(r*8 + c, dr, dc, frame)
+        screen.blit(labels, rect, rect)
+        for surface, textRect in frame["texts"].values():
+            if textRect.colliderect(rect):
+                screen.blit(surface, textRect)
+        screen.set_clip(None)
+
+    def drawSquare(self, i, dr, dc, frame):
+        x, y = dc*SQ_SIZE, dr*SQ_SIZE
+        mark = frame["marks"][i]
+        if mark == 'selected':
+            self.screen.blit(self.highlight, (x, y))
+        elif mark == 'target':
+            p.draw.circle(self.screen, p.Color('red'), (x + SQ_SIZE//2, y + SQ_SIZE//2), SQ_SIZE//8)
+        piece = frame["squares"][i]
+        if piece != "--":
+            self.screen.blit(IMAGES[piece], (x + (SQ_SIZE - PIECE_SIZE)//2, y + (SQ_SIZE - PIECE_SIZE)//2))
+
+def hudText(font, small_font, moves, white_ms, black_ms):
+    # (font, text, anchor, position) for every string drawn over the board; same layout as drawClocks/drawMoveHistory
+    items = [(font, f"Black: {formatClock(black_ms)}", 'topleft', (10, 10)),
+             (font, f"White: {formatClock(white_ms)}", 'bottomleft', (10, Height - 10)),
+             (small_font, "Moves:", 'topleft', (10, 50))]
+    for i, move in enumerate(moves[-8:]):
+        items.append((small_font, f"{i+1}. {move}", 'topleft', (10, 72 + 20*i)))
+    return items
+
+def placeText(key):
+    font, text, anchor, position = key
+    surface = renderText(font, text)
+    return surface, surface.get_rect(**{anchor: position})
 
 def drawGameState(screen, gs, sqSelected, validMoves, whiteBottom):
     drawBoard(screen, whiteBottom)
@@ -211,52 +360,73 @@ def drawHighlights(screen, sqSelected, validMoves, whiteBottom):
             p.draw.circle(screen, p.Color('red'), center, SQ_SIZE//8)
 
 def drawLabels(screen, whiteBottom):
-    small = p.font.SysFont(None, 24)
+    small = getFont(24)
     files = ['a','b','c','d','e','f','g','h']
     ranks = ['1','2','3','4','5','6','7','8']
     for c in range(8):
         fileChar = files[c] if whiteBottom else files[7-c]
-        text = small.render(fileChar, True, p.Color('black'))
+        text = renderText(small, fileChar)
         screen.blit(text, (c*SQ_SIZE + 4, Height - text.get_height() - 4))
     for r in range(8):
         rankChar = ranks[7-r] if whiteBottom else ranks[r]
-        text = small.render(rankChar, True, p.Color('black'))
+        text = renderText(small, rankChar)
         screen.blit(text, (4, r*SQ_SIZE + 4))
 
+def gameOverText(gs):
+    status = gs.gameStatus()
+    if status == "checkmate":
+        return "Checkmate - " + ("White" if not gs.whiteToMove else "Black") + " wins"
+    return GAME_OVER_TEXT.get(status, "")
+
+def gameResult(game_over_text):
+    if "White wins" in game_over_text:
+        return "1-0"
+    if "Black wins" in game_over_text:
+        return "0-1"
+    if game_over_text:
+        return "1/2-1/2"
+    return "*"
+
+def saveGame(gs, user, player_side, game_over_text, base_seconds, increment_seconds):
+    if not gs.moveLog:
+        return
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    white, black = (user, "?") if player_side == 'white' else ("?", user)
+    headers = {"Event": "Casual game", "Site": CLIENT_NAME, "Date": time.strftime("%Y.%m.%d"), "White": white,
+               "Black": black, "TimeControl": f"{int(base_seconds)}+{int(increment_seconds)}"}
+    game = PGNGame.fromState(gs, headers, gameResult(game_over_text))
+    with PGNWriter(os.path.join(base_dir, GAMES_FILE)) as writer:
+        writer.write(game)
+
+def formatClock(ms):
+    total = max(0, ms//1000)
+    m = total//60
+    s = total%60
+    return f"{m:02d}:{s:02d}"
+
 def drawClocks(screen, font, white_ms, black_ms):
-    def fmt(ms):
-        total = max(0, ms//1000)
-        m = total//60
-        s = total%60
-        return f"{m:02d}:{s:02d}"
-    black_surf = font.render(f"Black: {fmt(black_ms)}", True, p.Color('black'))
-    white_surf = font.render(f"White: {fmt(white_ms)}", True, p.Color('black'))
+    black_surf = renderText(font, f"Black: {formatClock(black_ms)}")
+    white_surf = renderText(font, f"White: {formatClock(white_ms)}")
     screen.blit(black_surf, (10, 10))
     screen.blit(white_surf, (10, Height - 10 - white_surf.get_height()))
 
 def drawGameOver(screen, font, text):
-    s = p.Surface((Width, Height))
-    s.set_alpha(140)
-    s.fill(p.Color('white'))
-    screen.blit(s, (0, 0))
-    t = font.render(text, True, p.Color('red'))
+    screen.blit(getVeil(140), (0, 0))
+    t = renderText(font, text, 'red')
     rect = t.get_rect(center=(Width//2, Height//2))
     screen.blit(t, rect)
 
 def drawMoveHistory(screen, font, moves):
     x, y = 10, 50
-    screen.blit(font.render("Moves:", True, p.Color('black')), (x, y))
+    screen.blit(renderText(font, "Moves:"), (x, y))
     y += 22
     for i, move in enumerate(moves[-8:]):
-        text = font.render(f"{i+1}. {move}", True, p.Color('black'))
+        text = renderText(font, f"{i+1}. {move}")
         screen.blit(text, (x, y))
         y += 20
 
 def drawPromotionMenu(screen, font, whiteBottom, gs):
-    s = p.Surface((Width, Height))
-    s.set_alpha(200)
-    s.fill(p.Color('white'))
-    screen.blit(s, (0, 0))
+    screen.blit(getVeil(200), (0, 0))
     center_x, center_y = Width//2, Height//2
     piece_size = SQ_SIZE
     start_x = center_x - 2*piece_size
@@ -269,54 +439,41 @@ def drawPromotionMenu(screen, font, whiteBottom, gs):
         p.draw.rect(screen, p.Color('black'), p.Rect(x, y, piece_size, piece_size), 2)
         piece_color = 'w' if gs.whiteToMove else 'b'
         piece_name = piece_color + piece
-        if piece_name in IMAGES:
-            piece_img = p.transform.scale(IMAGES[piece_name], (piece_size-10, piece_size-10))
-            screen.blit(piece_img, (x+5, y+5))
-        label = font.render(piece, True, p.Color('black'))
+        if piece_name in PROMOTION_IMAGES:
+            screen.blit(PROMOTION_IMAGES[piece_name], (x+5, y+5))
+        label = renderText(font, piece)
         label_rect = label.get_rect(center=(x + piece_size//2, y + piece_size + 20))
         screen.blit(label, label_rect)
-    inst_text = font.render("Choose promotion piece:", True, p.Color('black'))
+    inst_text = renderText(font, "Choose promotion piece:")
     inst_rect = inst_text.get_rect(center=(center_x, center_y - piece_size))
     screen.blit(inst_text, inst_rect)
 
 def drawRestartMenu(screen, font):
-    s = p.Surface((Width, Height))
-    s.set_alpha(200)
-    s.fill(p.Color('white'))
-    screen.blit(s, (0, 0))
+    screen.blit(getVeil(200), (0, 0))
     center_x, center_y = Width//2, Height//2
     button_width, button_height = 200, 50
     play_again_rect = p.Rect(center_x - button_width//2, center_y - 60, button_width, button_height)
     p.draw.rect(screen, p.Color('lightgreen'), play_again_rect)
     p.draw.rect(screen, p.Color('black'), play_again_rect, 2)
-    play_text = font.render("Play Again", True, p.Color('black'))
+    play_text = renderText(font, "Play Again")
     screen.blit(play_text, play_text.get_rect(center=play_again_rect.center))
     new_game_rect = p.Rect(center_x - button_width//2, center_y + 10, button_width, button_height)
     p.draw.rect(screen, p.Color('lightblue'), new_game_rect)
     p.draw.rect(screen, p.Color('black'), new_game_rect, 2)
-    new_text = font.render("New Game", True, p.Color('black'))
+    new_text = renderText(font, "New Game")
     screen.blit(new_text, new_text.get_rect(center=new_game_rect.center))
-    inst_text = font.render("Press R or N for Restart", True, p.Color('black'))
+    inst_text = renderText(font, "Press R or N for Restart")
     screen.blit(inst_text, inst_text.get_rect(center=(center_x, center_y + 80)))
 
 def login_window():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    path = os.path.join(base_dir, "users.csv")
-    users = {}
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('"'):
-                    continue
-                parts = line.split(':', 1) if ':' in line else line.split(',', 1)
-                if len(parts) == 2:
-                    users[parts[0].strip()] = parts[1].strip()
-    except FileNotFoundError:
-        pass
+    # Accounts live in users.db; a small users.csv is imported on open, a large one with chessAccounts.py migrate
+    store = openAccounts()
     result = {"user": None}
     root = tk.Tk()
     root.title(f"{CLIENT_NAME} - Login")
+    if store.legacyPending():
+        messagebox.showwarning("Accounts", "users.csv has not been imported yet, so its accounts can't log in.\n"
+                               "Run: python chessAccounts.py migrate")
     tk.Label(root, text="Username").grid(row=0, column=0)
     tk.Label(root, text="Password").grid(row=1, column=0)
     u = tk.Entry(root)
@@ -325,7 +482,7 @@ def login_window():
     pwd.grid(row=1, column=1)
     def do_login():
         name, pw = u.get().strip(), pwd.get().strip()
-        if name in users and users[name] == pw:
+        if name and store.verify(name, pw):
             result["user"] = name
             root.destroy()
         else:
@@ -335,16 +492,16 @@ def login_window():
         if not name or not pw:
             messagebox.showerror("Error", "Please enter username and password")
             return
-        if name in users:
+        if not store.register(name, pw):
             messagebox.showerror("Error", "User exists")
             return
-        users[name] = pw
-        with open(path, 'a', encoding='utf-8') as f:
-            f.write(f"{name}:{pw}\n")
         messagebox.showinfo("OK", "Registered. You can log in now.")
     tk.Button(root, text="Login", command=do_login).grid(row=2, column=0, sticky='we')
     tk.Button(root, text="Register", command=do_register).grid(row=2, column=1, sticky='we')
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        store.close()
     return result["user"]
 
 def settings_window():
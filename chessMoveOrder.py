@@ -0,0 +1,94 @@
+# Move ordering for the alpha-beta search: hash/PV move, MVV-LVA captures, killer moves, then history-scored quiets.
+# pickMoves is staged: quiet moves are only generated once the hash move and every capture have failed to cut off.
+
+from chessTransposition import encodeMove
+
+PIECE_VALUES = {'p': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0}
+KILLERS_PER_PLY = 2
+# History scores are halved when one passes this, and at every new search, so old cutoffs fade
+HISTORY_LIMIT = 1 << 20
+
+def captureOrder(move):
+    # MVV-LVA: most valuable victim first, cheapest attacker first among equal victims
+    if move.pieceCaptured == "--":
+        return 0
+    return PIECE_VALUES[move.pieceCaptured[1]]*10 - PIECE_VALUES[move.pieceMoved[1]]
+
+def isQuiet(move):
+    return move.pieceCaptured == "--" and not move.isPawnPromotion
+
+def historyIndex(move):
+    return (move.startRow*8 + move.startCol)*64 + move.endRow*8 + move.endCol
+
+class MoveOrderer():
+    def __init__(self, maxPly):
+        self.maxPly = maxPly
+        self.clear()
+
+    def clear(self):
+        # Killers are packed moves (chessTransposition.encodeMove); history is per side, indexed from*64 + to
+        self.killers = [[0]*KILLERS_PER_PLY for _ in range(self.maxPly + 1)]
+        self.history = [[0]*4096, [0]*4096]
+
+    def newSearch(self):
+        self.killers = [[0]*KILLERS_PER_PLY for _ in range(self.maxPly + 1)]
+        self.ageHistory()
+
+    def ageHistory(self):
+        for table in self.history:
+            for i, score in enumerate(table):
+                if score:
+                    table[i] = score >> 1
+
+    def recordCutoff(self, move, ply, depth, whiteToMove):
+        # A quiet move refuted the node: remember it for this ply's siblings and for the side's history
+        if not isQuiet(move):
+            return
+        packed = encodeMove(move)
+        killers = self.killers[ply]
+        if killers[0] != packed:
+            killers[1:] = killers[:-1]
+            killers[0] = packed
+        table = self.history[0 if whiteToMove else 1]
+        i = historyIndex(move)
+        table[i] += depth*depth
+        if table[i] > HISTORY_LIMIT:
+            self.ageHistory()
+
+    def findMove(self, gs, packed, context):
+        # The legal move a packed move stands for in this position, or None; castling is left to the quiet stage
+        start = packed & 63
+        for move in gs.movesFrom(start >> 3, start & 7, context):
+            if encodeMove(move) == packed:
+                return move
+        return None
+
+    def pickMoves(self, gs, ply, hashMoves=()):
+        # Yields legal moves best-first. hashMoves: packed moves to try before anything is generated (PV, TT).
+        # The caller must put the position back (undoMove/restore) before asking for the next move.
+        context = gs.legalityContext()
+        tried = []
+        for packed in hashMoves:
+            if packed and packed not in tried:
+                move = self.findMove(gs, packed, context)
+                if move is not None:
+                    tried.append(packed)
+                    yield move
+        captures = gs.generateCaptures(context)
+        captures.sort(key=captureOrder, reverse=True)
+        for move in captures:
+            if not tried or encodeMove(move) not in tried:
+                yield move
+        for packed in self.killers[ply]:
+            if packed and packed not in tried:
+                move = self.findMove(gs, packed, context)
+                # A killer that captures here was already tried with the captures
+                if move is not None and isQuiet(move):
+                    tried.append(packed)
+                    yield move
+        quiets = gs.generateQuiets(context)
+        history = self.history[0 if gs.whiteToMove else 1]
+        quiets.sort(key=lambda m: history[historyIndex(m)], reverse=True)
+        for move in quiets:
+            if not tried or encodeMove(move) not in tried:
+                yield move
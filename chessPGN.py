@@ -0,0 +1,279 @@
+# PGN import/export: a streaming reader that yields one game at a time (memory stays flat however big the file),
+# SAN parsing and production against GameState's legal moves, and a writer that appends finished games.
+
+import argparse
+import re
+import sys
+import time
+from chessEngine import GameState, Move, START_FEN
+
+SEVEN_TAG_ROSTER = ["Event", "Site", "Date", "Round", "White", "Black", "Result"]
+TAG_DEFAULTS = {"Date": "????.??.??"}
+RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+LINE_WIDTH = 79
+
+TAG_RE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# Movetext tokens: whole or unterminated {comments}, ; comments, variation parens, NAGs, everything else up to a space
+TOKEN_RE = re.compile(r'\{[^}]*\}|\{.*|;.*|[()]|\$\d+|[^\s{}();$]+')
+MOVE_NUMBER_RE = re.compile(r'^\d+\.*')
+SAN_RE = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+CASTLES = {"O-O": 6, "0-0": 6, "O-O-O": 2, "0-0-0": 2}
+
+class PGNGame():
+    def __init__(self, headers=None, moves=None, result="*"):
+        self.headers = headers if headers is not None else {}
+        self.moves = moves if moves is not None else []
+        self.result = result
+
+    @classmethod
+    def fromState(cls, gs, headers=None, result="*", startFen=START_FEN):
+        # SAN for every move in gs.moveLog, replayed from startFen
+        replay = GameState.fromFEN(startFen)
+        moves = []
+        for move in gs.moveLog:
+            moves.append(moveToSAN(replay, move))
+            replay.makeMove(move)
+        headers = dict(headers or {})
+        if startFen != START_FEN:
+            headers.setdefault("SetUp", "1")
+            headers.setdefault("FEN", startFen)
+        headers["Result"] = result
+        return cls(headers, moves, result)
+
+    def startFen(self):
+        return self.headers.get("FEN", START_FEN)
+
+    def replay(self):
+        # Yields (gs, move) after each SAN move is made; raises ValueError at the first illegal or ambiguous one
+        gs = GameState.fromFEN(self.startFen())
+        for san in self.moves:
+            move = parseSAN(gs, san)
+            gs.makeMove(move)
+            yield gs, move
+
+def readGames(source):
+    # source: a path or an open text file. Reads line by line and yields each PGNGame as soon as it is complete.
+    if isinstance(source, str):
+        with open(source, encoding="utf-8", errors="replace") as f:
+            yield from readGames(f)
+        return
+    headers = {}
+    moves = []
+    # Past the tag section: set by movetext of any kind, or the blank line that ends the tags
+    inBody = False
+    inComment = False
+    depth = 0
+    for line in source:
+        if inComment:
+            end = line.find('}')
+            if end < 0:
+                continue
+            line = line[end + 1:]
+            inComment = False
+        stripped = line.strip()
+        if not stripped:
+            inBody = inBody or bool(headers)
+            continue
+        if stripped[0] == '%':
+            continue
+        if stripped[0] == '[' and depth == 0:
+            tag = TAG_RE.match(stripped)
+            if tag:
+                if inBody:
+                    # A game without a result token (possibly without moves); the next game's tags close it
+                    yield PGNGame(headers, moves, headers.get("Result", "*"))
+                    headers, moves, inBody = {}, [], False
+                headers[tag.group(1)] = tag.group(2).replace('\\"', '"').replace('\\\\', '\\')
+                continue
+        inBody = True
+        for token in TOKEN_RE.findall(stripped):
+            first = token[0]
+            if first == '{':
+                inComment = not token.endswith('}')
+            elif first == ';':
+                break
+            elif first == '(':
+                depth += 1
+            elif first == ')':
+                depth = max(0, depth - 1)
+            elif depth or first == '$':
+                continue
+            elif token in RESULTS:
+                yield PGNGame(headers, moves, token)
+                headers, moves, inBody = {}, [], False
+            else:
+                san = MOVE_NUMBER_RE.sub('', token)
+                if san:
+                    moves.append(san)
+    if moves or headers:
+        yield PGNGame(headers, moves, headers.get("Result", "*"))
+
+def moveToSAN(gs, move, legalMoves=None):
+    # SAN for a legal move in gs (check and mate suffixes included); gs is left as it was
+    if move.isCastleMove:
+        san = "O-O" if move.endCol == 6 else "O-O-O"
+    else:
+        target = Move.colsToFiles[move.endCol] + Move.rowsToRanks[move.endRow]
+        capture = 'x' if move.pieceCaptured != "--" else ''
+        kind = move.pieceMoved[1]
+        if kind == 'p':
+            san = (Move.colsToFiles[move.startCol] + capture if capture else '') + target
+            if move.isPawnPromotion:
+                san += '=' + move.promotionChoice
+        else:
+            legal = legalMoves if legalMoves is not None else gs.getValidMoves()
+            rivals = [m for m in legal if m.pieceMoved == move.pieceMoved and m.endRow == move.endRow and
+                      m.endCol == move.endCol and (m.startRow != move.startRow or m.startCol != move.startCol)]
+            origin = ''
+            if rivals:
+                if all(m.startCol != move.startCol for m in rivals):
+                    origin = Move.colsToFiles[move.startCol]
+                elif all(m.startRow != move.startRow for m in rivals):
+                    origin = Move.rowsToRanks[move.startRow]
+                else:
+                    origin = Move.colsToFiles[move.startCol] + Move.rowsToRanks[move.startRow]
+            san = kind + origin + capture + target
+    gs.makeMove(move)
+    if gs.isInCheck():
+        san += '+' if gs.hasLegalMove() else '#'
+    gs.undoMove()
+    return san
+
+def parseSAN(gs, san, legalMoves=None):
+    # The legal move in gs that san names; ValueError if there is none or more than one
+    text = san.rstrip('+#!?')
+    legal = legalMoves if legalMoves is not None else gs.getValidMoves()
+    if text in CASTLES:
+        for m in legal:
+            if m.isCastleMove and m.endCol == CASTLES[text]:
+                return m
+        raise ValueError(f"illegal move {san!r}")
+    parsed = SAN_RE.match(text)
+    if not parsed:
+        raise ValueError(f"not a SAN move: {san!r}")
+    kind, fromFile, fromRank, target, promotion = parsed.groups()
+    kind = kind or 'p'
+    endRow, endCol = Move.ranksToRows[target[1]], Move.filesToCols[target[0]]
+    startCol = Move.filesToCols[fromFile] if fromFile else None
+    startRow = Move.ranksToRows[fromRank] if fromRank else None
+    found = None
+    for m in legal:
+        if (m.endRow != endRow or m.endCol != endCol or m.pieceMoved[1] != kind or m.isCastleMove or
+                (startCol is not None and m.startCol != startCol) or (startRow is not None and m.startRow != startRow)):
+            continue
+        if m.isPawnPromotion != (promotion is not None) or (promotion and m.promotionChoice != promotion):
+            continue
+        if found is not None:
+            raise ValueError(f"ambiguous move {san!r}")
+        found = m
+    if found is None:
+        raise ValueError(f"illegal move {san!r}")
+    return found
+
+def formatGame(game):
+    headers = dict(game.headers)
+    headers["Result"] = game.result
+    lines = []
+    for name in SEVEN_TAG_ROSTER:
+        lines.append(_tagLine(name, headers.pop(name, TAG_DEFAULTS.get(name, "?"))))
+    for name, value in headers.items():
+        lines.append(_tagLine(name, value))
+    lines.append("")
+    fields = game.startFen().split()
+    whiteToMove = len(fields) < 2 or fields[1] == 'w'
+    number = int(fields[5]) if len(fields) > 5 else 1
+    tokens = []
+    for i, san in enumerate(game.moves):
+        if whiteToMove:
+            tokens.append(f"{number}.")
+        elif i == 0:
+            tokens.append(f"{number}...")
+        tokens.append(san)
+        if not whiteToMove:
+            number += 1
+        whiteToMove = not whiteToMove
+    tokens.append(game.result)
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_WIDTH:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
+
+def _tagLine(name, value):
+    return f'[{name} "{str(value).replace(chr(92), chr(92)*2).replace(chr(34), chr(92) + chr(34))}"]'
+
+class PGNWriter():
+    # Appends games to a PGN file; open once and write as games finish
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, game):
+        self.file.write(formatGame(game))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def peakMemoryMb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024*1024 if sys.platform == "darwin" else 1024), 1)
+
+def importGames(path, validate=False, out=None, every=10000, log=print):
+    # Streams every game in path; validate replays the SAN through GameState, out appends each game to a PGN file
+    writer = PGNWriter(out) if out else None
+    games = moves = errors = 0
+    start = time.perf_counter()
+    try:
+        for game in readGames(path):
+            games += 1
+            moves += len(game.moves)
+            if validate:
+                try:
+                    for _ in game.replay():
+                        pass
+                except ValueError as e:
+                    errors += 1
+                    if log:
+                        log(f"game {games}: {e}")
+                    continue
+            if writer:
+                writer.write(game)
+            if log and every and games % every == 0:
+                seconds = time.perf_counter() - start
+                log(f"{games} games  {games / seconds:.0f} games/s  peak memory {peakMemoryMb()} MB")
+    finally:
+        if writer:
+            writer.close()
+    seconds = time.perf_counter() - start
+    return {"games": games, "moves": moves, "errors": errors, "seconds": round(seconds, 3),
+            "gamesPerSecond": round(games / seconds, 1) if seconds > 0 else 0, "peakMemoryMb": peakMemoryMb()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a PGN file and report import throughput")
+    parser.add_argument("path")
+    parser.add_argument("--validate", action="store_true", help="replay every move through the move generator")
+    parser.add_argument("--out", help="append the (valid) games to this PGN file")
+    parser.add_argument("--every", type=int, default=10000, help="progress line every N games (0: none)")
+    args = parser.parse_args(argv)
+    summary = importGames(args.path, args.validate, args.out, args.every)
+    print(f"{summary['games']} games, {summary['moves']} moves, {summary['errors']} errors in {summary['seconds']}s "
+          f"({summary['gamesPerSecond']} games/s, peak memory {summary['peakMemoryMb']} MB)")
+    return 1 if summary["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
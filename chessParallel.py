@@ -0,0 +1,130 @@
+# Multi-process perft and batch position analysis; workers receive FEN strings and return plain numbers
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from chessEngine import GameState, START_FEN
+from chessPerft import createState, perft
+from chessSearch import Searcher
+from chessTransposition import TranspositionTable
+
+TASKS_PER_WORKER = 8
+BATCH_SIZE = 64
+WORKER_HASH_MB = 2
+
+def splitPositions(fen, depth, minTasks):
+    # Expand the tree breadth-first until there is enough work to spread; each task remembers its root move
+    gs = GameState.fromFEN(fen)
+    frontier = []
+    for move in gs.getValidMoves():
+        gs.makeMove(move)
+        frontier.append((move.getUCINotation(), gs.toFEN()))
+        gs.undoMove()
+    remaining = depth - 1
+    while len(frontier) < minTasks and remaining > 1:
+        expanded = []
+        for rootMove, childFen in frontier:
+            child = GameState.fromFEN(childFen)
+            for move in child.getValidMoves():
+                child.makeMove(move)
+                expanded.append((rootMove, child.toFEN()))
+                child.undoMove()
+        frontier = expanded
+        remaining -= 1
+    return frontier, remaining
+
+def _perftTask(args):
+    fen, depth, engine = args
+    return perft(createState(fen, engine), depth)
+
+def parallelPerft(fen, depth, workers=None, engine="mailbox"):
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    rootOrder = [m.getUCINotation() for m in GameState.fromFEN(fen).getValidMoves()]
+    divide = {move: 0 for move in rootOrder}
+    if depth <= 1:
+        divide = {move: 1 for move in rootOrder}
+    else:
+        tasks, remaining = splitPositions(fen, depth, workers * TASKS_PER_WORKER)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = pool.map(_perftTask, [(childFen, remaining, engine) for _, childFen in tasks], chunksize=1)
+            for (rootMove, _), count in zip(tasks, counts):
+                divide[rootMove] += count
+    seconds = time.perf_counter() - start
+    nodes = sum(divide.values())
+    return {"fen": fen, "depth": depth, "engine": engine, "workers": workers, "nodes": nodes, "divide": divide,
+            "seconds": round(seconds, 4), "nps": int(nodes / seconds) if seconds > 0 else 0}
+
+_workerSearcher = None
+
+def _analyzeBatch(args):
+    fens, depth = args
+    global _workerSearcher
+    if _workerSearcher is None:
+        _workerSearcher = Searcher(infoCallback=None, tt=TranspositionTable(WORKER_HASH_MB))
+    results = []
+    for fen in fens:
+        # Fresh table, killers and history per position so results don't depend on which batch a position landed in
+        _workerSearcher.tt.clear()
+        _workerSearcher.orderer.clear()
+        result = _workerSearcher.search(GameState.fromFEN(fen), depth)
+        bestMove = result.bestMove.getUCINotation() if result.bestMove else None
+        results.append({"fen": fen, "score": result.score, "bestMove": bestMove, "nodes": result.nodes})
+    return results
+
+def analyzePositions(fens, depth=2, workers=None, batchSize=BATCH_SIZE):
+    workers = workers or os.cpu_count() or 1
+    batches = [(fens[i:i + batchSize], depth) for i in range(0, len(fens), batchSize)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in pool.map(_analyzeBatch, batches):
+            yield from batch
+
+def readFENs(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel perft and batch position analysis")
+    sub = parser.add_subparsers(dest="command", required=True)
+    perftParser = sub.add_parser("perft", help="perft split across processes")
+    perftParser.add_argument("--fen", default=START_FEN)
+    perftParser.add_argument("--depth", type=int, default=5)
+    perftParser.add_argument("--workers", type=int, default=None)
+    perftParser.add_argument("--engine", choices=["mailbox", "bitboard"], default="mailbox")
+    perftParser.add_argument("--json", action="store_true")
+    analyzeParser = sub.add_parser("analyze", help="search every FEN in a file (one per line)")
+    analyzeParser.add_argument("file")
+    analyzeParser.add_argument("--depth", type=int, default=2)
+    analyzeParser.add_argument("--workers", type=int, default=None)
+    analyzeParser.add_argument("--output", default=None, help="write JSON lines here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.command == "perft":
+        result = parallelPerft(args.fen, args.depth, args.workers, args.engine)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            for move, count in result["divide"].items():
+                print(f"{move}: {count}")
+            print(f"\nNodes searched: {result['nodes']}")
+            print(f"Time: {result['seconds']}s  ({result['nps']} nodes/s, {result['workers']} workers)")
+        return 0
+
+    fens = readFENs(args.file)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        for result in analyzePositions(fens, args.depth, args.workers):
+            out.write(json.dumps(result) + "\n")
+    finally:
+        if args.output:
+            out.close()
+    seconds = time.perf_counter() - start
+    print(f"{len(fens)} positions in {seconds:.2f}s ({len(fens) / seconds:.1f} positions/s)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
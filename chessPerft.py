@@ -0,0 +1,153 @@
+# Perft: count leaf nodes of the legal move tree to verify move generation and measure its throughput
+
+import argparse
+import json
+import sys
+import time
+from chessEngine import GameState, START_FEN
+from chessBitboard import BitboardGameState
+
+# Published node counts; "depth" is the deepest level run by --suite
+SUITE = [
+    {"name": "initial", "fen": START_FEN, "depth": 4,
+     "nodes": [20, 400, 8902, 197281, 4865609, 119060324]},
+    {"name": "kiwipete", "fen": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", "depth": 3,
+     "nodes": [48, 2039, 97862, 4085603, 193690690]},
+    {"name": "position3", "fen": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", "depth": 5,
+     "nodes": [14, 191, 2812, 43238, 674624, 11030083]},
+    {"name": "position4", "fen": "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", "depth": 3,
+     "nodes": [6, 264, 9467, 422333, 15833292]},
+    {"name": "position5", "fen": "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", "depth": 3,
+     "nodes": [44, 1486, 62379, 2103487, 89941194]},
+    {"name": "position6", "fen": "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", "depth": 3,
+     "nodes": [46, 2079, 89890, 3894594]},
+    {"name": "ep-illegal-pin", "fen": "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", "depth": 4,
+     "nodes": [18, 92, 1670, 10138, 185429, 1134888]},
+    {"name": "ep-illegal-diagonal", "fen": "8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1", "depth": 4,
+     "nodes": [13, 102, 1266, 10276, 135655, 1015133]},
+    {"name": "ep-gives-check", "fen": "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", "depth": 4,
+     "nodes": [15, 126, 1928, 13931, 206379, 1440467]},
+    {"name": "short-castle-check", "fen": "5k2/8/8/8/8/8/8/4K2R w K - 0 1", "depth": 4,
+     "nodes": [15, 66, 1198, 6399, 120330, 661072]},
+    {"name": "long-castle-check", "fen": "3k4/8/8/8/8/8/8/R3K3 w Q - 0 1", "depth": 4,
+     "nodes": [16, 71, 1286, 7418, 141077, 803711]},
+    {"name": "castle-rights", "fen": "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", "depth": 3,
+     "nodes": [26, 1141, 27826, 1274206]},
+    {"name": "castle-prevented", "fen": "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", "depth": 3,
+     "nodes": [44, 1494, 50509, 1720476]},
+    {"name": "promote-out-of-check", "fen": "2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1", "depth": 4,
+     "nodes": [11, 133, 1442, 19174, 266199, 3821001]},
+    {"name": "discovered-check", "fen": "8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1", "depth": 4,
+     "nodes": [29, 165, 5160, 31961, 1004658]},
+    {"name": "promote-to-check", "fen": "4k3/1P6/8/8/8/8/K7/8 w - - 0 1", "depth": 5,
+     "nodes": [9, 40, 472, 2661, 38983, 217342]},
+    {"name": "underpromote-to-check", "fen": "8/P1k5/K7/8/8/8/8/8 w - - 0 1", "depth": 5,
+     "nodes": [6, 27, 273, 1329, 18135, 92683]},
+    {"name": "self-stalemate", "fen": "K1k5/8/P7/8/8/8/8/8 w - - 0 1", "depth": 6,
+     "nodes": [2, 6, 13, 63, 382, 2217]},
+    {"name": "stalemate-checkmate", "fen": "8/k1P5/8/1K6/8/8/8/8 w - - 0 1", "depth": 5,
+     "nodes": [10, 25, 268, 926, 10857, 43261, 567584]},
+    {"name": "stalemate-checkmate-2", "fen": "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1", "depth": 4,
+     "nodes": [37, 183, 6559, 23527]},
+]
+
+ENGINES = {"mailbox": GameState, "bitboard": BitboardGameState}
+
+def createState(fen, engine="mailbox"):
+    gs = GameState.fromFEN(fen)
+    return gs if engine == "mailbox" else ENGINES[engine](gs)
+
+def perft(gs, depth, copyMake=False):
+    # copyMake: return to the parent with restore(snapshot) instead of undoMove (mailbox state only)
+    if isinstance(gs, BitboardGameState):
+        return gs.perft(depth)
+    moves = gs.getValidMoves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    if copyMake:
+        snapshot = gs.snapshot()
+        for move in moves:
+            gs.makeMove(move)
+            nodes += perft(gs, depth - 1, True)
+            gs.restore(snapshot)
+        return nodes
+    for move in moves:
+        gs.makeMove(move)
+        nodes += perft(gs, depth - 1)
+        gs.undoMove()
+    return nodes
+
+def divide(gs, depth, copyMake=False):
+    counts = {}
+    for move in gs.getValidMoves():
+        gs.makeMove(move)
+        counts[move.getUCINotation()] = perft(gs, depth - 1, copyMake)
+        gs.undoMove()
+    return counts
+
+def runPerft(fen, depth, engine="mailbox", withDivide=False, copyMake=False):
+    gs = createState(fen, engine)
+    start = time.perf_counter()
+    if withDivide:
+        counts = divide(gs, depth, copyMake)
+        nodes = sum(counts.values())
+    else:
+        counts = None
+        nodes = perft(gs, depth, copyMake)
+    seconds = time.perf_counter() - start
+    result = {"fen": fen, "depth": depth, "engine": engine, "copyMake": copyMake, "nodes": nodes,
+              "seconds": round(seconds, 4), "nps": int(nodes / seconds) if seconds > 0 else 0}
+    if counts is not None:
+        result["divide"] = counts
+    return result
+
+def runSuite(engine="mailbox", maxDepth=None, log=None, copyMake=False):
+    results = []
+    for entry in SUITE:
+        depth = entry["depth"] if maxDepth is None else min(maxDepth, len(entry["nodes"]))
+        result = runPerft(entry["fen"], depth, engine, copyMake=copyMake)
+        result["name"] = entry["name"]
+        result["expected"] = entry["nodes"][depth - 1]
+        result["ok"] = result["nodes"] == result["expected"]
+        results.append(result)
+        if log:
+            log(f"{entry['name']:24s} depth {depth}  {result['nodes']:>10}  "
+                f"{'ok' if result['ok'] else 'FAIL expected ' + str(result['expected'])}  {result['nps']} nodes/s")
+    totalNodes = sum(r["nodes"] for r in results)
+    totalSeconds = sum(r["seconds"] for r in results)
+    return {"engine": engine, "copyMake": copyMake, "positions": results, "passed": all(r["ok"] for r in results),
+            "nodes": totalNodes, "seconds": round(totalSeconds, 4),
+            "nps": int(totalNodes / totalSeconds) if totalSeconds > 0 else 0}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft node counts and move generation speed")
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="mailbox")
+    parser.add_argument("--suite", action="store_true", help="run the bundled positions against known counts")
+    parser.add_argument("--copy-make", action="store_true", help="restore snapshots instead of undoMove (mailbox)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+    if args.copy_make and args.engine != "mailbox":
+        parser.error("--copy-make needs the mailbox engine")
+    if args.suite:
+        summary = runSuite(args.engine, args.depth, None if args.json else print, args.copy_make)
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            print(f"total {summary['nodes']} nodes  {summary['seconds']}s  {summary['nps']} nodes/s  "
+                  f"{'all passed' if summary['passed'] else 'FAILURES'}")
+        return 0 if summary["passed"] else 1
+    result = runPerft(args.fen, args.depth or 3, args.engine, withDivide=True, copyMake=args.copy_make)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for move, count in result["divide"].items():
+            print(f"{move}: {count}")
+        print(f"\nNodes searched: {result['nodes']}")
+        print(f"Time: {result['seconds']}s  ({result['nps']} nodes/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# Headless rendering benchmark: the old full redraw + flip every frame vs BoardRenderer's dirty rects.
+# Plays a scripted game (select a piece, then move it) with clocks running and reports CPU time per frame.
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import random
+import sys
+import time
+import pygame as p
+import chessMain
+from chessEngine import GameState
+
+MODES = ["full", "dirty"]
+# The game loop used to redraw at a fixed 15 fps; the scripted game still advances at that rate
+FPS = 15
+
+def scriptedFrames(frames, framesPerMove, fps, seed):
+    # Yields (gs, sqSelected, validMoves, move_history, white_ms, black_ms) once per frame
+    rng = random.Random(seed)
+    gs = GameState()
+    validMoves = gs.getValidMoves()
+    move_history = []
+    white_ms = black_ms = 180000
+    sqSelected = ()
+    chosen = None
+    dt = 1000 // fps
+    for frame in range(frames):
+        if frame % framesPerMove == framesPerMove // 2 and validMoves:
+            chosen = rng.choice(validMoves)
+            sqSelected = (chosen.startRow, chosen.startCol)
+        elif frame % framesPerMove == 0 and chosen is not None:
+            gs.makeMove(chosen)
+            move_history.append(chosen.getChessNotation())
+            validMoves = gs.getValidMoves()
+            if not validMoves:
+                gs = GameState()
+                validMoves = gs.getValidMoves()
+                move_history = []
+            sqSelected = ()
+            chosen = None
+        if gs.whiteToMove:
+            white_ms = max(0, white_ms - dt)
+        else:
+            black_ms = max(0, black_ms - dt)
+        yield gs, sqSelected, validMoves, move_history, white_ms, black_ms
+
+def run(mode, frames=900, size=800, framesPerMove=30, fps=FPS, seed=1):
+    p.init()
+    chessMain.setBoardSize(size)
+    screen = p.display.set_mode((chessMain.Width, chessMain.Height))
+    chessMain.loadImages()
+    font = p.font.SysFont(None, 42)
+    small_font = p.font.SysFont(None, 24)
+    renderer = chessMain.BoardRenderer(screen)
+    overlay = (False, "", False)
+    pixels = 0
+    start = time.process_time()
+    frameStates = scriptedFrames(frames, framesPerMove, fps, seed)
+    for gs, sqSelected, validMoves, move_history, white_ms, black_ms in frameStates:
+        if mode == "full":
+            chessMain.drawGameState(screen, gs, sqSelected, validMoves, True)
+            chessMain.drawMoveHistory(screen, small_font, move_history)
+            chessMain.drawClocks(screen, font, white_ms, black_ms)
+            p.display.flip()
+            pixels += chessMain.Width * chessMain.Height
+        else:
+            dirty = renderer.render(gs, sqSelected, validMoves, True, font, small_font,
+                                    move_history, white_ms, black_ms, overlay)
+            if dirty:
+                p.display.update(dirty)
+            pixels += sum(rect.width * rect.height for rect in dirty)
+    cpu = time.process_time() - start
+    p.quit()
+    return {"mode": mode, "frames": frames, "size": size, "cpuSeconds": round(cpu, 4),
+            "msPerFrame": round(cpu * 1000 / frames, 3), "coreUsageAtFps": round(cpu * fps / frames, 4),
+            "pixelsPerFrame": pixels // frames}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare full-frame and dirty-rect rendering (headless)")
+    parser.add_argument("--frames", type=int, default=900)
+    parser.add_argument("--size", type=int, default=800, help="board size in pixels")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    results = [run(mode, args.frames, args.size) for mode in MODES]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(f"{r['mode']:6s} {r['msPerFrame']:8.3f} ms/frame  {r['coreUsageAtFps']*100:6.2f}% of a core at "
+                  f"{FPS} fps  {r['pixelsPerFrame']} px/frame")
+        full, dirty = results
+        if dirty["cpuSeconds"] > 0:
+            print(f"dirty rects use {full['cpuSeconds'] / dirty['cpuSeconds']:.1f}x less CPU")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# Lazy SMP: helper processes search the same position into one shared transposition table; the main search reports
+# the result. Processes rather than threads because the search is pure Python and would be serialized by the GIL.
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from chessEngine import GameState
+from chessSearch import Searcher, MAX_PLY, BENCH_FENS
+from chessTransposition import SharedTranspositionTable
+
+class HelperSearcher(Searcher):
+    # Publishes its node count and watches the shared stop flag instead of a clock
+    def __init__(self, tt, index, stopEvent, nodeCounts):
+        super().__init__(None, tt)
+        self.advanceGeneration = False
+        # Half the helpers start one ply deeper so they aren't all walking the same tree in lockstep
+        self.firstDepth = 1 + (index + 1) % 2
+        self.index = index
+        self.stopEvent = stopEvent
+        self.nodeCounts = nodeCounts
+
+    def checkStop(self):
+        self.nodeCounts[self.index] = self.nodes
+        if self.stopEvent.is_set():
+            self.stopped = True
+
+class MainSearcher(Searcher):
+    def __init__(self, infoCallback, tt, nodeCounts):
+        super().__init__(infoCallback, tt)
+        self.advanceGeneration = False
+        self.nodeCounts = nodeCounts
+
+    def totalNodes(self):
+        return self.nodes + (sum(self.nodeCounts) if self.nodeCounts is not None else 0)
+
+_helperTable = None
+_helperStop = None
+_helperNodes = None
+
+def _initHelper(name, sizeMb, stopEvent, nodeCounts):
+    global _helperTable, _helperStop, _helperNodes
+    _helperTable = SharedTranspositionTable(sizeMb, name)
+    _helperStop = stopEvent
+    _helperNodes = nodeCounts
+
+def _helperSearch(args):
+    index, snapshot, history, maxDepth, generation = args
+    _helperTable.setGeneration(generation)
+    searcher = HelperSearcher(_helperTable, index, _helperStop, _helperNodes)
+    searcher.search(GameState.fromSnapshot(snapshot, history), maxDepth)
+    _helperNodes[index] = searcher.nodes
+    return searcher.nodes
+
+class LazySMPSearcher():
+    def __init__(self, threads=4, hashMb=64, infoCallback=print):
+        self.threads = max(1, threads)
+        self.tt = SharedTranspositionTable(hashMb)
+        # Spawned, not forked: a searcher driven from a worker thread (the UCI loop) must not fork with locks held
+        context = multiprocessing.get_context("spawn")
+        self.stopEvent = context.Event()
+        helpers = self.threads - 1
+        self.nodeCounts = context.Array('q', helpers, lock=False) if helpers else None
+        self.pool = None
+        if helpers:
+            self.pool = ProcessPoolExecutor(max_workers=helpers, mp_context=context, initializer=_initHelper,
+                                            initargs=(self.tt.name, hashMb, self.stopEvent, self.nodeCounts))
+        self.main = MainSearcher(infoCallback, self.tt, self.nodeCounts)
+
+    @property
+    def book(self):
+        return self.main.book
+
+    @book.setter
+    def book(self, book):
+        self.main.book = book
+
+    @property
+    def tablebase(self):
+        return self.main.tablebase
+
+    @tablebase.setter
+    def tablebase(self, tablebase):
+        self.main.tablebase = tablebase
+
+    def search(self, gs, maxDepth=MAX_PLY, timeManager=None):
+        # Book and tablebase positions are answered before any helper is woken
+        result = self.main.bookResult(gs) or self.main.tablebaseResult(gs)
+        if result is not None:
+            return result
+        self.tt.newSearch()
+        self.stopEvent.clear()
+        futures = []
+        if self.pool:
+            for i in range(self.threads - 1):
+                self.nodeCounts[i] = 0
+            # Helpers get a compact snapshot plus the keys a repetition can still reach, not the whole pickled state
+            snapshot = gs.snapshot()
+            history = gs.zobristLog[max(0, len(gs.zobristLog) - 1 - gs.halfmoveClock):-1]
+            futures = [self.pool.submit(_helperSearch, (i, snapshot, history, maxDepth, self.tt.generation))
+                       for i in range(self.threads - 1)]
+        try:
+            result = self.main.search(gs, maxDepth, timeManager)
+        finally:
+            self.stopEvent.set()
+            for future in futures:
+                future.result()
+        result.nodes = self.main.totalNodes()
+        result.timeMs = self.main.timeManager.elapsedMs()
+        return result
+
+    def stop(self):
+        self.main.stop()
+        self.stopEvent.set()
+
+    def close(self):
+        self.stop()
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+        self.tt.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def timeToDepth(threads, depth, fens=BENCH_FENS, hashMb=64):
+    results = []
+    with LazySMPSearcher(threads, hashMb, infoCallback=None) as searcher:
+        for fen in fens:
+            searcher.tt.clear()
+            start = time.perf_counter()
+            result = searcher.search(GameState.fromFEN(fen), depth)
+            seconds = time.perf_counter() - start
+            results.append({"fen": fen, "seconds": round(seconds, 4), "nodes": result.nodes,
+                            "bestMove": result.bestMove.getUCINotation() if result.bestMove else None})
+    return {"threads": threads, "depth": depth, "positions": results,
+            "seconds": round(sum(r["seconds"] for r in results), 4), "nodes": sum(r["nodes"] for r in results)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lazy SMP time-to-depth benchmark")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--hash", type=int, default=64, help="shared table size in MB")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    runs = [timeToDepth(threads, args.depth, hashMb=args.hash) for threads in args.threads]
+    baseline = runs[0]["seconds"]
+    for run in runs:
+        run["speedup"] = round(baseline / run["seconds"], 2) if run["seconds"] > 0 else 0
+    if args.json:
+        print(json.dumps(runs, indent=2))
+    else:
+        for run in runs:
+            print(f"threads {run['threads']:2d}  depth {run['depth']}  {run['seconds']:8.3f}s  "
+                  f"{run['nodes']:>9} nodes  speedup {run['speedup']}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+# Alpha-beta search over GameState (iterative deepening, aspiration windows, quiescence, time management)
+
+import time
+from chessEngine import GameState, START_FEN
+from chessEval import evaluate
+from chessMoveOrder import MoveOrderer, captureOrder
+from chessTransposition import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, encodeMove
+
+INFINITY = 1000000
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000
+MAX_PLY = 64
+ASPIRATION_WINDOW = 50
+CHECK_EVERY = 1024
+
+# Benchmark positions (time to depth, move ordering): opening, middlegame, endgame
+BENCH_FENS = [
+    START_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+]
+
+def scoreToTT(score, ply):
+    # Mate scores are stored relative to the node, not the root
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+def scoreFromTT(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+def tablebaseScore(outcome, ply):
+    # A tablebase (result, plies) as a search score at this ply; mates line up with the search's own mate scores
+    result, plies = outcome
+    if not result:
+        return 0
+    return result * (MATE_SCORE - ply - plies)
+
+class TimeManager():
+    # softMs: don't start another iteration after this; hardMs: abort the running iteration
+    def __init__(self, softMs=None, hardMs=None):
+        self.softMs = softMs
+        self.hardMs = hardMs
+        self.startTime = time.perf_counter()
+
+    @classmethod
+    def forClock(cls, remainingMs, incrementMs=0, movesToGo=None, overheadMs=50):
+        usable = max(0, remainingMs - overheadMs)
+        movesLeft = movesToGo if movesToGo else 30
+        soft = usable / movesLeft + incrementMs * 3 / 4
+        soft = min(soft, usable / 2)
+        hard = min(soft * 4, usable * 3 / 4)
+        return cls(max(1, soft), max(1, hard))
+
+    @classmethod
+    def fixed(cls, moveTimeMs):
+        return cls(moveTimeMs, moveTimeMs)
+
+    def start(self):
+        self.startTime = time.perf_counter()
+
+    def elapsedMs(self):
+        return (time.perf_counter() - self.startTime) * 1000
+
+    def canStartIteration(self):
+        return self.softMs is None or self.elapsedMs() < self.softMs
+
+    def outOfTime(self):
+        return self.hardMs is not None and self.elapsedMs() >= self.hardMs
+
+class SearchResult():
+    def __init__(self, bestMove=None, score=0, depth=0, pv=None, nodes=0, timeMs=0, hashfull=0):
+        self.bestMove = bestMove
+        self.score = score
+        self.depth = depth
+        self.pv = pv or []
+        self.nodes = nodes
+        self.timeMs = timeMs
+        self.hashfull = hashfull
+
+    def nps(self):
+        return int(self.nodes * 1000 / self.timeMs) if self.timeMs > 0 else 0
+
+def formatInfo(result):
+    if abs(result.score) >= MATE_BOUND:
+        plies = MATE_SCORE - abs(result.score)
+        score = f"mate {(plies + 1)//2 if result.score > 0 else -((plies + 1)//2)}"
+    else:
+        score = f"cp {result.score}"
+    pv = " ".join(m.getUCINotation() for m in result.pv)
+    return (f"info depth {result.depth} score {score} nodes {result.nodes} nps {result.nps()} "
+            f"time {int(result.timeMs)} hashfull {result.hashfull} pv {pv}")
+
+class Searcher():
+    def __init__(self, infoCallback=print, tt=None):
+        self.infoCallback = infoCallback
+        self.tt = tt if tt is not None else TranspositionTable()
+        # False when someone else (the Lazy SMP driver) ages a shared table
+        self.advanceGeneration = True
+        self.firstDepth = 1
+        # True: return to the parent by restoring a snapshot instead of undoMove (see chessStateBench)
+        self.copyMake = False
+        # False: the main search tries moves in generation order with no hash move, killers or history (for node-count
+        # comparisons). Quiescence always sorts captures; without that it does not finish even at depth 1 on kiwipete.
+        self.ordering = True
+        self.orderer = MoveOrderer(MAX_PLY)
+        # An opening book (chessBook.OpeningBook); a position it knows is answered without searching
+        self.book = None
+        # Endgame tables (chessTablebase.Tablebase): exact scores wherever they cover the position
+        self.tablebase = None
+        self.stopRequested = False
+
+    def stop(self):
+        self.stopRequested = True
+
+    def startSearch(self, timeManager=None):
+        self.timeManager = timeManager or TimeManager()
+        self.timeManager.start()
+        if self.advanceGeneration:
+            self.tt.newSearch()
+        self.orderer.newSearch()
+        self.stopRequested = False
+        self.stopped = False
+        self.nodes = 0
+        self.pv = [[] for _ in range(MAX_PLY + 1)]
+        self.previousPv = []
+
+    def totalNodes(self):
+        return self.nodes
+
+    def bookResult(self, gs):
+        # The book's move as a finished search result, or None when gs is out of book
+        move = self.book.pickMove(gs) if self.book is not None else None
+        if move is None:
+            return None
+        if self.infoCallback:
+            self.infoCallback(f"info string book move {move.getUCINotation()}")
+        return SearchResult(move, 0, 0, [move])
+
+    def tablebaseResult(self, gs):
+        found = self.tablebase.bestMove(gs) if self.tablebase is not None else None
+        if found is None:
+            return None
+        move, outcome = found
+        if self.infoCallback:
+            self.infoCallback(f"info string tablebase move {move.getUCINotation()}")
+        return SearchResult(move, tablebaseScore(outcome, 0), 0, [move])
+
+    def search(self, gs, maxDepth=MAX_PLY, timeManager=None):
+        result = self.bookResult(gs) or self.tablebaseResult(gs)
+        if result is not None:
+            return result
+        self.startSearch(timeManager)
+        result = SearchResult()
+        score = 0
+        for depth in range(min(self.firstDepth, maxDepth), min(maxDepth, MAX_PLY) + 1):
+            if depth >= 3:
+                alpha, beta = score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+            else:
+                alpha, beta = -INFINITY, INFINITY
+            while True:
+                score = self.negamax(gs, depth, alpha, beta, 0)
+                if self.stopped:
+                    break
+                if score <= alpha:
+                    alpha = -INFINITY
+                elif score >= beta:
+                    beta = INFINITY
+                else:
+                    break
+            if self.stopped and result.bestMove is not None:
+                break
+            self.previousPv = self.pv[0][:]
+            result = SearchResult(self.pv[0][0] if self.pv[0] else None, score, depth, self.previousPv,
+                                  self.totalNodes(), self.timeManager.elapsedMs(), self.tt.hashfull())
+            if self.infoCallback:
+                self.infoCallback(formatInfo(result))
+            if self.stopped or abs(score) >= MATE_BOUND or not self.timeManager.canStartIteration():
+                break
+        if result.bestMove is None:
+            moves = gs.getValidMoves()
+            if moves:
+                result.bestMove, result.pv = moves[0], [moves[0]]
+        result.nodes = self.totalNodes()
+        result.timeMs = self.timeManager.elapsedMs()
+        return result
+
+    def checkStop(self):
+        if self.stopRequested or self.timeManager.outOfTime():
+            self.stopped = True
+
+    def negamax(self, gs, depth, alpha, beta, ply):
+        self.pv[ply] = []
+        # Draws: a repeat, dead material, or the fifty-move rule (unless the last move mated)
+        if ply > 0 and (gs.isRepetition(2) or gs.insufficientMaterial() or
+                        (gs.halfmoveClock >= 100 and (gs.hasLegalMove() or not gs.isInCheck()))):
+            return 0
+        if ply > 0 and self.tablebase is not None:
+            found = self.tablebase.probe(gs)
+            if found is not None:
+                return tablebaseScore(found, ply)
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(gs, alpha, beta, ply)
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0:
+            self.checkStop()
+        if self.stopped:
+            return 0
+        key = gs.positionKey()
+        ttMove = 0
+        entry = self.tt.probe(key)
+        if entry:
+            ttMove, ttDepth, bound, ttScore = entry
+            if ply > 0 and ttDepth >= depth:
+                ttScore = scoreFromTT(ttScore, ply)
+                if (bound == BOUND_EXACT or (bound == BOUND_LOWER and ttScore >= beta) or
+                        (bound == BOUND_UPPER and ttScore <= alpha)):
+                    return ttScore
+        if self.ordering:
+            pvMove = self.previousPv[ply] if ply < len(self.previousPv) else None
+            moves = self.orderer.pickMoves(gs, ply, (encodeMove(pvMove), ttMove))
+        else:
+            moves = gs.getValidMoves()
+        alphaOrig = alpha
+        best = -INFINITY
+        bestMove = None
+        snapshot = gs.snapshot() if self.copyMake else None
+        for move in moves:
+            gs.makeMove(move)
+            score = -self.negamax(gs, depth - 1, -beta, -alpha, ply + 1)
+            if snapshot:
+                gs.restore(snapshot)
+            else:
+                gs.undoMove()
+            if self.stopped:
+                return 0
+            if score > best:
+                best = score
+                bestMove = move
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+                    if alpha >= beta:
+                        if self.ordering:
+                            self.orderer.recordCutoff(move, ply, depth, gs.whiteToMove)
+                        break
+        if bestMove is None:
+            return -MATE_SCORE + ply if gs.isInCheck() else 0
+        if best <= alphaOrig:
+            bound = BOUND_UPPER
+        elif best >= beta:
+            bound = BOUND_LOWER
+        else:
+            bound = BOUND_EXACT
+        self.tt.store(key, depth, scoreToTT(best, ply), bound, encodeMove(bestMove))
+        return best
+
+    def quiescence(self, gs, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0:
+            self.checkStop()
+        if self.stopped:
+            return 0
+        if gs.insufficientMaterial():
+            return 0
+        standPat = evaluate(gs)
+        if standPat >= beta or ply >= MAX_PLY:
+            return standPat
+        if standPat > alpha:
+            alpha = standPat
+        captures = gs.generateCaptures()
+        captures.sort(key=captureOrder, reverse=True)
+        snapshot = gs.snapshot() if self.copyMake and captures else None
+        for move in captures:
+            gs.makeMove(move)
+            score = -self.quiescence(gs, -beta, -alpha, ply + 1)
+            if snapshot:
+                gs.restore(snapshot)
+            else:
+                gs.undoMove()
+            if self.stopped:
+                return 0
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+def findBestMove(gs, maxDepth=None, remainingMs=None, incrementMs=0, infoCallback=None, book=None):
+    timeManager = TimeManager.forClock(remainingMs, incrementMs) if remainingMs is not None else None
+    if maxDepth is None:
+        maxDepth = MAX_PLY if timeManager else 4
+    searcher = Searcher(infoCallback)
+    searcher.book = book
+    result = searcher.search(gs, maxDepth, timeManager)
+    return result.bestMove, result.pv
+
+def compareOrdering(depth=3, fens=BENCH_FENS):
+    # Nodes and time to reach the same depth with and without move ordering
+    results = []
+    for fen in fens:
+        row = {"fen": fen, "depth": depth}
+        for name, ordering in (("ordered", True), ("unordered", False)):
+            searcher = Searcher(None)
+            searcher.ordering = ordering
+            result = searcher.search(GameState.fromFEN(fen), depth)
+            row[name + "Nodes"] = result.nodes
+            row[name + "Ms"] = int(result.timeMs)
+        results.append(row)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Search the starting position")
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--movetime", type=int, default=None, help="milliseconds")
+    parser.add_argument("--compare-ordering", action="store_true",
+                        help="node counts with and without move ordering on the benchmark positions")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    if args.compare_ordering:
+        results = compareOrdering(args.depth or 3)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            raise SystemExit(0)
+        for r in results:
+            print(f"depth {r['depth']}  ordered {r['orderedNodes']:>9} nodes {r['orderedMs']:>7} ms  "
+                  f"unordered {r['unorderedNodes']:>9} nodes {r['unorderedMs']:>7} ms  "
+                  f"{r['unorderedNodes'] / max(1, r['orderedNodes']):5.1f}x  {r['fen']}")
+        raise SystemExit(0)
+    manager = TimeManager.fixed(args.movetime) if args.movetime else None
+    depth = args.depth or (MAX_PLY if args.movetime else 4)
+    result = Searcher().search(GameState(), depth, manager)
+    print("bestmove", result.bestMove.getUCINotation() if result.bestMove else "(none)")
@@ -0,0 +1,347 @@
+# Multi-game server: JSON lines over TCP, one asyncio event loop holding every GameState. Legal moves for each new
+# position are generated in a process pool, so the loop only parses, validates against the cached list and pushes.
+#
+# Client -> server (one JSON object per line, "id" is echoed back on the reply):
+#   {"op": "new", "base": 180, "inc": 2, "side": "white"|"black"|"both"}
+#   {"op": "join", "game": 7}        take the free side
+#   {"op": "watch", "game": 7}
+#   {"op": "move", "game": 7, "move": "e2e4"}
+#   {"op": "resign", "game": 7, "side": "white"|"black"}   side optional; default: the side this connection plays,
+#                                                         or the side to move if it plays both
+# Server -> client: "created", "joined", "ack", "error", and "update" pushed to players and watchers after every
+# move with the FEN, both clocks, the status and the legal moves for the side to move.
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from chessEngine import GameState, MoveCache
+from chessClock import GameClock
+
+DEFAULT_PORT = 8765
+MAX_LINE = 4096
+DEFAULT_CACHE_ENTRIES = 200000
+
+# Per-process legal move cache: openings and common lines recur across thousands of games
+_positionCache = None
+
+def _initWorker(cacheEntries):
+    global _positionCache
+    _positionCache = MoveCache(cacheEntries) if cacheEntries else None
+
+def positionInfo(fen):
+    # Runs in a worker process: legal moves and checkmate/stalemate status for one position
+    gs = GameState.fromFEN(fen)
+    gs.moveCache = _positionCache
+    return [m.getUCINotation() for m in gs.getValidMoves()], gs.positionStatus()
+
+class Game():
+    def __init__(self, gameId, baseMs, incrementMs):
+        self.id = gameId
+        self.gs = GameState()
+        self.clock = GameClock(baseMs, incrementMs)
+        self.players = {'w': None, 'b': None}
+        self.watchers = set()
+        self.lock = asyncio.Lock()
+        self.legal = set()
+        self.ready = None
+        self.status = "ongoing"
+        self.result = None
+        self.lastMove = None
+        self.flagTimer = None
+        # The clock starts once both seats are taken
+        self.clock.setActive(None)
+
+    def started(self):
+        return self.players['w'] is not None and self.players['b'] is not None
+
+    def sideToMove(self):
+        return 'w' if self.gs.whiteToMove else 'b'
+
+    def audience(self):
+        return {c for c in self.players.values() if c is not None} | self.watchers
+
+    def snapshot(self, legal=True):
+        return {"type": "update", "game": self.id, "fen": self.gs.toFEN(), "lastMove": self.lastMove,
+                "white_ms": self.clock.remainingMs('w'), "black_ms": self.clock.remainingMs('b'),
+                "status": self.status, "result": self.result,
+                "legal": sorted(self.legal) if legal and self.status == "ongoing" else []}
+
+class Connection():
+    def __init__(self, writer):
+        self.writer = writer
+        self.games = set()
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write((json.dumps(message, separators=(',', ':')) + "\n").encode())
+
+class GameServer():
+    def __init__(self, workers=None, cacheEntries=DEFAULT_CACHE_ENTRIES):
+        # workers=0 generates moves on the event loop itself (for comparison and tiny deployments). Workers are
+        # spawned: forked ones would inherit client sockets and keep connections open after we close them.
+        self.pool = None
+        if workers != 0:
+            self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_initWorker, initargs=(cacheEntries,))
+        else:
+            _initWorker(cacheEntries)
+        self.games = {}
+        self.ids = itertools.count(1)
+        self.movesPlayed = 0
+
+    async def moveInfo(self, gs):
+        if self.pool is None:
+            return positionInfo(gs.toFEN())
+        return await asyncio.get_running_loop().run_in_executor(self.pool, positionInfo, gs.toFEN())
+
+    async def handleClient(self, reader, writer):
+        conn = Connection(writer)
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if len(line) > MAX_LINE:
+                    conn.send({"type": "error", "message": "line too long"})
+                    continue
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    conn.send({"type": "error", "message": "bad json"})
+                    continue
+                # Each request runs on its own task so a move waiting on the pool doesn't hold up other games
+                task = asyncio.create_task(self.dispatch(conn, message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            # ValueError: a line longer than the stream limit; drop the client
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.disconnect(conn)
+            writer.close()
+
+    async def dispatch(self, conn, message):
+        op = message.get("op") if isinstance(message, dict) else None
+        requestId = message.get("id") if isinstance(message, dict) else None
+        handler = {"new": self.newGame, "join": self.joinGame, "watch": self.watchGame,
+                   "move": self.playMove, "resign": self.resign}.get(op)
+        if handler is None:
+            conn.send({"type": "error", "id": requestId, "message": f"unknown op {op}"})
+            return
+        try:
+            await handler(conn, message, requestId)
+        except (KeyError, TypeError, ValueError) as e:
+            conn.send({"type": "error", "id": requestId, "message": f"bad request: {e}"})
+
+    def findGame(self, conn, message, requestId):
+        game = self.games.get(message.get("game"))
+        if game is None:
+            conn.send({"type": "error", "id": requestId, "message": "no such game"})
+        return game
+
+    async def newGame(self, conn, message, requestId):
+        baseMs = int(float(message.get("base", 180)) * 1000)
+        incrementMs = int(float(message.get("inc", 0)) * 1000)
+        side = message.get("side", "white")
+        game = Game(next(self.ids), baseMs, incrementMs)
+        self.games[game.id] = game
+        if side in ("white", "both"):
+            game.players['w'] = conn
+        if side in ("black", "both"):
+            game.players['b'] = conn
+        conn.games.add(game.id)
+        if game.started():
+            game.clock.setActive('w')
+        conn.send({"type": "created", "id": requestId, "game": game.id, "side": side})
+        game.ready = asyncio.ensure_future(self.refresh(game))
+        await game.ready
+
+    async def joinGame(self, conn, message, requestId):
+        game = self.findGame(conn, message, requestId)
+        if game is None:
+            return
+        free = [side for side in ('w', 'b') if game.players[side] is None]
+        if not free:
+            conn.send({"type": "error", "id": requestId, "message": "game is full"})
+            return
+        game.players[free[0]] = conn
+        conn.games.add(game.id)
+        conn.send({"type": "joined", "id": requestId, "game": game.id, "side": "white" if free[0] == 'w' else "black"})
+        await game.ready
+        if game.started() and game.status == "ongoing":
+            game.clock.setActive(game.sideToMove())
+            self.armFlagTimer(game)
+        self.push(game)
+
+    async def watchGame(self, conn, message, requestId):
+        game = self.findGame(conn, message, requestId)
+        if game is None:
+            return
+        game.watchers.add(conn)
+        conn.games.add(game.id)
+        await game.ready
+        conn.send(game.snapshot(legal=False))
+
+    async def playMove(self, conn, message, requestId):
+        game = self.findGame(conn, message, requestId)
+        if game is None:
+            return
+        uci = str(message["move"])
+        async with game.lock:
+            # Moves are validated against the list generated for this position; wait for it if still in the pool
+            await game.ready
+            side = game.sideToMove()
+            error = None
+            if game.status != "ongoing":
+                error = "game is over"
+            elif not game.started():
+                error = "waiting for an opponent"
+            elif game.players[side] is not conn:
+                error = "not your move"
+            elif uci not in game.legal:
+                error = "illegal move"
+            elif game.clock.remainingMs(side) <= 0:
+                self.flag(game)
+                error = "out of time"
+            if error:
+                conn.send({"type": "error", "id": requestId, "game": game.id, "message": error})
+                return
+            game.gs.makeMove(game.gs.moveFromUCI(uci))
+            game.clock.addIncrement(side)
+            game.clock.setActive(game.sideToMove())
+            game.lastMove = uci
+            self.movesPlayed += 1
+            conn.send({"type": "ack", "id": requestId, "game": game.id, "move": uci})
+            game.ready = asyncio.ensure_future(self.refresh(game))
+        await game.ready
+
+    async def resign(self, conn, message, requestId):
+        game = self.findGame(conn, message, requestId)
+        if game is None:
+            return
+        async with game.lock:
+            playing = [s for s in ('w', 'b') if game.players[s] is conn]
+            side = {"white": 'w', "black": 'b'}.get(message.get("side"))
+            if side is None and "side" not in message:
+                side = playing[0] if len(playing) == 1 else game.sideToMove() if playing else None
+            if side not in playing or game.status != "ongoing":
+                conn.send({"type": "error", "id": requestId, "game": game.id, "message": "cannot resign"})
+                return
+            self.finish(game, "resigned", "0-1" if side == 'w' else "1-0")
+
+    async def refresh(self, game):
+        # Generate the new position's legal moves, settle the game result, then tell everyone
+        legal, _ = await self.moveInfo(game.gs)
+        game.legal = set(legal)
+        if game.status != "ongoing":
+            # Resigned or flagged while the pool was working
+            return
+        # The same rules as the desktop game; hasLegalMove stops at the first legal move, so this stays cheap
+        status = game.gs.gameStatus()
+        if status == "checkmate":
+            self.finish(game, "checkmate", "0-1" if game.gs.whiteToMove else "1-0", push=False)
+        elif status:
+            self.finish(game, status, "1/2-1/2", push=False)
+        elif game.started():
+            self.armFlagTimer(game)
+        self.push(game)
+
+    def push(self, game):
+        update = game.snapshot()
+        for conn in game.audience():
+            conn.send(update if conn in game.players.values() else dict(update, legal=[]))
+
+    def armFlagTimer(self, game):
+        if game.flagTimer is not None:
+            game.flagTimer.cancel()
+        side = game.sideToMove()
+        delay = game.clock.remainingMs(side) / 1000 + 0.001
+        game.flagTimer = asyncio.get_running_loop().call_later(delay, self.checkFlag, game)
+
+    def checkFlag(self, game):
+        game.flagTimer = None
+        if game.status != "ongoing":
+            return
+        if game.clock.remainingMs(game.sideToMove()) <= 0 and not game.lock.locked():
+            self.flag(game)
+        else:
+            self.armFlagTimer(game)
+
+    def flag(self, game):
+        self.finish(game, "timeout", "0-1" if game.sideToMove() == 'w' else "1-0")
+
+    def finish(self, game, status, result, push=True):
+        game.status = status
+        game.result = result
+        game.clock.setActive(None)
+        if game.flagTimer is not None:
+            game.flagTimer.cancel()
+            game.flagTimer = None
+        if push:
+            self.push(game)
+
+    def disconnect(self, conn):
+        for gameId in conn.games:
+            game = self.games.get(gameId)
+            if game is None:
+                continue
+            game.watchers.discard(conn)
+            for side in ('w', 'b'):
+                if game.players[side] is conn:
+                    game.players[side] = None
+            if game.players['w'] is None and game.players['b'] is None:
+                if game.flagTimer is not None:
+                    game.flagTimer.cancel()
+                del self.games[gameId]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+async def serve(host, port, workers=None, cacheEntries=DEFAULT_CACHE_ENTRIES, ready=None):
+    gameServer = GameServer(workers, cacheEntries)
+    server = await asyncio.start_server(gameServer.handleClient, host, port, limit=MAX_LINE * 2)
+    address = server.sockets[0].getsockname()
+    print(f"listening on {address[0]}:{address[1]}", flush=True)
+    if ready is not None:
+        ready.set_result(address)
+    stop = asyncio.Event()
+    try:
+        # SIGTERM (the load test, service managers) shuts the pool down instead of orphaning its workers
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, AttributeError):
+        pass
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        gameServer.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many concurrent games over a JSON-lines TCP protocol")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument("--workers", type=int, default=None, help="move generation processes (0 = on the event loop)")
+    parser.add_argument("--move-cache", type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help="cached positions per worker (0 disables)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.move_cache))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# Make/unmake vs copy-make: per-move cost of going back to the parent (undoMove vs restore(snapshot)), perft
+# throughput with each, and the cost of handing a position to another process (pickled GameState, FEN, snapshot).
+
+import argparse
+import json
+import pickle
+import sys
+import time
+from chessEngine import GameState
+from chessPerft import SUITE, perft
+
+BENCH_POSITIONS = ["initial", "kiwipete", "position3", "position4"]
+
+def timeLoop(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return time.perf_counter() - start
+
+def childCosts(gs, repeat):
+    # Microseconds per child position: make + undo, and make + restore with one snapshot per parent
+    moves = gs.getValidMoves()
+
+    def makeUnmake():
+        for move in moves:
+            gs.makeMove(move)
+            gs.undoMove()
+
+    def copyMake():
+        snapshot = gs.snapshot()
+        for move in moves:
+            gs.makeMove(move)
+            gs.restore(snapshot)
+
+    perChild = 1e6 / (repeat * len(moves))
+    return {"moves": len(moves), "makeUnmakeUs": round(timeLoop(makeUnmake, repeat) * perChild, 2),
+            "copyMakeUs": round(timeLoop(copyMake, repeat) * perChild, 2)}
+
+def perftRates(gs, depth):
+    rates = {}
+    for name, copyMake in (("makeUnmake", False), ("copyMake", True)):
+        start = time.perf_counter()
+        nodes = perft(gs, depth, copyMake)
+        seconds = time.perf_counter() - start
+        rates[name + "Nps"] = int(nodes / seconds) if seconds > 0 else 0
+    return rates
+
+def handOffCosts(gs, repeat):
+    # Bytes on the wire and microseconds to serialize + rebuild a usable GameState on the other side
+    fen = gs.toFEN()
+    snapshot = gs.snapshot()
+    ways = {
+        "pickle": (lambda: pickle.dumps(gs), pickle.loads),
+        "fen": (lambda: pickle.dumps(gs.toFEN()), lambda data: GameState.fromFEN(pickle.loads(data))),
+        "snapshot": (lambda: pickle.dumps(gs.snapshot()), lambda data: GameState.fromSnapshot(pickle.loads(data))),
+    }
+    costs = {}
+    for name, (dump, load) in ways.items():
+        data = dump()
+        costs[name + "Bytes"] = len(data)
+        costs[name + "Us"] = round(timeLoop(lambda: load(dump()), repeat) * 1e6 / repeat, 2)
+    assert GameState.fromSnapshot(snapshot).toFEN() == fen
+    return costs
+
+def runBench(depth=3, repeat=2000):
+    results = []
+    for entry in SUITE:
+        if entry["name"] not in BENCH_POSITIONS:
+            continue
+        gs = GameState.fromFEN(entry["fen"])
+        # One ply in, so the pickled state carries some move history
+        for move in gs.getValidMoves()[:1]:
+            gs.makeMove(move)
+        result = {"name": entry["name"], "depth": depth}
+        result.update(handOffCosts(gs, repeat))
+        result.update(childCosts(gs, repeat))
+        result.update(perftRates(gs, depth))
+        results.append(result)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Make/unmake vs copy-make (snapshot/restore) micro-benchmark")
+    parser.add_argument("--depth", type=int, default=3, help="perft depth for the throughput comparison")
+    parser.add_argument("--repeat", type=int, default=2000, help="iterations for the per-move and hand-off timings")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    results = runBench(args.depth, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    for r in results:
+        print(f"{r['name']:10s} per child: make/undo {r['makeUnmakeUs']:6.2f}us  copy-make {r['copyMakeUs']:6.2f}us   "
+              f"perft {r['depth']}: {r['makeUnmakeNps']} vs {r['copyMakeNps']} nodes/s")
+        print(f"{'':10s} hand-off: pickle {r['pickleBytes']}B {r['pickleUs']}us  fen {r['fenBytes']}B {r['fenUs']}us  "
+              f"snapshot {r['snapshotBytes']}B {r['snapshotUs']}us")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,628 @@
+# Endgame tablebases by retrograde analysis: one byte of distance to mate per position for small material signatures
+# (KQK, KRK, KPK, KQKR, ...), stored as flat files under a perfect position index with symmetry reduction and
+# memory-mapped, so a probe is an index computation and a byte read.
+# Tables ignore castling and en passant; probe() declines positions that still have either.
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from chessEngine import GameState
+
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+TABLE_SUFFIX = ".tb"
+# Stored byte: DRAW, ILLEGAL for index values no position maps to, otherwise plies to mate + 1.
+# Odd plies: the side to move mates; even plies: it gets mated (1 = checkmated now).
+DRAW = 0
+ILLEGAL = 255
+MAX_PLIES = 253
+PIECE_ORDER = "QRBNP"
+PIECE_STRENGTH = {'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+# Signatures nobody can win; captures into them are draws without a table
+DRAWN_SIGNATURES = {"KK", "KBK", "KNK"}
+CHUNKS_PER_WORKER = 16
+# Levels smaller than this are expanded in-process; shipping them to workers costs more than it saves
+PARALLEL_MIN_FRONTIER = 2000
+
+# Squares are rank*8 + file with rank 0 = White's first rank (GameState row r is rank 7 - r)
+def _onBoard(f, r):
+    return 0 <= f < 8 and 0 <= r < 8
+
+def _stepTargets(deltas):
+    return [[(r + dr)*8 + f + df for df, dr in deltas if _onBoard(f + df, r + dr)] for r in range(8) for f in range(8)]
+
+KING_DELTAS = [(-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+KNIGHT_DELTAS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+ROOK_DIRS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+BISHOP_DIRS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+KING_TARGETS = _stepTargets(KING_DELTAS)
+KNIGHT_TARGETS = _stepTargets(KNIGHT_DELTAS)
+KING_MASKS = [sum(1 << t for t in targets) for targets in KING_TARGETS]
+KNIGHT_MASKS = [sum(1 << t for t in targets) for targets in KNIGHT_TARGETS]
+# PAWN_MASKS[white][sq]: squares a pawn on sq attacks
+PAWN_MASKS = [[sum(1 << (r + dr)*8 + f + df for df in (-1, 1) if _onBoard(f + df, r + dr))
+               for r in range(8) for f in range(8)] for dr in (-1, 1)]
+
+def _rays(dirs):
+    rays = []
+    for sq in range(64):
+        f, r = sq % 8, sq // 8
+        lines = []
+        for df, dr in dirs:
+            line = []
+            nf, nr = f + df, r + dr
+            while _onBoard(nf, nr):
+                line.append(nr*8 + nf)
+                nf, nr = nf + df, nr + dr
+            if line:
+                lines.append(line)
+        rays.append(lines)
+    return rays
+
+ROOK_RAYS = _rays(ROOK_DIRS)
+BISHOP_RAYS = _rays(BISHOP_DIRS)
+SLIDER_RAYS = {'R': ROOK_RAYS, 'B': BISHOP_RAYS, 'Q': [ROOK_RAYS[sq] + BISHOP_RAYS[sq] for sq in range(64)]}
+
+def _lineMasks(rays):
+    # masks[a][b]: squares strictly between a and b when they share a ray of this kind, else None
+    masks = [[None]*64 for _ in range(64)]
+    for a in range(64):
+        for line in rays[a]:
+            between = 0
+            for b in line:
+                masks[a][b] = between
+                between |= 1 << b
+    return masks
+
+ROOK_BETWEEN = _lineMasks(ROOK_RAYS)
+BISHOP_BETWEEN = _lineMasks(BISHOP_RAYS)
+
+# The 8 symmetries of the board; pawns only allow the first two (identity, file mirror)
+TRANSFORMS = [[(fn(sq % 8, sq // 8)[1])*8 + fn(sq % 8, sq // 8)[0] for sq in range(64)] for fn in (
+    lambda f, r: (f, r), lambda f, r: (7 - f, r), lambda f, r: (f, 7 - r), lambda f, r: (7 - f, 7 - r),
+    lambda f, r: (r, f), lambda f, r: (7 - r, f), lambda f, r: (r, 7 - f), lambda f, r: (7 - r, 7 - f))]
+# Where the white king may stand in a stored position: the a1-d1-d4 triangle without pawns, files a-d with them
+TRIANGLE = [r*8 + f for r in range(4) for f in range(4) if r <= f]
+QUEENSIDE = [r*8 + f for r in range(8) for f in range(4)]
+
+def attacked(pieces, occ, sq, byWhite):
+    for white, kind, at in pieces:
+        if white != byWhite:
+            continue
+        if kind == 'K':
+            if KING_MASKS[at] >> sq & 1:
+                return True
+        elif kind == 'N':
+            if KNIGHT_MASKS[at] >> sq & 1:
+                return True
+        elif kind == 'P':
+            if PAWN_MASKS[white][at] >> sq & 1:
+                return True
+        else:
+            if kind != 'B':
+                between = ROOK_BETWEEN[at][sq]
+                if between is not None and not between & occ:
+                    return True
+            if kind != 'R':
+                between = BISHOP_BETWEEN[at][sq]
+                if between is not None and not between & occ:
+                    return True
+    return False
+
+def inCheck(pieces, white):
+    occ = 0
+    for _, _, at in pieces:
+        occ |= 1 << at
+    for w, kind, at in pieces:
+        if w == white and kind == 'K':
+            return attacked(pieces, occ, at, not white)
+    return False
+
+def _targets(kind, white, at, occ, colors):
+    # (to, promotion pieces) for a piece; colors: square -> is-white of its occupant
+    if kind == 'K' or kind == 'N':
+        for to in (KING_TARGETS if kind == 'K' else KNIGHT_TARGETS)[at]:
+            if colors.get(to, not white) != white:
+                yield to, kind
+    elif kind == 'P':
+        step = 8 if white else -8
+        last = 7 if white else 0
+        to = at + step
+        promotions = PIECE_ORDER[:4] if to // 8 == last else kind
+        if not occ >> to & 1:
+            yield to, promotions
+            if at // 8 == (1 if white else 6) and not occ >> (to + step) & 1:
+                yield to + step, kind
+        for to in (KING_TARGETS[at]):
+            if to - at in (step - 1, step + 1) and abs(to % 8 - at % 8) == 1 and colors.get(to, white) != white:
+                yield to, promotions
+    else:
+        for line in SLIDER_RAYS[kind][at]:
+            for to in line:
+                if occ >> to & 1:
+                    if colors[to] != white:
+                        yield to, kind
+                    break
+                yield to, kind
+
+def legalChildren(pieces, whiteToMove):
+    # (child pieces, leavesTable) for each legal move; a capture or promotion changes the material
+    occ = 0
+    colors = {}
+    for white, _, at in pieces:
+        occ |= 1 << at
+        colors[at] = white
+    for i, (white, kind, at) in enumerate(pieces):
+        if white != whiteToMove:
+            continue
+        for to, promotions in _targets(kind, white, at, occ, colors):
+            captured = to in colors
+            for promotion in promotions:
+                child = [(white, promotion, to) if j == i else p for j, p in enumerate(pieces)
+                         if not captured or p[2] != to]
+                if not inCheck(child, whiteToMove):
+                    yield child, captured or promotion != kind
+
+def retractions(pieces, whiteToMove):
+    # Positions one quiet (non-capturing, non-promoting) move earlier; the side that moved is the one not to move now
+    mover = not whiteToMove
+    occ = 0
+    for _, _, at in pieces:
+        occ |= 1 << at
+    for i, (white, kind, at) in enumerate(pieces):
+        if white != mover:
+            continue
+        if kind == 'P':
+            step = 8 if white else -8
+            origins = []
+            back = at - step
+            if 8 <= back < 56 and not occ >> back & 1:
+                origins.append(back)
+                if at // 8 == (3 if white else 4) and not occ >> (back - step) & 1:
+                    origins.append(back - step)
+        elif kind == 'K' or kind == 'N':
+            origins = [to for to in (KING_TARGETS if kind == 'K' else KNIGHT_TARGETS)[at] if not occ >> to & 1]
+        else:
+            origins = []
+            for line in SLIDER_RAYS[kind][at]:
+                for to in line:
+                    if occ >> to & 1:
+                        break
+                    origins.append(to)
+        for origin in origins:
+            parent = [(white, kind, origin) if j == i else p for j, p in enumerate(pieces)]
+            # The side not to move in the parent may not be in check
+            if not inCheck(parent, whiteToMove):
+                yield parent
+
+def signatureOf(pieces):
+    whites = "".join(sorted((kind for white, kind, _ in pieces if white and kind != 'K'), key=PIECE_ORDER.index))
+    blacks = "".join(sorted((kind for white, kind, _ in pieces if not white and kind != 'K'), key=PIECE_ORDER.index))
+    return "K" + whites + "K" + blacks
+
+def canonicalSignature(signature):
+    # The orientation tables are stored in: the stronger side plays White
+    whites, blacks = signature[1:].split('K')
+    def strength(side):
+        return sorted((PIECE_STRENGTH[k] for k in side), reverse=True)
+    if (strength(blacks), blacks) > (strength(whites), whites):
+        return "K" + blacks + "K" + whites
+    return signature
+
+def flipColors(pieces):
+    return [(not white, kind, at ^ 56) for white, kind, at in pieces]
+
+class TableLayout():
+    # The perfect index for one signature: side to move, white king slot, then one coordinate per other piece
+    def __init__(self, signature):
+        self.signature = signature
+        whites, blacks = signature[1:].split('K')
+        self.kinds = [(True, 'K'), (False, 'K')] + [(True, k) for k in whites] + [(False, k) for k in blacks]
+        self.hasPawns = 'P' in signature
+        slots = QUEENSIDE if self.hasPawns else TRIANGLE
+        self.slotSquares = slots
+        self.slotOf = {sq: i for i, sq in enumerate(slots)}
+        transforms = TRANSFORMS[:2] if self.hasPawns else TRANSFORMS
+        self.kingTransforms = [[t for t in transforms if t[sq] in self.slotOf] for sq in range(64)]
+        # Pawns live on ranks 2-7 only
+        self.pawn = [kind == 'P' for _, kind in self.kinds]
+        self.dims = [len(slots)] + [48 if p else 64 for p in self.pawn[1:]]
+        # Two identical pieces (KRRK) are stored in square order, so swapping them is the same position
+        self.groups = [(i, i + 1) for i in range(2, len(self.kinds) - 1) if self.kinds[i] == self.kinds[i + 1]]
+        self.sidePositions = 1
+        for dim in self.dims:
+            self.sidePositions *= dim
+        self.size = 2 * self.sidePositions
+
+    def arrange(self, pieces):
+        # Squares in layout order for pieces of this signature
+        order = {kind: [] for kind in self.kinds}
+        for white, kind, at in pieces:
+            order[(white, kind)].append(at)
+        squares = []
+        for kind in self.kinds:
+            squares.append(order[kind].pop())
+        return squares
+
+    def index(self, squares, whiteToMove):
+        best = None
+        for table in self.kingTransforms[squares[0]]:
+            mapped = [table[sq] for sq in squares]
+            for i, j in self.groups:
+                if mapped[i] > mapped[j]:
+                    mapped[i], mapped[j] = mapped[j], mapped[i]
+            if best is None or mapped < best:
+                best = mapped
+        index = self.slotOf[best[0]] + (0 if whiteToMove else self.dims[0])
+        for k in range(1, len(best)):
+            index = index * self.dims[k] + (best[k] - 8 if self.pawn[k] else best[k])
+        return index
+
+    def decode(self, index):
+        squares = [0]*len(self.kinds)
+        for k in range(len(self.kinds) - 1, 0, -1):
+            index, value = divmod(index, self.dims[k])
+            squares[k] = value + 8 if self.pawn[k] else value
+        side, slot = divmod(index, self.dims[0])
+        squares[0] = self.slotSquares[slot]
+        return squares, side == 0
+
+    def pieces(self, squares):
+        return [(white, kind, at) for (white, kind), at in zip(self.kinds, squares)]
+
+def tablePath(signature, directory=TABLE_DIR):
+    return os.path.join(directory, signature + TABLE_SUFFIX)
+
+class Tablebase():
+    # Read-only access to every table in a directory; files are mapped on first use
+    def __init__(self, directory=TABLE_DIR):
+        self.directory = directory
+        self.tables = {}
+        self.maxPieces = 0
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.endswith(TABLE_SUFFIX):
+                    self.maxPieces = max(self.maxPieces, len(name) - len(TABLE_SUFFIX))
+
+    def table(self, signature):
+        if signature not in self.tables:
+            path = tablePath(signature, self.directory)
+            if not os.path.exists(path):
+                return None
+            layout = TableLayout(signature)
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(data) != layout.size:
+                data.close()
+                raise ValueError(f"{path}: expected {layout.size} bytes, found {len(data)}")
+            self.tables[signature] = (layout, data)
+        return self.tables[signature]
+
+    def probePieces(self, pieces, whiteToMove):
+        # Stored byte for a position (DRAW, or plies + 1), None if there is no table for its material
+        signature = signatureOf(pieces)
+        canonical = canonicalSignature(signature)
+        if canonical in DRAWN_SIGNATURES:
+            return DRAW
+        if canonical != signature:
+            pieces, whiteToMove = flipColors(pieces), not whiteToMove
+        found = self.table(canonical)
+        if found is None:
+            return None
+        layout, data = found
+        return data[layout.index(layout.arrange(pieces), whiteToMove)]
+
+    def probe(self, gs):
+        # (result, plies) for the side to move: result 1 mates in plies, -1 is mated in plies, 0 draws.
+        # None when the material has no table, or castling or an en passant capture is still possible.
+        if sum(gs.pieceCounts.values()) > self.maxPieces or gs.castle or self.enPassantCapture(gs):
+            return None
+        # GameState writes pawns as 'p'
+        pieces = [(piece[0] == 'w', piece[1].upper(), (7 - r)*8 + c) for r, row in enumerate(gs.board)
+                  for c, piece in enumerate(row) if piece != "--"]
+        value = self.probePieces(pieces, gs.whiteToMove)
+        if value is None or value == ILLEGAL:
+            return None
+        return decodeValue(value)
+
+    def enPassantCapture(self, gs):
+        if not gs.enPassantPossible:
+            return False
+        r, c = gs.enPassantPossible
+        pawn = "wp" if gs.whiteToMove else "bp"
+        row = gs.board[r + 1 if gs.whiteToMove else r - 1]
+        return any(0 <= col < 8 and row[col] == pawn for col in (c - 1, c + 1))
+
+    def value(self, gs):
+        # probe(gs), except that a position the tables skip only because of an en passant capture (one a double pawn
+        # push just allowed) is settled by looking one ply further
+        result = self.probe(gs)
+        if result is None and not gs.castle and self.enPassantCapture(gs):
+            if not gs.hasLegalMove():
+                # The capture is pinned and nothing else moves
+                return (-1, 0) if gs.isInCheck() else (0, 0)
+            found = self.bestMove(gs)
+            result = found[1] if found else None
+        return result
+
+    def bestMove(self, gs):
+        # (move, (result, plies)): the fastest mate, else a draw, else the slowest loss; None if gs is not covered
+        # (including a reply whose position has no table) or has no legal moves
+        if gs.castle or sum(gs.pieceCounts.values()) > self.maxPieces:
+            return None
+        best = None
+        for move in gs.getValidMoves():
+            gs.makeMove(move)
+            child = self.value(gs)
+            gs.undoMove()
+            if child is None:
+                return None
+            ours = (-child[0], child[1] + 1 if child[0] else 0)
+            rank = (ours[0], -ours[1] if ours[0] > 0 else ours[1])
+            if best is None or rank > best[0]:
+                best = (rank, move, ours)
+        return (best[1], best[2]) if best else None
+
+    def close(self):
+        for _, data in self.tables.values():
+            data.close()
+        self.tables = {}
+
+def decodeValue(value):
+    # (result, plies) for a stored byte other than ILLEGAL
+    if value == DRAW:
+        return 0, 0
+    plies = value - 1
+    return (1 if plies % 2 else -1), plies
+
+def requiredTables(signature):
+    # Tables a capture or a promotion from this signature lands in
+    whites, blacks = signature[1:].split('K')
+    needed = set()
+    for side, other, white in ((whites, blacks, True), (blacks, whites, False)):
+        variants = [side.replace(k, '', 1) for k in set(side)]
+        if 'P' in side:
+            variants += [side.replace('P', promo, 1) for promo in PIECE_ORDER[:4]]
+        for variant in variants:
+            variant = "".join(sorted(variant, key=PIECE_ORDER.index))
+            candidate = "K" + variant + "K" + other if white else "K" + other + "K" + variant
+            candidate = canonicalSignature(candidate)
+            if candidate not in DRAWN_SIGNATURES and candidate != signature:
+                needed.add(candidate)
+    return sorted(needed, key=len)
+
+# Worker state: layouts and sub-tables are opened once per process
+_layouts = {}
+_subtables = None
+
+def _worker(signature, directory):
+    global _subtables
+    if signature not in _layouts:
+        _layouts[signature] = TableLayout(signature)
+    if _subtables is None or _subtables.directory != directory:
+        _subtables = Tablebase(directory)
+    return _layouts[signature], _subtables
+
+def _initChunk(args):
+    # Per index: ILLEGAL / mated (1) / 0 in values, distinct in-table successors (+1 for a non-losing exit) in counts,
+    # the plies of the longest loss through an exit in exitLoss, and (index, plies) seeds for results exits decide
+    signature, directory, start, end = args
+    layout, subtables = _worker(signature, directory)
+    values = bytearray(end - start)
+    counts = bytearray(end - start)
+    exitLoss = bytearray(end - start)
+    seeds = []
+    for index in range(start, end):
+        squares, whiteToMove = layout.decode(index)
+        k = index - start
+        if len(set(squares)) != len(squares) or layout.index(squares, whiteToMove) != index:
+            values[k] = ILLEGAL
+            continue
+        pieces = layout.pieces(squares)
+        if inCheck(pieces, not whiteToMove):
+            values[k] = ILLEGAL
+            continue
+        successors = set()
+        openExit = False
+        exitWin = 0
+        longestLoss = 0
+        anyMove = False
+        for child, leaves in legalChildren(pieces, whiteToMove):
+            anyMove = True
+            if not leaves:
+                successors.add(layout.index([at for _, _, at in child], not whiteToMove))
+                continue
+            value = subtables.probePieces(child, not whiteToMove)
+            if value is None:
+                raise RuntimeError(f"{signature} needs the {canonicalSignature(signatureOf(child))} table")
+            if value == DRAW:
+                openExit = True
+            elif value % 2:
+                # The opponent is mated in value - 1 plies, so we mate in value; otherwise we are mated in value
+                openExit = True
+                exitWin = value if not exitWin else min(exitWin, value)
+            else:
+                longestLoss = max(longestLoss, value)
+        if not anyMove:
+            values[k] = 1 if inCheck(pieces, whiteToMove) else DRAW
+            continue
+        counts[k] = len(successors) + (1 if openExit else 0)
+        exitLoss[k] = longestLoss
+        if exitWin:
+            seeds.append((index, exitWin))
+        elif not counts[k]:
+            seeds.append((index, longestLoss))
+    return start, bytes(values), bytes(counts), bytes(exitLoss), seeds
+
+def _expandChunk(args):
+    # Distinct parents of each frontier position, flattened
+    signature, directory, frontier = args
+    layout, _ = _worker(signature, directory)
+    parents = array('I')
+    for index in _indices(frontier):
+        squares, whiteToMove = layout.decode(index)
+        parents.extend({layout.index([at for _, _, at in parent], not whiteToMove)
+                        for parent in retractions(layout.pieces(squares), whiteToMove)})
+    return parents.tobytes()
+
+def _indices(data):
+    indices = array('I')
+    indices.frombytes(data)
+    return indices
+
+class TableGenerator():
+    def __init__(self, directory=TABLE_DIR, workers=None, log=print):
+        self.directory = directory
+        self.workers = workers or os.cpu_count() or 1
+        self.log = log
+
+    def generate(self, signature, force=False):
+        # Builds signature and every table it depends on; returns a summary per generated table
+        signature = canonicalSignature(signature)
+        summaries = []
+        for needed in requiredTables(signature):
+            if not os.path.exists(tablePath(needed, self.directory)):
+                summaries += self.generate(needed)
+        if force or not os.path.exists(tablePath(signature, self.directory)):
+            summaries.append(self.build(signature))
+        return summaries
+
+    def run(self, pool, function, tasks):
+        if pool is None:
+            for task in tasks:
+                yield function(task)
+        else:
+            for future in as_completed([pool.submit(function, task) for task in tasks]):
+                yield future.result()
+
+    def build(self, signature):
+        os.makedirs(self.directory, exist_ok=True)
+        layout = TableLayout(signature)
+        size = layout.size
+        start = time.perf_counter()
+        pool = None
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            values = bytearray(size)
+            counts = bytearray(size)
+            exitLoss = bytearray(size)
+            pending = {}
+            chunk = max(1, -(-size // (self.workers * CHUNKS_PER_WORKER)))
+            tasks = [(signature, self.directory, i, min(size, i + chunk)) for i in range(0, size, chunk)]
+            done = 0
+            for first, chunkValues, chunkCounts, chunkExits, seeds in self.run(pool, _initChunk, tasks):
+                end = first + len(chunkValues)
+                values[first:end] = chunkValues
+                counts[first:end] = chunkCounts
+                exitLoss[first:end] = chunkExits
+                for index, plies in seeds:
+                    pending.setdefault(plies, []).append(index)
+                done += end - first
+                if self.log:
+                    seconds = time.perf_counter() - start
+                    self.log(f"{signature} init {100 * done // size:3d}%  {int(done / seconds)} positions/s")
+            frontier = array('I', (i for i in range(size) if values[i] == 1))
+            plies = 0
+            while frontier or pending:
+                for index in pending.pop(plies, ()):
+                    if values[index] == DRAW:
+                        values[index] = plies + 1
+                        frontier.append(index)
+                if plies + 2 > MAX_PLIES and frontier:
+                    raise RuntimeError(f"{signature}: mates longer than {MAX_PLIES} plies do not fit in a byte")
+                following = array('I')
+                for index in self.parents(pool, signature, frontier):
+                    if values[index] != DRAW:
+                        continue
+                    if plies % 2 == 0:
+                        # The frontier side is mated: its parents mate one ply sooner than it is mated
+                        values[index] = plies + 2
+                        following.append(index)
+                    else:
+                        counts[index] -= 1
+                        if not counts[index]:
+                            loss = max(plies + 1, exitLoss[index])
+                            if loss == plies + 1:
+                                values[index] = plies + 2
+                                following.append(index)
+                            else:
+                                pending.setdefault(loss, []).append(index)
+                if self.log and frontier:
+                    self.log(f"{signature} plies {plies:3d}  {len(frontier)} positions")
+                frontier = following
+                plies += 1
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        path = tablePath(signature, self.directory)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(values)
+        os.replace(path + ".tmp", path)
+        return self.summarize(signature, values, time.perf_counter() - start)
+
+    def parents(self, pool, signature, frontier):
+        if pool is None or len(frontier) < PARALLEL_MIN_FRONTIER:
+            yield from _indices(_expandChunk((signature, self.directory, frontier.tobytes())))
+            return
+        chunk = max(1, -(-len(frontier) // (self.workers * CHUNKS_PER_WORKER)))
+        tasks = [(signature, self.directory, frontier[i:i + chunk].tobytes()) for i in range(0, len(frontier), chunk)]
+        for result in self.run(pool, _expandChunk, tasks):
+            yield from _indices(result)
+
+    def summarize(self, signature, values, seconds):
+        legal = wins = losses = longest = 0
+        for value in values:
+            if value == ILLEGAL:
+                continue
+            legal += 1
+            if value:
+                if (value - 1) % 2:
+                    wins += 1
+                    longest = max(longest, value - 1)
+                else:
+                    losses += 1
+        summary = {"signature": signature, "indices": len(values), "positions": legal, "wins": wins, "losses": losses,
+                   "draws": legal - wins - losses, "longestMatePlies": longest, "seconds": round(seconds, 2),
+                   "positionsPerSecond": int(len(values) / seconds) if seconds > 0 else 0}
+        if self.log:
+            self.log(f"{signature}: {legal} positions ({wins} wins, {losses} losses, {summary['draws']} draws), "
+                     f"longest mate {(longest + 1) // 2} moves, {summary['seconds']}s, "
+                     f"{summary['positionsPerSecond']} indices/s")
+        return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate or probe endgame tablebases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="build tables (and the ones they depend on)")
+    generate.add_argument("signatures", nargs="+", help="material, e.g. KQK KRK KPK KQKR")
+    generate.add_argument("--workers", type=int, default=None)
+    generate.add_argument("--force", action="store_true", help="rebuild tables that already exist")
+    probe = commands.add_parser("probe", help="distance to mate and best move for a position")
+    probe.add_argument("fen")
+    for command in (generate, probe):
+        command.add_argument("--dir", default=TABLE_DIR)
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generator = TableGenerator(args.dir, args.workers)
+        for signature in args.signatures:
+            generator.generate(signature.upper(), args.force)
+        return 0
+    tablebase = Tablebase(args.dir)
+    gs = GameState.fromFEN(args.fen)
+    found = tablebase.value(gs)
+    if found is None:
+        print("not in the tablebases")
+        return 1
+    result, plies = found
+    outcome = "draw" if not result else f"mate in {(plies + 1) // 2}" if result > 0 else f"mated in {plies // 2}"
+    best = tablebase.bestMove(gs)
+    print(f"{outcome} ({plies} plies)" + (f", best move {best[0].getUCINotation()}" if best else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# Transposition table: flat array of 64-bit words, two-slot buckets (depth-preferred + always-replace), generation aging
+
+from array import array
+from multiprocessing import shared_memory
+from chessEngine import PROMOTION_PIECES
+
+BOUND_EXACT, BOUND_LOWER, BOUND_UPPER = 1, 2, 3
+
+# Bucket = 4 words: [key ^ data, data] for the depth-preferred slot, then the always-replace slot.
+# data bits: 0-15 move, 16-23 depth, 24-25 bound, 26-31 generation, 32-63 score + SCORE_OFFSET.
+# Storing key ^ data lets a probe reject an entry whose two words were written by different stores.
+WORDS_PER_BUCKET = 4
+BYTES_PER_BUCKET = WORDS_PER_BUCKET * 8
+SCORE_OFFSET = 1 << 31
+GENERATIONS = 64
+SAMPLE_BUCKETS = 1000
+
+def encodeMove(move):
+    if move is None:
+        return 0
+    packed = (move.startRow*8 + move.startCol) | (move.endRow*8 + move.endCol) << 6
+    if move.isPawnPromotion:
+        packed |= PROMOTION_PIECES.index(move.promotionChoice) << 12
+    return packed
+
+def decodeMove(packed, moves):
+    for move in moves:
+        if encodeMove(move) == packed:
+            return move
+    return None
+
+class TranspositionTable():
+    def __init__(self, sizeMb=16):
+        self.resize(sizeMb)
+
+    def resize(self, sizeMb):
+        self.sizeMb = sizeMb
+        self.numBuckets = max(1, int(sizeMb * 1024 * 1024) // BYTES_PER_BUCKET)
+        self.table = array('Q', [0]) * (self.numBuckets * WORDS_PER_BUCKET)
+        self.generation = 0
+        self.resetStats()
+
+    def clear(self):
+        self.table = array('Q', [0]) * (self.numBuckets * WORDS_PER_BUCKET)
+        self.generation = 0
+        self.resetStats()
+
+    def setGeneration(self, generation):
+        self.generation = generation % GENERATIONS
+
+    def resetStats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def newSearch(self):
+        self.generation = (self.generation + 1) % GENERATIONS
+
+    def probe(self, key):
+        # Returns (move, depth, bound, score) or None
+        self.probes += 1
+        table = self.table
+        i = (key % self.numBuckets) * WORDS_PER_BUCKET
+        data = table[i + 1]
+        if not data or table[i] ^ data != key:
+            data = table[i + 3]
+            if not data or table[i + 2] ^ data != key:
+                return None
+        self.hits += 1
+        return data & 0xFFFF, (data >> 16) & 0xFF, (data >> 24) & 3, (data >> 32) - SCORE_OFFSET
+
+    def store(self, key, depth, score, bound, move=0):
+        self.stores += 1
+        table = self.table
+        i = (key % self.numBuckets) * WORDS_PER_BUCKET
+        old = table[i + 1]
+        sameKey = old and table[i] ^ old == key
+        if not (not old or sameKey or (old >> 26) & 63 != self.generation or depth >= (old >> 16) & 0xFF):
+            i += 2
+            old = table[i + 1]
+            sameKey = old and table[i] ^ old == key
+        if not move and sameKey:
+            move = old & 0xFFFF
+        data = move | (depth & 0xFF) << 16 | bound << 24 | self.generation << 26 | (score + SCORE_OFFSET) << 32
+        table[i] = key ^ data
+        table[i + 1] = data
+
+    def hitRate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def fillRate(self):
+        # Fraction of slots holding an entry from the current search, sampled from the first buckets
+        table = self.table
+        sample = min(SAMPLE_BUCKETS, self.numBuckets)
+        used = 0
+        for i in range(0, sample * WORDS_PER_BUCKET, 2):
+            data = table[i + 1]
+            if data and (data >> 26) & 63 == self.generation:
+                used += 1
+        return used / (sample * 2)
+
+    def hashfull(self):
+        return int(self.fillRate() * 1000)
+
+    def stats(self):
+        return {"sizeMb": self.sizeMb, "entries": self.numBuckets * 2, "probes": self.probes,
+                "hits": self.hits, "stores": self.stores, "hitRate": self.hitRate(), "fillRate": self.fillRate()}
+
+class SharedTranspositionTable(TranspositionTable):
+    # Same layout in a shared memory segment; worker processes attach by name and only the creator unlinks it.
+    # Writers don't lock:
+    # a probe that sees one word from one store and the other word from another fails the key ^ data check.
+    def __init__(self, sizeMb=16, name=None):
+        self.sizeMb = sizeMb
+        self.numBuckets = max(1, int(sizeMb * 1024 * 1024) // BYTES_PER_BUCKET)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.numBuckets * BYTES_PER_BUCKET)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self.table = self.shm.buf.cast('Q')
+        self.generation = 0
+        self.resetStats()
+
+    def resize(self, sizeMb):
+        raise ValueError("a shared transposition table cannot be resized; create a new one")
+
+    def clear(self):
+        zeros = array('Q', [0]) * min(len(self.table), 1 << 20)
+        for start in range(0, len(self.table), len(zeros)):
+            end = min(start + len(zeros), len(self.table))
+            self.table[start:end] = zeros[:end - start]
+        self.generation = 0
+        self.resetStats()
+
+    def close(self):
+        self.table.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,255 @@
+# Headless UCI engine over stdin/stdout. The search runs on a worker thread so "stop" and "isready" are answered
+# while it thinks; Threads > 1 switches to the Lazy SMP searcher.
+
+import sys
+import threading
+from chessBook import OpeningBook, DEFAULT_BOOK_FILE
+from chessEngine import GameState, START_FEN
+from chessSearch import Searcher, TimeManager, MAX_PLY
+from chessSMP import LazySMPSearcher
+from chessTablebase import Tablebase, TABLE_DIR
+from chessTransposition import TranspositionTable
+
+ENGINE_NAME = "Foot Master"
+ENGINE_AUTHOR = "Foot Master developers"
+DEFAULT_HASH_MB = 16
+MAX_HASH_MB = 1024
+MAX_THREADS = 64
+# "go" parameters that take an integer argument
+GO_INTEGERS = ("depth", "movetime", "wtime", "btime", "winc", "binc", "movestogo", "nodes", "mate")
+
+class StoppableTimeManager(TimeManager):
+    # The search polls outOfTime(), so a "stop" set before the worker even starts searching still ends it
+    def __init__(self, softMs=None, hardMs=None):
+        super().__init__(softMs, hardMs)
+        self.stopEvent = threading.Event()
+
+    def canStartIteration(self):
+        return not self.stopEvent.is_set() and super().canStartIteration()
+
+    def outOfTime(self):
+        return self.stopEvent.is_set() or super().outOfTime()
+
+def parseGo(tokens, whiteToMove):
+    # Returns (maxDepth, timeManager, infinite)
+    args = {}
+    infinite = False
+    i = 0
+    while i < len(tokens):
+        name = tokens[i]
+        if name in ("infinite", "ponder"):
+            infinite = True
+            i += 1
+        elif name in GO_INTEGERS and i + 1 < len(tokens):
+            args[name] = int(tokens[i + 1])
+            i += 2
+        else:
+            i += 1
+    maxDepth = min(args.get("depth", MAX_PLY), MAX_PLY)
+    remaining = args.get("wtime" if whiteToMove else "btime")
+    if "movetime" in args:
+        manager = StoppableTimeManager(args["movetime"], args["movetime"])
+    elif remaining is not None and not infinite:
+        clock = TimeManager.forClock(remaining, args.get("winc" if whiteToMove else "binc", 0), args.get("movestogo"))
+        manager = StoppableTimeManager(clock.softMs, clock.hardMs)
+    else:
+        manager = StoppableTimeManager()
+        infinite = infinite or "depth" not in args
+    return maxDepth, manager, infinite
+
+class UCIEngine():
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.outLock = threading.Lock()
+        self.hashMb = DEFAULT_HASH_MB
+        self.threads = 1
+        self.ownBook = False
+        self.bookFile = DEFAULT_BOOK_FILE
+        self.book = None
+        self.tablebase = None
+        self.loadTablebase(TABLE_DIR)
+        self.searcher = None
+        self.gs = GameState()
+        self.worker = None
+        self.timeManager = None
+        self.stopped = threading.Event()
+
+    def send(self, line):
+        with self.outLock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def getSearcher(self):
+        if self.searcher is None:
+            if self.threads > 1:
+                self.searcher = LazySMPSearcher(self.threads, self.hashMb, self.send)
+            else:
+                self.searcher = Searcher(self.send, TranspositionTable(self.hashMb))
+            self.searcher.book = self.book
+            self.searcher.tablebase = self.tablebase
+        return self.searcher
+
+    def loadBook(self):
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.ownBook:
+            try:
+                self.book = OpeningBook(self.bookFile)
+            except (OSError, ValueError) as e:
+                self.send(f"info string no opening book: {e}")
+        if self.searcher is not None:
+            self.searcher.book = self.book
+
+    def loadTablebase(self, path):
+        self.tablebasePath = path
+        if self.tablebase is not None:
+            self.tablebase.close()
+        # A directory without tables is as good as none, and costs nothing per node
+        tablebase = Tablebase(path) if path else None
+        self.tablebase = tablebase if tablebase is not None and tablebase.maxPieces else None
+        if self.tablebase is None and path and path != TABLE_DIR:
+            self.send(f"info string no tablebases in {path}")
+
+    def dropSearcher(self):
+        if isinstance(self.searcher, LazySMPSearcher):
+            self.searcher.close()
+        self.searcher = None
+
+    def handle(self, line):
+        # Returns False on "quit"
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max {MAX_HASH_MB}")
+            self.send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+            self.send("option name OwnBook type check default false")
+            self.send(f"option name BookFile type string default {DEFAULT_BOOK_FILE}")
+            self.send(f"option name TablebasePath type string default {TABLE_DIR}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.waitForSearch()
+            self.setOption(args)
+        elif command == "ucinewgame":
+            self.waitForSearch()
+            self.dropSearcher()
+            self.gs = GameState()
+        elif command == "position":
+            self.waitForSearch()
+            self.setPosition(args)
+        elif command == "go":
+            self.waitForSearch()
+            self.go(args)
+        elif command == "stop":
+            self.stop()
+            self.waitForSearch()
+        elif command == "quit":
+            self.stop()
+            self.waitForSearch()
+            self.dropSearcher()
+            if self.book is not None:
+                self.book.close()
+            if self.tablebase is not None:
+                self.tablebase.close()
+            return False
+        else:
+            self.send(f"info string unknown command {command}")
+        return True
+
+    def setOption(self, args):
+        if "name" not in args:
+            return
+        valueAt = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:valueAt]).lower()
+        value = " ".join(args[valueAt + 1:])
+        try:
+            if name == "hash":
+                self.hashMb = max(1, min(MAX_HASH_MB, int(value)))
+            elif name == "threads":
+                self.threads = max(1, min(MAX_THREADS, int(value)))
+            elif name in ("ownbook", "bookfile"):
+                if name == "ownbook":
+                    self.ownBook = value.lower() == "true"
+                else:
+                    self.bookFile = value
+                # The search tables are unaffected
+                self.loadBook()
+                return
+            elif name == "tablebasepath":
+                self.loadTablebase(value)
+                if self.searcher is not None:
+                    self.searcher.tablebase = self.tablebase
+                return
+            else:
+                self.send(f"info string unknown option {name}")
+                return
+        except ValueError:
+            self.send(f"info string bad value for {name}: {value}")
+            return
+        self.dropSearcher()
+
+    def setPosition(self, args):
+        movesAt = args.index("moves") if "moves" in args else len(args)
+        try:
+            if args and args[0] == "fen":
+                gs = GameState.fromFEN(" ".join(args[1:movesAt]))
+            else:
+                gs = GameState.fromFEN(START_FEN)
+        except ValueError as e:
+            self.send(f"info string bad fen: {e}")
+            return
+        for uci in args[movesAt + 1:]:
+            move = next((m for m in gs.getValidMoves() if m.getUCINotation() == uci), None)
+            if move is None:
+                self.send(f"info string illegal move {uci}")
+                break
+            gs.makeMove(move)
+        self.gs = gs
+
+    def go(self, args):
+        maxDepth, manager, infinite = parseGo(args, self.gs.whiteToMove)
+        self.timeManager = manager
+        self.stopped.clear()
+        searcher = self.getSearcher()
+        gs = self.gs
+        def run():
+            result = searcher.search(gs, maxDepth, manager)
+            # An infinite search may not report until told to stop
+            if infinite:
+                manager.stopEvent.wait()
+            best = result.bestMove.getUCINotation() if result.bestMove else "0000"
+            if len(result.pv) > 1:
+                self.send(f"bestmove {best} ponder {result.pv[1].getUCINotation()}")
+            else:
+                self.send(f"bestmove {best}")
+        self.worker = threading.Thread(target=run, daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        if self.timeManager is not None:
+            self.timeManager.stopEvent.set()
+
+    def waitForSearch(self):
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+def main(inp=sys.stdin, out=sys.stdout):
+    engine = UCIEngine(out)
+    for line in inp:
+        if not engine.handle(line):
+            break
+    else:
+        engine.stop()
+        engine.waitForSearch()
+        engine.dropSearcher()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -71,7 +71,7 @@ for i, para in enumerate(doc.paragraphs):
     # Analysis - Success Criteria
     if text == "Success Criteria:":
         criteria = [
-            "1. User authentication – The program allows users to log in or register; credentials are stored (e.g. in users.csv) and checked before starting the game.",
+            "1. User authentication – The program allows users to log in or register; credentials are stored (hashed, in users.db) and checked before starting the game.",
             "2. Correct chess rules – All pieces move according to standard rules (pawns, knights, bishops, rooks, queen, king), including castling, en passant, pawn promotion, and check/checkmate/stalemate detection.",
             "3. Playable interface – The game displays an 8×8 board with piece images, file/rank labels, move highlights for the selected piece, and valid-move indicators (e.g. dots).",
             "4. Time controls – Each side has a clock; time decreases on their turn, with optional increment per move. The game ends when one side runs out of time.",
@@ -0,0 +1,70 @@
+# Account store: registration, password checks and the one-time users.csv import
+
+import os
+import pytest
+from chessAccounts import AccountStore, hashPassword, main, openAccounts, verifyPassword
+
+@pytest.fixture
+def store(tmp_path):
+    with AccountStore(str(tmp_path / "users.db")) as store:
+        yield store
+
+@pytest.fixture
+def legacy(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text('"username","password"\nalice:secret\nbob,hunter2\n\ncarol:a:b\nalice:changed\n', encoding="utf-8")
+    return str(path)
+
+def test_hash_and_verify():
+    stored = hashPassword("secret")
+    assert stored.count('$') == 3
+    assert verifyPassword("secret", stored)
+    assert not verifyPassword("Secret", stored)
+    assert stored != hashPassword("secret")
+    assert not verifyPassword("secret", "garbage")
+
+def test_register_and_verify(store):
+    assert store.register("alice", "secret")
+    assert not store.register("alice", "other")
+    assert store.verify("alice", "secret")
+    assert not store.verify("alice", "other")
+    assert not store.verify("nobody", "secret")
+    assert store.exists("alice") and not store.exists("nobody")
+    assert store.count() == 1
+
+def test_accounts_persist(tmp_path):
+    path = str(tmp_path / "users.db")
+    with AccountStore(path) as store:
+        store.register("alice", "secret")
+    with AccountStore(path) as store:
+        assert store.verify("alice", "secret")
+
+def test_migrate(store, legacy):
+    store.register("bob", "kept")
+    assert store.legacyPending(legacy)
+    assert store.migrateLegacy(legacy, workers=1, log=None) == (2, 1)
+    assert store.verify("alice", "changed")
+    assert store.verify("carol", "a:b")
+    assert store.verify("bob", "kept") and not store.verify("bob", "hunter2")
+    assert not store.legacyPending(legacy)
+    assert store.migrateLegacy(legacy, workers=1, log=None) is None
+
+def test_open_accounts_imports_small_files_only(tmp_path, legacy):
+    with openAccounts(str(tmp_path / "small.db"), legacy) as store:
+        assert store.count() == 3 and not store.legacyPending(legacy)
+    with openAccounts(str(tmp_path / "large.db"), legacy, importLimit=2) as store:
+        assert store.count() == 0 and store.legacyPending(legacy)
+
+def test_migrate_command_deletes_only_when_asked(tmp_path, legacy, capsys):
+    db = str(tmp_path / "cli.db")
+    assert main(["migrate", legacy, "--workers", "1", "--db", db]) == 0
+    assert os.path.exists(legacy)
+    # Already imported: --delete leaves the file alone
+    assert main(["migrate", legacy, "--delete", "--db", db]) == 0
+    assert os.path.exists(legacy)
+    assert "already imported" in capsys.readouterr().out
+    other = str(tmp_path / "other.db")
+    assert main(["migrate", legacy, "--workers", "1", "--delete", "--db", other]) == 0
+    assert not os.path.exists(legacy)
+    with AccountStore(other) as store:
+        assert store.verify("alice", "changed")
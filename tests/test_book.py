@@ -0,0 +1,49 @@
+# Opening book: built from openings.txt, then looked up by position key
+
+import os
+import random
+import pytest
+from chessBook import OpeningBook, buildBook, lineMove, openBook
+from chessEngine import GameState
+
+OPENINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "openings.txt")
+
+@pytest.fixture(scope="module")
+def bookPath(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("book") / "book.bin")
+    summary = buildBook([OPENINGS], path, log=None)
+    assert summary["skipped"] == 0 and summary["records"] > 0
+    return path
+
+def test_start_position_moves(bookPath):
+    gs = GameState()
+    with OpeningBook(bookPath) as book:
+        entries = book.entries(gs.positionKey())
+        moves = {book.bookMove(gs, packed).getUCINotation(): weight for packed, weight in entries}
+        assert {"e2e4", "d2d4"} <= set(moves)
+        assert book.pickMove(gs, best=True).getUCINotation() == max(moves, key=moves.get)
+        assert book.pickMove(gs, random.Random(1)).getUCINotation() in moves
+
+def test_every_line_is_in_the_book(bookPath):
+    with OpeningBook(bookPath) as book, open(OPENINGS, encoding="utf-8") as f:
+        for line in f:
+            line = line.split('#', 1)[0].split()
+            gs = GameState()
+            for token in line[:16]:
+                move = lineMove(gs, token)
+                found = [book.bookMove(gs, packed) for packed, _ in book.entries(gs.positionKey())]
+                assert move.getUCINotation() in {m.getUCINotation() for m in found}
+                gs.makeMove(move)
+
+def test_position_out_of_book(bookPath):
+    gs = GameState.fromFEN("4k3/8/8/8/8/8/8/4K3 w - - 0 1")
+    with OpeningBook(bookPath) as book:
+        assert book.entries(gs.positionKey()) == []
+        assert book.pickMove(gs) is None
+
+def test_missing_and_invalid_files(tmp_path):
+    assert openBook(str(tmp_path / "none.bin")) is None
+    bad = tmp_path / "bad.bin"
+    bad.write_bytes(b"not a book at all")
+    with pytest.raises(ValueError):
+        OpeningBook(str(bad))
@@ -0,0 +1,48 @@
+# FEN parsing and output, and the state a loaded position starts from
+
+import random
+import pytest
+from chessEngine import GameState, START_FEN
+from chessPerft import SUITE
+
+FENS = [entry["fen"] for entry in SUITE] + ["4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 12"]
+
+@pytest.mark.parametrize("fen", FENS)
+def test_round_trip(fen):
+    assert GameState.fromFEN(fen).toFEN() == fen
+
+def test_start_position():
+    gs = GameState()
+    assert gs.toFEN() == START_FEN
+    assert len(gs.getValidMoves()) == 20
+
+@pytest.mark.parametrize("fen", FENS)
+def test_loaded_state_matches_played_state(fen):
+    # A position reached by moves and the same position loaded from its FEN share key, counts and score
+    rng = random.Random(fen)
+    gs = GameState.fromFEN(fen)
+    for _ in range(12):
+        moves = gs.getValidMoves()
+        if not moves:
+            break
+        gs.makeMove(rng.choice(moves))
+    loaded = GameState.fromFEN(gs.toFEN())
+    assert loaded.toFEN() == gs.toFEN()
+    assert loaded.positionKey() == gs.positionKey()
+    assert loaded.positionKey() == loaded.computePositionKey()
+    assert loaded.pieceCounts == gs.pieceCounts
+    assert {m.getUCINotation() for m in loaded.getValidMoves()} == {m.getUCINotation() for m in gs.getValidMoves()}
+
+def test_undo_restores_fen():
+    gs = GameState.fromFEN(SUITE[1]["fen"])
+    before = gs.toFEN()
+    for move in gs.getValidMoves():
+        gs.makeMove(move)
+        gs.undoMove()
+        assert gs.toFEN() == before
+
+def test_snapshot_round_trip():
+    gs = GameState.fromFEN(SUITE[1]["fen"])
+    restored = GameState.fromSnapshot(gs.snapshot())
+    assert restored.toFEN() == gs.toFEN()
+    assert restored.positionKey() == gs.positionKey()
@@ -0,0 +1,21 @@
+# Perft node counts from chessPerft.SUITE, for both move generators
+
+import pytest
+from chessPerft import SUITE, createState, perft
+
+# The mailbox generator is several times slower; its counts are checked to a shallower depth
+MAILBOX_DEPTH = 3
+
+@pytest.mark.parametrize("entry", SUITE, ids=[entry["name"] for entry in SUITE])
+def test_bitboard(entry):
+    gs = createState(entry["fen"], "bitboard")
+    assert perft(gs, entry["depth"]) == entry["nodes"][entry["depth"] - 1]
+
+@pytest.mark.parametrize("entry", SUITE, ids=[entry["name"] for entry in SUITE])
+def test_mailbox(entry):
+    depth = min(MAILBOX_DEPTH, entry["depth"])
+    assert perft(createState(entry["fen"]), depth) == entry["nodes"][depth - 1]
+
+def test_copy_make_matches_undo():
+    entry = SUITE[1]
+    assert perft(createState(entry["fen"]), 2, copyMake=True) == entry["nodes"][1]
@@ -0,0 +1,73 @@
+# SAN and PGN: moves written out and read back name the same moves; readGames splits games correctly
+
+import io
+import random
+import pytest
+from chessEngine import GameState
+from chessPGN import PGNGame, formatGame, moveToSAN, parseSAN, readGames
+from chessPerft import SUITE
+
+def randomGame(seed, plies=80, fen=None):
+    rng = random.Random(seed)
+    gs = GameState.fromFEN(fen) if fen else GameState()
+    for _ in range(plies):
+        moves = gs.getValidMoves()
+        if not moves:
+            break
+        gs.makeMove(rng.choice(moves))
+    return gs
+
+@pytest.mark.parametrize("fen", [entry["fen"] for entry in SUITE])
+def test_san_round_trip(fen):
+    gs = GameState.fromFEN(fen)
+    legal = gs.getValidMoves()
+    names = [moveToSAN(gs, move, legal) for move in legal]
+    assert len(set(names)) == len(names)
+    for move, san in zip(legal, names):
+        assert parseSAN(gs, san, legal) is move
+
+def test_san_suffixes_and_disambiguation():
+    gs = GameState.fromFEN("6k1/5ppp/8/8/8/8/4K3/R6R w - - 0 1")
+    assert {moveToSAN(gs, m) for m in gs.getValidMoves()} >= {"Ra8#", "Rad1", "Rhd1"}
+    gs = GameState.fromFEN("6k1/8/8/R7/8/8/4K3/R7 w - - 0 1")
+    assert {moveToSAN(gs, m) for m in gs.getValidMoves()} >= {"R1a3", "R5a3", "Ra8+"}
+    gs = GameState.fromFEN("4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1")
+    assert {moveToSAN(gs, m) for m in gs.getValidMoves()} >= {"Rh8+", "Ra8+", "O-O", "O-O-O"}
+
+def test_parse_rejects_bad_moves():
+    gs = GameState()
+    for san in ("e5", "Nf4", "xx", "O-O"):
+        with pytest.raises(ValueError):
+            parseSAN(gs, san)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pgn_round_trip(seed):
+    fen = SUITE[seed % 3]["fen"] if seed % 2 else None
+    gs = randomGame(seed, fen=fen)
+    game = PGNGame.fromState(gs, {"Event": f"game {seed}"}, "1/2-1/2", **({"startFen": fen} if fen else {}))
+    read = list(readGames(io.StringIO(formatGame(game))))
+    assert len(read) == 1
+    assert read[0].moves == game.moves
+    assert read[0].result == "1/2-1/2"
+    assert read[0].headers["Event"] == f"game {seed}"
+    replayed = None
+    for replayed, _ in read[0].replay():
+        pass
+    assert replayed.toFEN() == gs.toFEN()
+
+def test_read_comments_variations_and_nags():
+    text = ('[Event "a"]\n\n1. e4 {best by test} e5 (1... c5 2. Nf3) 2. Nf3 $1 ; rest of line\n'
+            'Nc6 {a comment\nover two lines} 3. Bb5 1-0\n')
+    games = list(readGames(io.StringIO(text)))
+    assert [(g.moves, g.result) for g in games] == [(["e4", "e5", "Nf3", "Nc6", "Bb5"], "1-0")]
+
+def test_read_games_without_result_tokens():
+    # A game with no result token, then one with tags only: neither swallows the other's tags
+    text = ('[Event "first"]\n[Result "1-0"]\n\n1. e4 e5\n\n'
+            '[Event "second"]\n[Result "0-1"]\n\n'
+            '[Event "third"]\n\n{just a comment}\n\n'
+            '[Event "fourth"]\n\n1. d4 *\n')
+    games = list(readGames(io.StringIO(text)))
+    assert [g.headers["Event"] for g in games] == ["first", "second", "third", "fourth"]
+    assert [g.result for g in games] == ["1-0", "0-1", "*", "*"]
+    assert [g.moves for g in games] == [["e4", "e5"], [], [], ["d4"]]
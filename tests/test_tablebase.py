@@ -0,0 +1,79 @@
+# Endgame tables: KQK and KRK generated from scratch must reproduce the known longest mates and agree with play
+
+import random
+import pytest
+from chessEngine import GameState
+from chessTablebase import TableGenerator, Tablebase
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("tables"))
+    summaries = {}
+    generator = TableGenerator(directory, workers=1, log=None)
+    for signature in ("KQK", "KRK"):
+        for summary in generator.generate(signature):
+            summaries[summary["signature"]] = summary
+    tablebase = Tablebase(directory)
+    yield summaries, tablebase
+    tablebase.close()
+
+def test_longest_mates(tables):
+    # KQK mates in at most 10 moves, KRK in at most 16
+    summaries, _ = tables
+    assert summaries["KQK"]["longestMatePlies"] == 19
+    assert summaries["KRK"]["longestMatePlies"] == 31
+
+@pytest.mark.parametrize("fen, expected", [
+    ("6k1/6Q1/6K1/8/8/8/8/8 b - - 0 1", (-1, 0)),
+    ("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1", (0, 0)),
+    ("7k/8/6K1/8/8/8/8/5Q2 w - - 0 1", (1, 1)),
+    ("k7/8/1K6/8/8/8/8/7R w - - 0 1", (1, 1)),
+    ("8/8/8/4k3/8/8/8/4K2Q w - - 0 1", (1, 13)),
+    ("8/8/8/4k3/8/8/8/R3K3 w - - 0 1", (1, 27)),
+    ("r3k3/8/8/8/4K3/8/8/8 b - - 0 1", (1, 27)),
+    ("8/8/8/8/8/8/8/kQK5 b - - 0 1", (-1, 0)),
+    ("k7/8/1Q6/8/8/8/8/7K b - - 0 1", (0, 0)),
+])
+def test_probe(tables, fen, expected):
+    _, tablebase = tables
+    assert tablebase.probe(GameState.fromFEN(fen)) == expected
+
+def test_uncovered_positions(tables):
+    _, tablebase = tables
+    assert tablebase.probe(GameState()) is None
+    assert tablebase.probe(GameState.fromFEN("4k3/8/8/8/8/8/8/R3K3 w Q - 0 1")) is None
+    assert tablebase.bestMove(GameState.fromFEN("4k3/8/8/8/8/8/4P3/4K2R w - - 0 1")) is None
+
+@pytest.mark.parametrize("signature", ["Q", "R"])
+def test_best_move_follows_distance(tables, signature):
+    # From random winning positions the best move shortens the mate by one ply each time, down to mate
+    _, tablebase = tables
+    rng = random.Random(signature)
+    tested = 0
+    while tested < 5:
+        squares = rng.sample(range(64), 3)
+        board = ["1"] * 64
+        for square, piece in zip(squares, ("K", signature, "k")):
+            board[square] = piece
+        fen = "/".join("".join(board[r*8:r*8 + 8]) for r in range(8)) + " w - - 0 1"
+        gs = GameState.fromFEN(fen)
+        found = tablebase.probe(gs)
+        if found is None or found[0] != 1:
+            continue
+        tested += 1
+        plies = found[1]
+        while plies:
+            move, value = tablebase.bestMove(gs)
+            assert value == (1, plies)
+            gs.makeMove(move)
+            child = tablebase.probe(gs)
+            assert child == (-1, plies - 1)
+            plies -= 1
+            if plies:
+                # The defender's best reply keeps the distance
+                move, value = tablebase.bestMove(gs)
+                assert value == (-1, plies)
+                gs.makeMove(move)
+                plies -= 1
+                assert tablebase.probe(gs) == (1, plies)
+        assert gs.isInCheck() and not gs.hasLegalMove()
@@ -0,0 +1,54 @@
+# Transposition table: store/probe, move packing and the bucket replacement scheme
+
+from chessEngine import GameState
+from chessTransposition import (BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, TranspositionTable, decodeMove,
+                                encodeMove)
+
+def test_store_and_probe():
+    tt = TranspositionTable(1)
+    assert tt.probe(12345) is None
+    tt.store(12345, 7, -250, BOUND_LOWER, 0x1234)
+    assert tt.probe(12345) == (0x1234, 7, BOUND_LOWER, -250)
+    assert tt.probe(12345 + tt.numBuckets) is None
+    assert (tt.probes, tt.hits, tt.stores) == (3, 1, 1)
+
+def test_full_key_range_and_scores():
+    tt = TranspositionTable(1)
+    key = (1 << 64) - 1
+    tt.store(key, 255, -(1 << 30), BOUND_UPPER)
+    assert tt.probe(key) == (0, 255, BOUND_UPPER, -(1 << 30))
+
+def test_store_keeps_move_of_same_position():
+    tt = TranspositionTable(1)
+    tt.store(99, 3, 10, BOUND_EXACT, 77)
+    tt.store(99, 4, 20, BOUND_UPPER)
+    assert tt.probe(99) == (77, 4, BOUND_UPPER, 20)
+
+def test_bucket_keeps_deeper_entry():
+    # A shallower store for a colliding key goes to the always-replace slot instead of evicting the deep entry
+    tt = TranspositionTable(1)
+    deep, shallow, other = 5, 5 + tt.numBuckets, 5 + 2*tt.numBuckets
+    tt.store(deep, 10, 1, BOUND_EXACT)
+    tt.store(shallow, 2, 2, BOUND_EXACT)
+    assert tt.probe(deep)[1] == 10 and tt.probe(shallow)[1] == 2
+    tt.store(other, 1, 3, BOUND_EXACT)
+    assert tt.probe(deep)[1] == 10 and tt.probe(shallow) is None
+    tt.newSearch()
+    tt.store(other, 1, 3, BOUND_EXACT)
+    assert tt.probe(deep) is None
+
+def test_clear():
+    tt = TranspositionTable(1)
+    tt.store(42, 1, 0, BOUND_EXACT)
+    tt.clear()
+    assert tt.probe(42) is None
+
+def test_encode_decode_moves():
+    gs = GameState.fromFEN("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1")
+    moves = gs.getValidMoves()
+    packed = [encodeMove(move) for move in moves]
+    assert len(set(packed)) == len(moves)
+    assert all(0 < p < 1 << 16 for p in packed)
+    for move, p in zip(moves, packed):
+        assert decodeMove(p, moves) is move
+    assert encodeMove(None) == 0